@@ -1,10 +1,43 @@
-import pandas as pd
-import numpy as np
-import yfinance as yf
+import argparse
+import importlib
 import json
 import os
 from datetime import datetime, timedelta
 import sys
+import time
+
+import telemetry
+
+
+class _LazyModule:
+    """
+    Modul, který se naimportuje až při prvním přístupu k atributu.
+    CLI tak startuje bez numpy/pandas a fáze si načtou jen to, co potřebují.
+    """
+
+    def __init__(self, name):
+        self._lazy_name = name
+
+    def __getattr__(self, attr):
+        module = importlib.import_module(self._lazy_name)
+        # Další přístupy už jdou přímo přes __dict__, bez režie __getattr__
+        self.__dict__.update(module.__dict__)
+        return getattr(module, attr)
+
+
+np = _LazyModule('numpy')
+pd = _LazyModule('pandas')
+bar_archive = _LazyModule('bar_archive')
+bar_cache = _LazyModule('bar_cache')
+features = _LazyModule('features')
+intraday_fill = _LazyModule('intraday_fill')
+market_data = _LazyModule('market_data')
+param_sweep = _LazyModule('param_sweep')
+sl_bootstrap = _LazyModule('sl_bootstrap')
+sl_stats = _LazyModule('sl_stats')
+sl_sweep = _LazyModule('sl_sweep')
+strategies = _LazyModule('strategies')
+trade_log = _LazyModule('trade_log')
 
 # === MANUAL TICKER GROUPING ===
 BIG_TICKERS = ["AAPL", "^GSPC", "GOOGL", "V", "WMT", "BRK-B", "PLTR", "NVDA", "SPY", "ABBV",    "BAC", "AMZN", "NFLX", "XOM", "GE", "JPM", "JNJ", "MA", "HD", "AVGO",
@@ -101,14 +134,70 @@ STRATEGY_TICKER_GROUPS = {
 # Output directory
 OUTPUT_DIR = os.getcwd()
 LOG_FILE = os.path.join(OUTPUT_DIR, 'final_backtest_results.csv')
+TRADE_LOG_DIR = os.path.join(OUTPUT_DIR, 'trade_log')
 SIGNAL_FILE = os.path.join(OUTPUT_DIR, 'ibkr_signals.json')
 OPTIMIZATION_FILE = os.path.join(OUTPUT_DIR, 'sl_optimization_results.json')
 BACKTEST_FILE = os.path.join(OUTPUT_DIR, 'backtest_60d_results.json')
+DATA_DIR = os.path.join(OUTPUT_DIR, 'data_cache')
+BAR_CACHE_DIR = os.path.join(DATA_DIR, 'daily')
+RUN_REPORT_FILE = os.path.join(OUTPUT_DIR, 'run_report.json')
+SL_STATS_FILE = os.path.join(DATA_DIR, 'sl_stats.json')
+# Mezivýsledky fází CLI (python agent.py <fáze>) – jednotlivé fáze jdou spustit znovu
+STAGE_DIR = os.path.join(DATA_DIR, 'stages')
+STAGE_BARS_DIR = os.path.join(STAGE_DIR, 'daily')
+FETCH_ARTIFACT = os.path.join(STAGE_DIR, 'fetch.json')
+OPTIMIZE_ARTIFACT = os.path.join(STAGE_DIR, 'optimize.json')
+# Fáze profilovaná přes cProfile (např. PROFILE_STAGE=optimize), prázdné = žádná
+PROFILE_STAGE = os.environ.get('PROFILE_STAGE') or None
+HISTORY_YEARS = 8
 COMMISSION_PCT = 0.0001
 
+# Sloupce final_backtest_results.csv (další metriky z fill enginu se do CSV nepíší)
+LOG_COLUMNS = ['Date', 'Strategy', 'Ticker', 'Side', 'Type', 'Entry', 'Exit', 'Profit',
+               'SL-Factor', 'Hit-SL', 'Ticker-Group', 'Num-5min-Bars']
+
 SL_GRID = [0.4, 0.6, 0.8, 1.6, 3.2]
+# Počet procesů pro optimalizaci SL (1 = sériově, 0 = všechna jádra). Platí jen
+# pro OPTIMIZE_MODE=full; incremental a sweep běží sériově a hodnotu ignorují.
+OPTIMIZE_WORKERS = int(os.environ.get('OPTIMIZE_WORKERS', '1'))
+# 'incremental' = z uložených statistik (sl_stats), 'full' = plný grid search,
+# 'sweep' = spojitý sweep SL přes seřazené excursion (sl_sweep)
+OPTIMIZE_MODE = os.environ.get('OPTIMIZE_MODE', 'incremental')
+# Sweep zkouší i faktory kolem prahů, kde se mění zasažené obchody (jinak jen SWEEP_GRID);
+# vždy v přesnosti SL v signálech (sl_sweep.SL_DECIMALS)
+SL_SWEEP_EXACT = os.environ.get('SL_SWEEP_EXACT') == '1'
+OPTIMIZE_REBUILD = os.environ.get('OPTIMIZE_REBUILD') == '1'
+OPTIMIZE_VERIFY = os.environ.get('OPTIMIZE_VERIFY') == '1'
+# Počet bootstrap vzorků pro nejistotu výběru SL (0 = vypnuto). Jen do reportu
+# (výběr SL neovlivní) a na celém univerzu je to nejdražší část běhu – proto
+# jen na vyžádání, např. SL_BOOTSTRAP=2000
+SL_BOOTSTRAP = int(os.environ.get('SL_BOOTSTRAP', '0'))
 ALLOCATION_USD = 10000
 BACKTEST_DAYS = 60
+# Počet signálů na strategii a den (backtest i generace)
+TOP_K = 3
+
+# Sweep parametrů (python agent.py sweep): prahy strategií × top-k × SL faktor
+PARAM_SWEEP_GRID = {
+    'A': {'distance': [round(0.1 + 0.05 * i, 2) for i in range(29)]},       # 0.10 .. 1.50
+    'B': {'volume_mult': [round(1.0 + 0.1 * i, 1) for i in range(21)]},     # 1.0 .. 3.0
+    'V': {},
+    'M': {},
+}
+PARAM_SWEEP_TOP_K = list(range(1, 11))
+# 'opt' = per-ticker optimum z SL_GRID (jako fáze optimize), jinak pevný faktor pro všechny tickery
+PARAM_SWEEP_SL = ['opt'] + [round(0.2 + 0.1 * i, 1) for i in range(49)]     # 0.2 .. 5.0
+PARAM_SWEEP_DAYS = int(os.environ.get('PARAM_SWEEP_DAYS', str(BACKTEST_DAYS)))
+PARAM_SWEEP_FILE = os.path.join(OUTPUT_DIR, 'param_sweep_results.csv')
+PARAM_SWEEP_PARETO_FILE = os.path.join(OUTPUT_DIR, 'param_sweep_pareto.json')
+
+# Archiv 5min barů celého univerza (bar_archive, fáze archive na vyžádání) a intradenní replay nad ním
+ARCHIVE_PERIOD = os.environ.get('ARCHIVE_PERIOD', '5d')
+REPLAY_FILE = os.path.join(OUTPUT_DIR, 'backtest_intraday_results.json')
+REPLAY_START = os.environ.get('REPLAY_START') or None
+REPLAY_END = os.environ.get('REPLAY_END') or None
+# Počet pozic skládaných do matic fill enginu najednou
+REPLAY_BATCH = 4096
 
 def calculate_z_score(profits):
     if len(profits) < 3: return 0
@@ -145,73 +234,113 @@ def simulate_trade_with_sl(row, side, sl_factor, commission_pct=0.001):
     
     return net_pnl, hit_sl
 
-def evaluate_todays_signals_on_5min_data():
+def simulate_trades_vectorized(open_, high, low, close, avg_range, is_long, sl_factor, commission_pct=0.001):
     """
-    EVENING MODE: Načte dnešní signály z JSON a vyhodnotí je proti 5min datům.
-    Vrací updated signály s výsledky a profitem.
+    Vektorová verze simulate_trade_with_sl.
+    Vstupy se broadcastují – např. sloupce (N, 1) proti SL gridu (1, K) dají
+    matici N × K. Vrací (net_pnl, hit_sl) se stejnými čísly jako skalární verze.
     """
-    print(f"\n{'='*70}")
-    print(f"📊 EVENING MODE: VYHODNOCENÍ DNEŠNÍCH SIGNÁLŮ")
-    print(f"{'='*70}\n")
+    sl_distance = sl_factor * avg_range
+    shares = np.floor(ALLOCATION_USD / open_)
     
-    # 1. Načti dnešní signály
-    if not os.path.exists(SIGNAL_FILE):
-        print(f"⚠️  Žádné signály k vyhodnocení (soubor {SIGNAL_FILE} neexistuje)")
-        return []
+    sl_long = open_ - sl_distance
+    sl_short = open_ + sl_distance
+    hit_sl = np.where(is_long, low <= sl_long, high >= sl_short)
+    exit_price = np.where(hit_sl, np.where(is_long, sl_long, sl_short), close)
+    gross_pnl = np.where(is_long, shares * (exit_price - open_), shares * (open_ - exit_price))
     
-    try:
-        with open(SIGNAL_FILE, 'r') as f:
-            todays_signals = json.load(f)
-        print(f"✅ Načteny signály z {SIGNAL_FILE}")
-    except Exception as e:
-        print(f"❌ Chyba při načítání signálů: {e}")
-        return []
-    
-    # 2. Stáhni 5min data pro dnes
-    print(f"\n📥 Stahuji 5min data pro dnešní evaluaci...")
+    commission = ALLOCATION_USD * commission_pct * 2
+    net_pnl = gross_pnl - commission
     
-    all_tickers_in_signals = set()
-    for strategy, signals in todays_signals.items():
-        for sig in signals:
-            all_tickers_in_signals.add(sig['ticker'])
+    return net_pnl, hit_sl
+
+def z_scores_by_column(profits):
+    """calculate_z_score pro každý sloupec matice najednou"""
+    n = profits.shape[0]
+    if n < 3:
+        return np.zeros(profits.shape[1])
+    return profits.mean(axis=0) / (profits.std(axis=0, ddof=1) + 1e-9)
+
+def simulate_sl_grid(open_, high, low, close, avg_range, is_long, sl_grid):
+    """Profit a SL hit každého obchodu pro každý SL faktor (matice obchody × grid)"""
+    grid = np.asarray(sl_grid, dtype=float)[None, :]
+    return simulate_trades_vectorized(
+        open_[:, None], high[:, None], low[:, None], close[:, None],
+        avg_range[:, None], np.asarray(is_long)[:, None], grid, COMMISSION_PCT
+    )
+
+def evaluate_sl_grid(open_, high, low, close, avg_range, is_long, sl_grid):
+    """
+    Vyhodnotí všechny SL faktory najednou (matice obchody × grid).
+    Vrací seznam metrik pro každý faktor ve stejném tvaru jako dřív grid search.
+    """
+    profits, hits = simulate_sl_grid(open_, high, low, close, avg_range, is_long, sl_grid)
     
-    if not all_tickers_in_signals:
-        print(f"⚠️  Žádné tickery k vyhodnocení")
-        return []
+    n = profits.shape[0]
+    total = profits.sum(axis=0)
+    wins = (profits > 0).sum(axis=0)
+    sharpe = z_scores_by_column(profits)
+    sl_hits = hits.sum(axis=0)
     
-    print(f"   Tickery: {', '.join(all_tickers_in_signals)}")
+    return [
+        {
+            'sl_factor': sl_factor,
+            'total_profit': float(total[i]),
+            'win_rate': float(wins[i] / n * 100),
+            'avg_profit': float(total[i] / n),
+            'sharpe': float(sharpe[i]),
+            'num_trades': int(n),
+            'sl_hit_rate': float(sl_hits[i] / n * 100)
+        }
+        for i, sl_factor in enumerate(sl_grid)
+    ]
+
+def mean_range(high, low, axis=None):
+    """
+    avg_range signálu: průměr High - Low přes bary s platnými cenami (NaN =
+    chybějící bar). Okno je 20 denních barů do dne signálu včetně, tj. bez
+    dne obchodu. Bez platného baru NaN.
+    """
+    span = np.asarray(high, dtype=float) - np.asarray(low, dtype=float)
+    valid = np.isfinite(span)
+    count = valid.sum(axis=axis)
+    total = np.where(valid, span, 0.0).sum(axis=axis)
+    return np.where(count > 0, total / np.maximum(count, 1), np.nan)
+
+def fill_intraday_positions(bars, counts, times, is_long, sl_factor, avg_range):
+    """
+    Jádro vyhodnocení pozic na 5min barech (večer i intradenní replay).
+    Entry = Open prvního baru, exit = stop při prvním dotyku nebo Close
+    posledního baru; SL = sl_factor * avg_range, bez avg_range 2 % z entry.
+    Vrací (entry_price, net_pnl, fills z intraday_fill.first_touch_fills).
+    """
+    entry_price = bars['Open'][:, 0]
+    sl_distance = np.where(np.isnan(avg_range), entry_price * 0.02, sl_factor * avg_range)
+    sl_price = np.where(is_long, entry_price - sl_distance, entry_price + sl_distance)
     
-    # Stáhni 5min data pro dnes (+ včera pro případ že dnes ještě není complete)
-    ticker_5min_data = {}
-    for ticker in all_tickers_in_signals:
-        try:
-            # Stáhni 5 dní 5min dat (pokryje dnešek i včerejšek)
-            data = yf.download(ticker, period="5d", interval="5m", progress=False, auto_adjust=True)
-            if not data.empty:
-                ticker_5min_data[ticker] = data
-                print(f"   ✅ {ticker}: {len(data)} 5min barov")
-            else:
-                print(f"   ⚠️  {ticker}: Žádná 5min data")
-        except Exception as e:
-            print(f"   ❌ {ticker}: Chyba - {e}")
+    fills = intraday_fill.first_touch_fills(entry_price, sl_price, is_long,
+                              bars['High'], bars['Low'], bars['Close'], counts, times)
     
-    # 3. Vyhodnoť každý signál
+    shares = np.floor(ALLOCATION_USD / entry_price)
+    exit_price = fills['exit_price']
+    gross_pnl = np.where(is_long, shares * (exit_price - entry_price), shares * (entry_price - exit_price))
+    commission = ALLOCATION_USD * COMMISSION_PCT * 2
+    return entry_price, gross_pnl - commission, fills
+
+def evaluate_signals_on_bars(todays_signals, ticker_5min_data, avg_ranges):
+    """
+    Vyhodnotí signály proti již staženým 5min barům (bez I/O).
+    avg_ranges: {ticker: Prev_AvgRange}; chybějící ticker -> SL 2 % z entry.
+    """
     print(f"\n📊 Vyhodnocuji signály...")
-    evaluated_trades = []
+    positions = []
     
     for strategy, signals in todays_signals.items():
-        if not signals:
-            continue
-            
-        print(f"\n🎯 Strategie {strategy}:")
-        
         for sig in signals:
             ticker = sig['ticker']
-            action = sig['action']
-            sl_factor = sig['sl_factor']
             
             if ticker not in ticker_5min_data:
-                print(f"   ⚠️  {ticker}: Žádná 5min data k vyhodnocení")
+                print(f"   ⚠️  {strategy} {ticker}: Žádná 5min data k vyhodnocení")
                 continue
             
             df_5min = ticker_5min_data[ticker]
@@ -221,55 +350,33 @@ def evaluate_todays_signals_on_5min_data():
             todays_bars = df_5min[df_5min.index.date == today]
             
             if todays_bars.empty:
-                print(f"   ⚠️  {ticker}: Žádné dnešní 5min bary")
+                print(f"   ⚠️  {strategy} {ticker}: Žádné dnešní 5min bary")
                 continue
             
-            # Entry = první bar (Open cena)
-            entry_bar = todays_bars.iloc[0]
-            entry_price = float(entry_bar['Open'].iloc[0] if hasattr(entry_bar['Open'], 'iloc') else entry_bar['Open'])
-            
-            # Exit = poslední bar (Close cena) nebo SL během dne
-            exit_bar = todays_bars.iloc[-1]
-            exit_price = float(exit_bar['Close'].iloc[0] if hasattr(exit_bar['Close'], 'iloc') else exit_bar['Close'])
-            shares = int(ALLOCATION_USD / entry_price)
-            
-            # Simulace SL během dne
-            hit_sl = False
-            
-            # Potřebujeme Prev_AvgRange - použijeme 1D data
-            try:
-                daily_data = yf.download(ticker, period="30d", interval="1d", progress=False, auto_adjust=True)
-                if len(daily_data) >= 20:
-                    avg_range = float((daily_data['High'] - daily_data['Low']).rolling(20).mean().iloc[-1])
-                    sl_distance = sl_factor * avg_range
-                else:
-                    # Fallback: 2% range
-                    sl_distance = entry_price * 0.02
-            except:
-                sl_distance = entry_price * 0.02
-            
-            if action == 'Long':
-                sl_price = entry_price - sl_distance
-                # Zkontroluj každý 5min bar
-                for idx, bar in todays_bars.iterrows():
-                    bar_low = float(bar['Low'].iloc[0] if hasattr(bar['Low'], 'iloc') else bar['Low'])
-                    if bar_low <= sl_price:
-                        exit_price = sl_price
-                        hit_sl = True
-                        break
-                gross_pnl = shares * (exit_price - entry_price)
-            else:  # Short
-                sl_price = entry_price + sl_distance
-                for idx, bar in todays_bars.iterrows():
-                    bar_high = float(bar['High'].iloc[0] if hasattr(bar['High'], 'iloc') else bar['High'])
-                    if bar_high >= sl_price:
-                        exit_price = sl_price
-                        hit_sl = True
-                        break
-                gross_pnl = shares * (entry_price - exit_price)
+            positions.append((strategy, sig, today, todays_bars))
+    
+    evaluated_trades = []
+    
+    if positions:
+        bars, times, counts = intraday_fill.stack_bars([p[3] for p in positions])
+        
+        is_long = np.array([p[1]['action'] == 'Long' for p in positions])
+        sl_factor = np.array([p[1]['sl_factor'] for p in positions], dtype=float)
+        # Prev_AvgRange ze signálu / sdíleného denního downloadu
+        avg_range = np.array([avg_ranges.get(p[1]['ticker'], np.nan) for p in positions])
+        entry_price, net_pnl, fills = fill_intraday_positions(bars, counts, times, is_long, sl_factor, avg_range)
+        exit_price = fills['exit_price']
+        
+        current_strategy = None
+        for i, (strategy, sig, today, todays_bars) in enumerate(positions):
+            if strategy != current_strategy:
+                print(f"\n🎯 Strategie {strategy}:")
+                current_strategy = strategy
             
-            commission = ALLOCATION_USD * COMMISSION_PCT * 2
-            net_pnl = gross_pnl - commission
+            ticker = sig['ticker']
+            action = sig['action']
+            hit_sl = bool(fills['hit'][i])
+            touch_time = fills['touch_time'][i]
             
             # Log výsledek
             evaluated_trades.append({
@@ -278,25 +385,117 @@ def evaluate_todays_signals_on_5min_data():
                 'Ticker': ticker,
                 'Side': action,
                 'Type': 'INTRADAY-5MIN',
-                'Entry': round(entry_price, 2),
-                'Exit': round(exit_price, 2),
-                'Profit': round(net_pnl, 2),
-                'SL-Factor': sl_factor,
+                'Entry': round(float(entry_price[i]), 2),
+                'Exit': round(float(exit_price[i]), 2),
+                'Profit': round(float(net_pnl[i]), 2),
+                'SL-Factor': sig['sl_factor'],
                 'Hit-SL': hit_sl,
                 'Ticker-Group': sig.get('ticker_group', 'N/A'),
-                'Num-5min-Bars': len(todays_bars)
+                'Num-5min-Bars': len(todays_bars),
+                'Touch-Time': str(touch_time)[:19] if hit_sl else None,
+                'Bars-In-Trade': int(fills['bars_in_trade'][i]),
+                'Minutes-In-Trade': int(fills['time_in_trade'][i] / np.timedelta64(1, 'm')),
+                'MAE': round(float(fills['mae'][i]), 4),
+                'MFE': round(float(fills['mfe'][i]), 4)
             })
             
             status = "🛑 SL Hit" if hit_sl else "✅ Closed"
-            print(f"   {ticker:6s} {action:5s}: Entry=${entry_price:.2f} Exit=${exit_price:.2f} "
-                  f"P&L=${net_pnl:>+8.2f} {status}")
+            print(f"   {ticker:6s} {action:5s}: Entry=${entry_price[i]:.2f} Exit=${exit_price[i]:.2f} "
+                  f"P&L=${net_pnl[i]:>+8.2f} {status}")
+    
+    return evaluated_trades
+
+def evaluate_todays_signals_on_5min_data(provider=None):
+    """
+    EVENING MODE: Načte dnešní signály z JSON a vyhodnotí je proti 5min datům.
+    Vrací updated signály s výsledky a profitem.
+    provider: zdroj dat z market_data (výchozí podle DATA_PROVIDER).
+    """
+    print(f"\n{'='*70}")
+    print(f"📊 EVENING MODE: VYHODNOCENÍ DNEŠNÍCH SIGNÁLŮ")
+    print(f"{'='*70}\n")
+    
+    # 1. Načti dnešní signály
+    if not os.path.exists(SIGNAL_FILE):
+        print(f"⚠️  Žádné signály k vyhodnocení (soubor {SIGNAL_FILE} neexistuje)")
+        return []
+    
+    try:
+        with open(SIGNAL_FILE, 'r') as f:
+            todays_signals = json.load(f)
+        print(f"✅ Načteny signály z {SIGNAL_FILE}")
+    except Exception as e:
+        print(f"❌ Chyba při načítání signálů: {e}")
+        return []
+    
+    # 2. Stáhni 5min data pro dnes
+    print(f"\n📥 Stahuji 5min data pro dnešní evaluaci...")
+    
+    all_tickers_in_signals = set()
+    for strategy, signals in todays_signals.items():
+        for sig in signals:
+            all_tickers_in_signals.add(sig['ticker'])
+    
+    if not all_tickers_in_signals:
+        print(f"⚠️  Žádné tickery k vyhodnocení")
+        return []
+    
+    print(f"   Tickery: {', '.join(all_tickers_in_signals)}")
+    provider = provider or market_data.get_provider(data_dir=DATA_DIR)
+    
+    # Stáhni 5min data pro dnes (+ včera pro případ že dnes ještě není complete)
+    # jedním hromadným requestem pro všechny tickery
+    tickers = sorted(all_tickers_in_signals)
+    try:
+        ticker_5min_data = provider.bars(tickers, period="5d", interval="5m")
+    except Exception as e:
+        print(f"   ❌ Chyba při stahování 5min dat: {e}")
+        ticker_5min_data = {}
+    for ticker in tickers:
+        if ticker in ticker_5min_data:
+            print(f"   ✅ {ticker}: {len(ticker_5min_data[ticker])} 5min barov")
+        else:
+            print(f"   ⚠️  {ticker}: Žádná 5min data")
+    
+    # Prev_AvgRange ukládá generate_signals_for_tomorrow přímo do signálu.
+    # Pro starší signály bez něj stáhneme denní bary jedním sdíleným requestem.
+    avg_ranges = {}
+    for signals in todays_signals.values():
+        for sig in signals:
+            # None (a NaN ze starších souborů) = signál bez platného avg_range
+            if sig.get('avg_range') and np.isfinite(sig['avg_range']):
+                avg_ranges[sig['ticker']] = float(sig['avg_range'])
+    missing = [t for t in tickers if t not in avg_ranges and t in ticker_5min_data]
+    if missing:
+        try:
+            daily = provider.bars(missing, period="60d", interval="1d")
+        except Exception as e:
+            print(f"   ⚠️  Denní data pro avg range nedostupná: {e}")
+            daily = {}
+        for t, daily_data in daily.items():
+            if t not in ticker_5min_data:
+                continue
+            # Stejné okno jako signál: 20 denních barů před dnem obchodu (bez něj)
+            trade_day = ticker_5min_data[t].index[-1].date()
+            prior = daily_data[daily_data.index.date < trade_day].tail(20)
+            if len(prior) == 20:
+                avg_range = mean_range(prior['High'].to_numpy(dtype=float), prior['Low'].to_numpy(dtype=float))
+                if np.isfinite(avg_range):
+                    avg_ranges[t] = float(avg_range)
     
-    # 4. Ulož výsledky do CSV
+    # 3. Vyhodnoť každý signál
+    evaluated_trades = evaluate_signals_on_bars(todays_signals, ticker_5min_data, avg_ranges)
+    
+    # 4. Ulož výsledky do logu obchodů (měsíční partition) + CSV export
     if evaluated_trades:
         try:
-            df_new = pd.DataFrame(evaluated_trades)
-            df_new.to_csv(LOG_FILE, mode='a', header=not os.path.exists(LOG_FILE), index=False)
-            print(f"\n✅ Vyhodnoceno {len(evaluated_trades)} obchodů (uloženo do {LOG_FILE})")
+            migrated = trade_log.migrate_csv(LOG_FILE, TRADE_LOG_DIR)
+            if migrated:
+                print(f"\n📦 Převedeno {migrated} obchodů z {LOG_FILE} do {TRADE_LOG_DIR}")
+            df_new = pd.DataFrame(evaluated_trades)[LOG_COLUMNS]
+            trade_log.append_trades(df_new, TRADE_LOG_DIR)
+            trade_log.export_csv(LOG_FILE, TRADE_LOG_DIR)
+            print(f"\n✅ Vyhodnoceno {len(evaluated_trades)} obchodů (uloženo do {TRADE_LOG_DIR}, export {LOG_FILE})")
             
             total_pnl = sum(t['Profit'] for t in evaluated_trades)
             print(f"   💰 Celkový dnešní P&L: ${total_pnl:,.2f}")
@@ -307,137 +506,406 @@ def evaluate_todays_signals_on_5min_data():
     
     return evaluated_trades
 
-def optimize_sl_for_ticker_strategy(df, strategy_mode, ticker):
+def optimize_sl_for_ticker_strategy(df, strategy_mode, ticker, is_long=None):
     """Grid search pro optimální stop loss"""
-    results = []
-    
-    for sl_factor in SL_GRID:
-        trades = []
-        
-        for idx, row in df.iterrows():
-            if strategy_mode == 'A':
-                side = 'Long'
-            elif strategy_mode == 'B':
-                side = 'Long' if row['Prev_Close'] > row['Prev_Open'] else 'Short'
-            elif strategy_mode == 'V':
-                side = 'Long'
-            elif strategy_mode == 'M':
-                side = 'Long'
-            
-            profit, hit_sl = simulate_trade_with_sl(row, side, sl_factor, COMMISSION_PCT)
-            trades.append({'profit': profit, 'hit_sl': hit_sl})
-        
-        if not trades:
-            continue
-        
-        profits = [t['profit'] for t in trades]
-        results.append({
-            'sl_factor': sl_factor,
-            'total_profit': sum(profits),
-            'win_rate': sum(1 for p in profits if p > 0) / len(profits) * 100,
-            'avg_profit': np.mean(profits),
-            'sharpe': calculate_z_score(profits),
-            'num_trades': len(trades),
-            'sl_hit_rate': sum(1 for t in trades if t['hit_sl']) / len(trades) * 100
-        })
-    
-    if not results:
+    if df.empty:
         return 0.5, None
     
+    if is_long is None:
+        _, is_long, _ = strategies.evaluate_strategy(strategy_mode, lambda name: df[name].to_numpy(dtype=float))
+    
+    results = evaluate_sl_grid(
+        df['Open'].to_numpy(dtype=float),
+        df['High'].to_numpy(dtype=float),
+        df['Low'].to_numpy(dtype=float),
+        df['Close'].to_numpy(dtype=float),
+        df['Prev_AvgRange'].to_numpy(dtype=float),
+        is_long,
+        SL_GRID
+    )
+    
     best = max(results, key=lambda x: x['sharpe'])
     return best['sl_factor'], best
 
-def run_backtest_60d(ticker_data, optimized_sl, ticker_performance):
+# Sloupce, které optimalizace potřebuje (posílají se do workerů jako numpy pole)
+OPTIMIZE_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Prev_AvgRange', 'Prev_Close', 'Prev_Open',
+                    'Prev_High20_Strict', 'Prev_Volume', 'Prev_V_Avg', 'Prev_High', 'Day_Return_Pct']
 
-    print(f"\n{'='*70}")
-    print(f"📊 BACKTEST POSLEDNÍCH {BACKTEST_DAYS} DNÍ")
-    print(f"{'='*70}\n")
+# Čítač telemetrie optimize_pair.<strategie> – stejný ve všech režimech optimalizace
+@telemetry.track_calls('optimize_pair', key_arg=1)
+def optimize_pair(df, mode_strat, t, mask=None, is_long=None):
+    """
+    SL grid search + z-score pro jednu dvojici (strategie, ticker).
+    mask/is_long jsou řádky signální matice zarovnané s df (jinak se spočítají).
+    Vrací (z_score, best_sl, best_metrics); best_metrics je None při < 3 signálech.
+    """
+    if mask is None:
+        mask, is_long, _ = strategies.evaluate_strategy(mode_strat, lambda name: df[name].to_numpy(dtype=float))
+    
+    hist_len = max(len(df) - 65, 0)
+    hist_mask = mask[:hist_len]
+    sig_df = df.iloc[:hist_len][hist_mask]
+    
+    if len(sig_df) < 3:
+        return 0, 0.5, None
+    
+    best_sl, best_metrics = optimize_sl_for_ticker_strategy(sig_df, mode_strat, t, is_long[:hist_len][hist_mask])
+    
+    if mode_strat == 'M':
+        z_score = np.mean(sig_df['Day_Return_Pct'])
+    else:
+        z_score = calculate_z_score(sig_df['Day_Return_Pct'])
+    
+    return z_score, best_sl, best_metrics
 
-    backtest_results = {}
+# Data workeru – posílají se jednou při startu procesu, ne s každou úlohou
+_WORKER_ARRAYS = {}
 
-    for mode in ['A','B','V','M']:
+def _init_optimize_worker(arrays):
+    global _WORKER_ARRAYS
+    _WORKER_ARRAYS = arrays
+    # Čas měří úloha a přičte ho rodič; zděděná telemetrie (fork) by měřila podruhé
+    telemetry.activate(None)
 
-        print(f"\n🎯 Strategie {mode}")
-        print("-"*70)
+def _optimize_task(task):
+    """Úloha workeru; vrací i čas, protože telemetrie workeru se do rodiče nedostane"""
+    mode_strat, t = task
+    columns, masks = _WORKER_ARRAYS[t]
+    df = pd.DataFrame(columns, copy=False)
+    mask, is_long = masks[mode_strat]
+    wall = time.perf_counter()
+    cpu = time.process_time()
+    result = optimize_pair(df, mode_strat, t, mask, is_long)
+    return result, time.perf_counter() - wall, time.process_time() - cpu
 
-        allowed = STRATEGY_TICKER_GROUPS[mode]
-        filtered = {t:ticker_data[t] for t in allowed if t in ticker_data}
+def _ticker_signal_rows(panel, signals, mode_strat, t):
+    """Řádky signální matice pro ticker, zarovnané s panel.frame(t)"""
+    j = panel.position[t]
+    n = panel.lengths[j]
+    return signals[mode_strat]['mask'][-n:, j], signals[mode_strat]['is_long'][-n:, j]
 
-        equity = 10000
-        equity_curve = [equity]
-        trades = []
+def _optimize_tasks(panel):
+    return [
+        (mode_strat, t)
+        for mode_strat in strategies.STRATEGY_MODES
+        for t in dict.fromkeys(STRATEGY_TICKER_GROUPS[mode_strat])
+        if t in panel
+    ]
 
-        for day_offset in range(BACKTEST_DAYS,0,-1):
+def _collect_optimization(tasks, results):
+    """Složí výsledky optimize_pair do (ticker_performance, optimized_sl, optimization_results)"""
+    ticker_performance = {m: {} for m in strategies.STRATEGY_MODES}
+    optimized_sl = {m: {} for m in strategies.STRATEGY_MODES}
+    optimization_results = {m: {} for m in strategies.STRATEGY_MODES}
+    
+    for (mode_strat, t), (z_score, best_sl, best_metrics) in zip(tasks, results):
+        ticker_performance[mode_strat][t] = z_score
+        optimized_sl[mode_strat][t] = best_sl
+        if best_metrics is not None:
+            optimization_results[mode_strat][t] = best_metrics
+    
+    return ticker_performance, optimized_sl, optimization_results
 
-            candidates = []
+def optimize_all_strategies(panel, signals, workers=1):
+    """
+    Optimalizace SL a z-score pro všechny (strategie, ticker) dvojice.
+    S workers > 1 (0 = všechna jádra) běží v process poolu; výsledky se
+    skládají v pevném pořadí, takže nezávisí na počtu workerů. Process pool
+    má jen tato plná optimalizace (OPTIMIZE_MODE=full).
+    """
+    tasks = _optimize_tasks(panel)
+    
+    if workers is None or workers <= 0:
+        workers = os.cpu_count() or 1
+    workers = min(workers, len(tasks)) if tasks else 1
+    
+    if workers <= 1:
+        frames = {}
+        results = []
+        for m, t in tasks:
+            if t not in frames:
+                frames[t] = panel.frame(t)
+            mask, is_long = _ticker_signal_rows(panel, signals, m, t)
+            results.append(optimize_pair(frames[t], m, t, mask, is_long))
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+        arrays = {}
+        for m, t in tasks:
+            if t not in arrays:
+                j = panel.position[t]
+                n = panel.lengths[j]
+                arrays[t] = ({c: panel.columns[c][-n:, j] for c in OPTIMIZE_COLUMNS}, {})
+            arrays[t][1][m] = _ticker_signal_rows(panel, signals, m, t)
+        print(f"   ⚙️  Paralelní optimalizace: {workers} workerů, {len(tasks)} úloh")
+        chunksize = max(1, len(tasks) // (workers * 8))
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_optimize_worker,
+                                 initargs=(arrays,)) as pool:
+            timed = list(pool.map(_optimize_task, tasks, chunksize=chunksize))
+        tel = telemetry.current()
+        results = []
+        for (m, t), (result, wall, cpu) in zip(tasks, timed):
+            results.append(result)
+            if tel is not None:
+                tel.add(f"optimize_pair.{m}", wall, cpu, rows=len(arrays[t][0]['Open']))
+    
+    return _collect_optimization(tasks, results)
 
-            for t,df in filtered.items():
+# Sloupce signálních řádků, ze kterých sl_stats počítá příspěvky obchodů
+_STATS_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Prev_AvgRange']
 
-                if len(df) < day_offset+1:
-                    continue
+def _history_signal_rows(panel, signals, m, t):
+    """
+    Signální řádky historického okna dvojice (bez posledních 65 dní, jako
+    optimize_pair): sloupce _STATS_COLUMNS + is_long a ret, jejich pozice
+    v okně a délka okna.
+    """
+    j = panel.position[t]
+    n = panel.lengths[j]
+    hist_len = max(n - 65, 0)
+    mask, is_long = _ticker_signal_rows(panel, signals, m, t)
+    idx = np.flatnonzero(mask[:hist_len])
+    rows = {c: panel.columns[c][-n:, j][idx] for c in _STATS_COLUMNS}
+    rows['is_long'] = is_long[idx]
+    rows['ret'] = panel.columns['Day_Return_Pct'][-n:, j][idx]
+    return rows, idx, hist_len
 
-                prev = df.iloc[-(day_offset+1)]
-                now  = df.iloc[-day_offset]
+def _stats_simulate(rows, sl):
+    return simulate_sl_grid(rows['Open'][sl], rows['High'][sl], rows['Low'][sl], rows['Close'][sl],
+                            rows['Prev_AvgRange'][sl], rows['is_long'][sl], SL_GRID)
 
-                signal=False
-                side="Long"
-                score=0
+def optimize_all_strategies_incremental(panel, signals, state_path=SL_STATS_FILE, rebuild=False,
+                                        verify=False, stats=None):
+    """
+    Stejný výstup jako optimize_all_strategies, ale z uložených postačujících
+    statistik (sl_stats): přičtou se jen nové řádky okna a odečtou vypadlé.
+    rebuild=True zahodí stav a přepočítá vše, verify=True porovná každou
+    dvojici s plným přepočtem. Do `stats` zapíše počty inkrementálních
+    a přepočítaných dvojic.
+    """
+    params = {'sl_grid': SL_GRID, 'commission_pct': COMMISSION_PCT,
+              'allocation_usd': ALLOCATION_USD, 'hist_offset': 65}
+    state = sl_stats.empty_state(params) if rebuild else sl_stats.load_state(state_path, params)
+    tasks = _optimize_tasks(panel)
+    pairs = {}
+    results = []
+    rebuilt = 0
+    max_diff = 0.0
+    
+    for m, t in tasks:
+        with telemetry.timed(f"optimize_pair.{m}", rows=int(panel.lengths[panel.position[t]])):
+            rows, idx, hist_len = _history_signal_rows(panel, signals, m, t)
+            window = panel.dates[t][:hist_len].values.astype('datetime64[D]')
+            dates = window[idx]
+            
+            key = f"{m}|{t}"
+            if hist_len == 0:
+                entry, was_rebuilt = sl_stats.build_pair(dates, rows, _stats_simulate, len(SL_GRID)), False
+            else:
+                entry, was_rebuilt = sl_stats.update_pair(state['pairs'].get(key), dates, rows, window[0],
+                                                          _stats_simulate, len(SL_GRID))
+            rebuilt += was_rebuilt
+            
+            if verify and not was_rebuilt:
+                fresh = sl_stats.build_pair(dates, rows, _stats_simulate, len(SL_GRID))
+                diff = sl_stats.compare_stats(entry, fresh)
+                max_diff = max(max_diff, diff)
+                if diff > sl_stats.VERIFY_RTOL:
+                    print(f"   ⚠️  {m} {t}: inkrementální statistiky nesedí (rozdíl {diff:.2e}), přepočítávám")
+                    entry = fresh
+            
+            pairs[key] = entry
+            results.append(sl_stats.metrics_from_stats(entry, SL_GRID, m))
+    
+    state['pairs'] = pairs
+    try:
+        sl_stats.save_state(state, state_path)
+    except Exception as e:
+        print(f"   ⚠️  Stav SL statistik se nepodařilo uložit: {e}")
+    
+    print(f"   ♻️  SL statistiky: {len(tasks) - rebuilt} dvojic inkrementálně, {rebuilt} přepočítáno")
+    if verify:
+        print(f"   🔎 Ověření proti plnému přepočtu: max. relativní rozdíl {max_diff:.2e}")
+    if stats is not None:
+        stats['incremental'] = len(tasks) - rebuilt
+        stats['rebuilt'] = rebuilt
+        if verify:
+            stats['verify_max_diff'] = max_diff
+    
+    return _collect_optimization(tasks, results)
 
-                if mode=="A":
-                    d = abs(prev['Prev_Close']-prev['Prev_High20_Strict'])/(prev['Prev_AvgRange']+1e-9)
-                    if d<0.4:
-                        signal=True
-                        score=ticker_performance[mode].get(t,0)
+def optimize_all_strategies_sweep(panel, signals, exact=False):
+    """
+    Stejný výstup jako optimize_all_strategies, ale SL faktor se vybírá ze
+    spojité křivky (sl_sweep): hustý grid SWEEP_GRID, s exact=True navíc
+    faktory kolem každého prahu, kde se mění množina obchodů zasažených
+    stopem – vše v přesnosti SL v signálech. Jedno seřazení excursion na
+    dvojici místo průchodu obchody za každý bod gridu.
+    """
+    tasks = _optimize_tasks(panel)
+    results = []
+    thresholds_total = 0
+    
+    for m, t in tasks:
+        with telemetry.timed(f"optimize_pair.{m}", rows=int(panel.lengths[panel.position[t]])):
+            rows, _, _ = _history_signal_rows(panel, signals, m, t)
+            n = len(rows['is_long'])
+            if n < 3:
+                results.append((0, 0.5, None))
+                continue
+            excursion, loss_per_sl, close_pnl, commission = sl_sweep.trade_terms(
+                rows['Open'], rows['High'], rows['Low'], rows['Close'], rows['Prev_AvgRange'],
+                rows['is_long'], ALLOCATION_USD, COMMISSION_PCT)
+            thresholds = sl_sweep.sweep_thresholds(excursion, exact=exact)
+            thresholds_total += len(thresholds)
+            best = sl_sweep.best_threshold(excursion, loss_per_sl, close_pnl, commission, thresholds)
+            
+            if m == 'M':
+                z_score = float(np.mean(rows['ret']))
+            else:
+                z_score = float(calculate_z_score(rows['ret']))
+            results.append((z_score, best['sl_factor'], best))
+    
+    print(f"   📈 SL sweep: {len(tasks)} dvojic, průměrně {thresholds_total / max(len(tasks), 1):.0f} prahů na dvojici")
+    return _collect_optimization(tasks, results)
 
-                elif mode=="B":
-                    if prev['Prev_Volume']>prev['Prev_V_Avg']*1.5:
-                        signal=True
-                        side="Long" if prev['Prev_Close']>prev['Prev_Open'] else "Short"
-                        score=ticker_performance[mode].get(t,0)
+def bootstrap_sl_selection(panel, signals, optimization_results, n_boot=SL_BOOTSTRAP, seed=0):
+    """
+    Doplní do optimization_results[mode][ticker]['bootstrap'] nejistotu
+    výběru SL: pro každý faktor SL_GRID z-score, jeho interval spolehlivosti
+    a pravděpodobnost, že je nejlepší (sl_bootstrap). Vybraný faktor mimo
+    SL_GRID (OPTIMIZE_MODE=sweep) se převzorkuje jako další sloupec. Profity
+    všech dvojic se nasimulují jedním voláním a převzorkují najednou.
+    """
+    tasks = [(m, t) for m, t in _optimize_tasks(panel) if t in optimization_results[m]]
+    if not tasks or n_boot <= 0:
+        return 0
+    
+    parts = [_history_signal_rows(panel, signals, m, t)[0] for m, t in tasks]
+    rows = {c: np.concatenate([p[c] for p in parts]) for c in _STATS_COLUMNS + ['is_long']}
+    counts = [len(p['is_long']) for p in parts]
+    selected = np.array([optimization_results[m][t]['sl_factor'] for m, t in tasks], dtype=float)
+    # Sloupce SL_GRID + vybraný faktor dvojice (u faktoru z gridu duplicitní sloupec
+    # nikdy nevyhraje – při shodě má přednost nižší sloupec)
+    grid = np.column_stack([np.broadcast_to(np.asarray(SL_GRID, dtype=float), (len(rows['is_long']), len(SL_GRID))),
+                            np.repeat(selected, counts)])
+    profits, _ = simulate_trades_vectorized(
+        rows['Open'][:, None], rows['High'][:, None], rows['Low'][:, None], rows['Close'][:, None],
+        rows['Prev_AvgRange'][:, None], rows['is_long'][:, None], grid, COMMISSION_PCT
+    )
+    summary = sl_bootstrap.bootstrap_sl_grid(profits, counts, n_boot, seed)
+    
+    for i, (m, t) in enumerate(tasks):
+        best = optimization_results[m][t]
+        in_grid = best['sl_factor'] in SL_GRID
+        k = SL_GRID.index(best['sl_factor']) if in_grid else len(SL_GRID)
+        cols = slice(0, len(SL_GRID) if in_grid else len(SL_GRID) + 1)
+        best['bootstrap'] = {
+            'n_boot': n_boot,
+            'ci_level': sl_bootstrap.CI_LEVEL,
+            'sl_grid': SL_GRID if in_grid else SL_GRID + [best['sl_factor']],
+            'sharpe': [round(float(v), 4) for v in summary['sharpe'][i, cols]],
+            'sharpe_ci': [[round(float(lo), 4), round(float(hi), 4)]
+                          for lo, hi in zip(summary['ci_low'][i, cols], summary['ci_high'][i, cols])],
+            'p_best': [round(float(v), 4) for v in summary['p_best'][i, cols]],
+            'selected_p_best': round(float(summary['p_best'][i, k]), 4),
+        }
+    return len(tasks)
 
-                elif mode=="V":
-                    if prev['Prev_High']>prev['Prev_High20_Strict']:
-                        signal=True
-                        score=ticker_performance[mode].get(t,0)
+def top_k_per_row(scores, k):
+    """
+    Pro každý řádek matice vrátí sloupce s k nejvyššími skóre (sestupně).
+    Při shodě skóre má přednost nižší sloupec – stejně jako stabilní sorted().
+    Buňky s -inf nejsou kandidáti, chybějící pozice jsou -1.
+    """
+    n_rows, n_cols = scores.shape
+    out = np.full((n_rows, k), -1, dtype=int)
+    if n_cols == 0 or k == 0:
+        return out
+    kk = min(k, n_cols)
+    # k-tá největší hodnota každého řádku přes partition (O(n) místo plného sortu)
+    kth = np.partition(scores, n_cols - kk, axis=1)[:, n_cols - kk]
+    for i in range(n_rows):
+        row = scores[i]
+        cand = np.flatnonzero((row >= kth[i]) & (row > -np.inf))
+        order = cand[np.argsort(-row[cand], kind='stable')][:kk]
+        out[i, :len(order)] = order
+    return out
 
-                elif mode=="M":
-                    signal=True
-                    score=prev['Day_Return_Pct']
+def _tail_rows(arr, rows, fill):
+    """Posledních `rows` řádků matice, zepředu doplněno hodnotou `fill`"""
+    if arr.shape[0] >= rows:
+        return arr[-rows:]
+    pad = np.full((rows - arr.shape[0],) + arr.shape[1:], fill, dtype=arr.dtype)
+    return np.concatenate([pad, arr])
 
-                if signal:
-                    sl = optimized_sl[mode].get(t,0.5)
-                    candidates.append({
-                        "ticker":t,
-                        "side":side,
-                        "score":score,
-                        "sl":sl,
-                        "row":now
-                    })
+def _strategy_scores(signals, mode, cols, ticker_performance, tickers):
+    """Skóre kandidátů (řádky × tickery); nesignální buňky jsou -inf"""
+    sig = signals[mode]
+    if sig['score'] is None:
+        perf = np.array([ticker_performance[mode].get(t, 0) for t in tickers], dtype=float)
+        score = np.broadcast_to(perf, (sig['mask'].shape[0], len(tickers)))
+    else:
+        score = sig['score'][:, cols]
+    return np.where(sig['mask'][:, cols], score, -np.inf)
 
-            top3 = sorted(candidates,key=lambda x:x["score"],reverse=True)[:3]
+def run_backtest_60d(panel, signals, optimized_sl, ticker_performance, days=BACKTEST_DAYS, top_k=TOP_K):
+    """
+    Backtest posledních `days` dní nad panelem featur (matice dny × tickery).
+    Pro full historii stačí days=panel.n_rows - 1.
+    """
+    print(f"\n{'='*70}")
+    print(f"📊 BACKTEST POSLEDNÍCH {days} DNÍ")
+    print(f"{'='*70}\n")
 
-            day_pnl=0
+    backtest_results = {}
+    rows = days + 1
 
-            for tr in top3:
+    for mode in strategies.STRATEGY_MODES:
 
-                pnl,hit = simulate_trade_with_sl(
-                    tr["row"],
-                    tr["side"],
-                    tr["sl"],
-                    COMMISSION_PCT
-                )
+        print(f"\n🎯 Strategie {mode}")
+        print("-"*70)
+
+        tickers = [t for t in dict.fromkeys(STRATEGY_TICKER_GROUPS[mode]) if t in panel]
+        positions = [panel.position[t] for t in tickers]
+
+        def col(name):
+            return _tail_rows(panel.columns[name][:, positions], rows, np.nan)
+
+        # Řádek i odpovídá day_offset = days - i; 'prev' = řádek i, 'now' = řádek i + 1
+        scores = _tail_rows(_strategy_scores(signals, mode, positions, ticker_performance, tickers), rows, -np.inf)[:-1]
+        is_long = _tail_rows(signals[mode]['is_long'][:, positions], rows, True)[:-1]
+        picks = top_k_per_row(scores, top_k)
 
-                day_pnl += pnl
+        day_idx, slot = np.nonzero(picks >= 0)
+        picked = picks[day_idx, slot]
+        now = day_idx + 1
+        sl = np.array([optimized_sl[mode].get(t, 0.5) for t in tickers], dtype=float)
 
-                trades.append({
-                    "date":str(tr["row"].name),
-                    "ticker":tr["ticker"],
-                    "side":tr["side"],
-                    "profit":round(pnl,2),
-                    "hit_sl":hit
-                })
+        pnl, hit = simulate_trades_vectorized(
+            col('Open')[now, picked], col('High')[now, picked], col('Low')[now, picked],
+            col('Close')[now, picked], col('Prev_AvgRange')[now, picked],
+            is_long[day_idx, picked], sl[picked], COMMISSION_PCT
+        )
 
-            equity += day_pnl
+        equity = 10000
+        equity_curve = [equity]
+        trades = []
+        day_pnl = [0] * days
+
+        for i, j, p, h in zip(day_idx, picked, pnl, hit):
+            t = tickers[j]
+            day_offset = days - i
+            day_pnl[i] += float(p)
+            trades.append({
+                "date":str(panel.dates[t][-day_offset]),
+                "ticker":t,
+                "side":"Long" if is_long[i, j] else "Short",
+                "profit":round(float(p),2),
+                "hit_sl":bool(h)
+            })
+
+        for p in day_pnl:
+            equity += p
             equity_curve.append(round(equity,2))
 
         dd = calculate_max_drawdown(equity_curve)
@@ -470,9 +938,9 @@ def calculate_max_drawdown(equity_curve):
             max_dd = dd
     return max_dd
 
-def generate_signals_for_tomorrow(ticker_data, optimized_sl, ticker_performance):
+def generate_signals_for_tomorrow(panel, signals, optimized_sl, ticker_performance, top_k=TOP_K):
     """
-    Generuje signály pro zítřejší den.
+    Generuje signály pro zítřejší den (poslední řádek signální matice).
     """
     print(f"\n{'='*70}")
     print(f"🎯 GENERACE SIGNÁLŮ PRO ZÍTŘEK")
@@ -480,71 +948,39 @@ def generate_signals_for_tomorrow(ticker_data, optimized_sl, ticker_performance)
     
     final_signals = {}
     
-    for mode in ['A', 'B', 'V', 'M']:
-        allowed_tickers = STRATEGY_TICKER_GROUPS[mode]
-        filtered_data = {t: ticker_data[t] for t in allowed_tickers if t in ticker_data}
+    for mode in strategies.STRATEGY_MODES:
+        tickers = [t for t in dict.fromkeys(STRATEGY_TICKER_GROUPS[mode]) if t in panel]
+        cols = [panel.position[t] for t in tickers]
         ticker_group = 'BIG + ETF' if mode in ['A', 'B'] else 'SMALL'
         
         print(f"\nStrategie {mode} ({ticker_group}):")
         
-        candidates = []
-        
-        for t in filtered_data:
-            row = ticker_data[t].iloc[-1]
-            is_signal = False
-            side = 'Long'
-            score = 0
-            
-            if mode == 'A':
-                dist_h = abs(row['Prev_Close'] - row['Prev_High20_Strict']) / (row['Prev_AvgRange'] + 1e-9)
-                if dist_h < 0.4: 
-                    is_signal = True
-                    side = 'Long'
-                    score = ticker_performance[mode].get(t, 0)
-            elif mode == 'B':
-                if row['Prev_Volume'] > row['Prev_V_Avg'] * 1.5:
-                    is_signal = True
-                    side = 'Long' if row['Prev_Close'] > row['Prev_Open'] else 'Short'
-                    score = ticker_performance[mode].get(t, 0)
-            elif mode == 'V':
-                if row['Prev_High'] > row['Prev_High20_Strict']:
-                    is_signal = True
-                    side = 'Long'
-                    score = ticker_performance[mode].get(t, 0)
-            elif mode == 'M':
-                is_signal = True
-                side = 'Long'
-                score = row['Day_Return_Pct']
-
-            if is_signal:
-                sl_factor = optimized_sl[mode].get(t, 0.5)
-                
-                candidates.append({
-                    'ticker': t, 
-                    'side': side, 
-                    'score': score,
-                    'sl_factor': sl_factor,
-                    'ticker_group': ticker_group,
-                    'current_vol': row['Prev_Volume'] / row['Prev_V_Avg'] if row['Prev_V_Avg'] > 0 else 1.0
-                })
-        
-        sel = sorted(candidates, key=lambda x: x['score'], reverse=True)[:3]
+        scores = _strategy_scores(signals, mode, cols, ticker_performance, tickers)[-1:]
+        num_candidates = int(np.isfinite(scores).sum())
+        picks = [j for j in top_k_per_row(scores, top_k)[0] if j >= 0]
         
-        final_signals[mode] = [
-            {
-                'ticker': s['ticker'],
-                'action': s['side'],
+        final_signals[mode] = []
+        for j in picks:
+            t = tickers[j]
+            c = cols[j]
+            score = scores[0, j]
+            prev_volume = panel.columns['Prev_Volume'][-1, c]
+            prev_v_avg = panel.columns['Prev_V_Avg'][-1, c]
+            # Průměrný range posledních 20 dní (bez dne obchodu) – SL vzdálenost pro zítřejší vyhodnocení
+            avg_range = float(mean_range(panel.columns['High'][-20:, c], panel.columns['Low'][-20:, c]))
+            final_signals[mode].append({
+                'ticker': t,
+                'action': 'Long' if signals[mode]['is_long'][-1, c] else 'Short',
                 'allocation_usd': ALLOCATION_USD,
-                'sl_factor': round(s['sl_factor'], 2),
-                'z_score': round(s['score'], 2) if mode != 'M' else None,
-                'prev_return_pct': round(s['score'] * 100, 2) if mode == 'M' else None,
-                'vol_ratio': round(s['current_vol'], 2),
-                'ticker_group': s['ticker_group']
-            }
-            for s in sel
-        ]
+                'sl_factor': round(optimized_sl[mode].get(t, 0.5), 2),
+                'z_score': round(float(score), 2) if mode != 'M' else None,
+                'prev_return_pct': round(float(score) * 100, 2) if mode == 'M' else None,
+                'vol_ratio': round(float(prev_volume / prev_v_avg if prev_v_avg > 0 else 1.0), 2),
+                'avg_range': round(avg_range, 4) if np.isfinite(avg_range) else None,
+                'ticker_group': ticker_group
+            })
         
-        print(f"  Kandidáti: {len(candidates)} → TOP 3:")
+        print(f"  Kandidáti: {num_candidates} → TOP {top_k}:")
         for sig in final_signals[mode]:
             if mode == 'M':
                 print(f"    • {sig['ticker']:6s} {sig['action']:5s} ({sig['ticker_group']:>10s}) | SL={sig['sl_factor']:.2f} | Ret={sig['prev_return_pct']:+.2f}%")
@@ -553,103 +989,377 @@ def generate_signals_for_tomorrow(ticker_data, optimized_sl, ticker_performance)
     
     return final_signals
 
-def run_agent():
+def run_param_sweep(panel, days=PARAM_SWEEP_DAYS, grid=None, top_ks=PARAM_SWEEP_TOP_K, sl_factors=PARAM_SWEEP_SL):
     """
-    VEČERNÍ REŽIM (Evening-only):
-    1. Vyhodnotí dnešní signály na 5min datech
-    2. Uloží výsledky do CSV
-    3. Přepočítá SL optimization
-    4. Vygeneruje signály pro zítřek
-    5. Uloží všechny soubory
+    Backtest posledních `days` dní (jako run_backtest_60d) pro každou
+    kombinaci parametrů strategie × top-k × SL faktor. z-score tickerů
+    a per-ticker SL ('opt') se pro každý práh přepočítají z historického
+    okna jako v optimize_pair, takže výchozí parametry s TOP_K a 'opt' dají
+    stejná čísla jako večerní běh s OPTIMIZE_MODE=full.
+    Vrací (DataFrame výsledků, {mode: {'default', 'pareto'}}); tabulka je
+    seřazená podle strategie a pořadí (profit, pak nižší drawdown).
     """
-    print(f"🚀 TRADING AGENT - EVENING MODE")
-    print(f"📅 Datum: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    grid = PARAM_SWEEP_GRID if grid is None else grid
+    top_ks = np.array(sorted(set(top_ks)), dtype=int)
+    k_max = int(top_ks[-1])
+    fixed = np.array([s for s in sl_factors if s != 'opt'], dtype=float)
+    with_opt = 'opt' in sl_factors
+    sl_labels = fixed.tolist() + (['opt'] if with_opt else [])
+    sl_grid = np.asarray(SL_GRID, dtype=float)
+    rows = days + 1
+    hist_len = max(panel.n_rows - 65, 0)
+    records = []
+
+    for mode in strategies.STRATEGY_MODES:
+        tickers = [t for t in dict.fromkeys(STRATEGY_TICKER_GROUPS[mode]) if t in panel]
+        if not tickers:
+            continue
+        n_tickers = len(tickers)
+        cols = {c: panel.column(c, tickers) for c in _STATS_COLUMNS}
+        # Řádky 'now' backtestu (obchod signálu z řádku i) a historické okno optimalizace
+        # (řádky před prvním platným řádkem tickeru nikdy nesignalizují)
+        now = {c: _tail_rows(v, rows, np.nan)[1:] for c, v in cols.items()}
+        ret = panel.column('Day_Return_Pct', tickers)[:hist_len]
+        hist_profits, hist_long = None, None
+
+        # 1) Jednou na hodnotu prahu: maska, z-score tickerů, per-ticker SL a pořadí pro k_max
+        points = []
+        for params in param_sweep.grid_points(grid.get(mode, {})):
+            mask, is_long, score = strategies.evaluate_strategy(
+                mode, lambda name: panel.column(name, tickers), params)
+            hist_mask = mask[:hist_len]
+            perf = param_sweep.masked_z(ret, hist_mask, mean_only=(mode == 'M'))
+            opt_sl = None
+            if with_opt:
+                # Profity historie pro SL_GRID nezávisí na prahu, jen na směru obchodu
+                if hist_long is None or not np.array_equal(hist_long, is_long[:hist_len]):
+                    hist_long = is_long[:hist_len]
+                    hist_profits, _ = simulate_trades_vectorized(
+                        *(cols[c][:hist_len, :, None] for c in _STATS_COLUMNS),
+                        hist_long[:, :, None], sl_grid, COMMISSION_PCT)
+                z = param_sweep.masked_z(hist_profits, hist_mask[:, :, None])
+                opt_sl = np.where(hist_mask.sum(axis=0) >= 3, sl_grid[np.argmax(z, axis=1)], 0.5)
+            sig = {mode: {'mask': mask, 'is_long': is_long, 'score': score}}
+            scores = _strategy_scores(sig, mode, np.arange(n_tickers), {mode: dict(zip(tickers, perf))}, tickers)
+            picks = top_k_per_row(_tail_rows(scores, rows, -np.inf)[:-1], k_max)
+            points.append((params, picks, _tail_rows(is_long, rows, True)[:-1], opt_sl))
+
+        # 2) Pevné SL faktory: každý vybraný obchod (den, ticker, směr) se simuluje jednou
+        #    pro všechny faktory, i když ho vybere víc prahů
+        keys = []
+        for _, picks, is_long, _ in points:
+            day_idx, slot = np.nonzero(picks >= 0)
+            picked = picks[day_idx, slot]
+            keys.append((day_idx * n_tickers + picked) * 2 + is_long[day_idx, picked])
+        cells, inverse = np.unique(np.concatenate(keys), return_inverse=True)
+        cell_long = (cells % 2).astype(bool)
+        cell_day, cell_col = np.divmod(cells // 2, n_tickers)
+        outcomes, _ = simulate_trades_vectorized(
+            *(now[c][cell_day, cell_col][:, None] for c in _STATS_COLUMNS),
+            cell_long[:, None], fixed[None, :], COMMISSION_PCT)
+
+        # 3) Denní P&L pro každé k je kumulativní součet přes sloty pořadí
+        offset = 0
+        for (params, picks, is_long, opt_sl), key in zip(points, keys):
+            day_idx, slot = np.nonzero(picks >= 0)
+            picked = picks[day_idx, slot]
+            pnl = np.zeros((days, k_max, len(sl_labels)))
+            pnl[day_idx, slot, :len(fixed)] = outcomes[inverse[offset:offset + len(key)]]
+            offset += len(key)
+            if with_opt:
+                pnl[day_idx, slot, -1], _ = simulate_trades_vectorized(
+                    *(now[c][day_idx, picked] for c in _STATS_COLUMNS),
+                    is_long[day_idx, picked], opt_sl[picked], COMMISSION_PCT)
+            total, dd = param_sweep.equity_metrics(np.cumsum(pnl, axis=1)[:, top_ks - 1])
+            num_trades = np.cumsum((picks >= 0).sum(axis=0))[top_ks - 1]
+            for a, k in enumerate(top_ks):
+                for b, sl in enumerate(sl_labels):
+                    records.append(dict(params, strategy=mode, top_k=int(k), sl_factor=sl,
+                                        total_profit=round(float(total[a, b]), 2),
+                                        max_drawdown=round(float(dd[a, b]), 2),
+                                        num_trades=int(num_trades[a])))
+
+    param_cols = list(dict.fromkeys(p for mode in strategies.STRATEGY_MODES for p in grid.get(mode, {})))
+    columns = ['strategy', 'rank'] + param_cols + ['top_k', 'sl_factor', 'total_profit', 'max_drawdown',
+                                                   'num_trades', 'pareto']
+    results = pd.DataFrame.from_records(records, columns=[c for c in columns if c not in ('rank', 'pareto')])
+    results['pareto'] = False
+    for mode, idx in results.groupby('strategy', sort=False).groups.items():
+        front = param_sweep.pareto_front(results.loc[idx, 'total_profit'].to_numpy(),
+                                         results.loc[idx, 'max_drawdown'].to_numpy())
+        results.loc[idx[front], 'pareto'] = True
+    order = {m: i for i, m in enumerate(strategies.STRATEGY_MODES)}
+    results = results.sort_values(['strategy', 'total_profit', 'max_drawdown'], ascending=[True, False, True],
+                                  kind='stable', key=lambda s: s.map(order) if s.name == 'strategy' else s)
+    results['rank'] = results.groupby('strategy').cumcount() + 1
+    results = results[columns].reset_index(drop=True)
+
+    summary = {}
+    for mode, part in results.groupby('strategy', sort=False):
+        part = part.dropna(axis=1, how='all')
+        default = dict(strategies.STRATEGIES[mode]['params'], top_k=TOP_K, sl_factor='opt')
+        is_default = np.logical_and.reduce([(part[c] == v).to_numpy() for c, v in default.items()])
+        summary[mode] = {
+            'default': part[is_default].to_dict('records')[0] if is_default.any() else None,
+            'pareto': part[part['pareto']].sort_values('max_drawdown').to_dict('records'),
+        }
+    return results, summary
+
+def _signal_avg_ranges(panel, rows, cols):
+    """avg_range signálu jako generate_signals_for_tomorrow: mean_range 20 řádků do `rows` včetně"""
+    window = rows[:, None] + np.arange(-19, 1)[None, :]
+    take = np.maximum(window, 0)
+    high = np.where(window >= 0, panel.columns['High'][take, cols[:, None]], np.nan)
+    return mean_range(high, panel.columns['Low'][take, cols[:, None]], axis=1)
+
+def run_intraday_replay(panel, signals, optimized_sl, ticker_performance, archive, start=None, end=None,
+                        top_k=TOP_K, batch=REPLAY_BATCH):
+    """
+    Backtest nad archivem 5min barů (bar_archive.BarArchive): každé sezení D
+    z archivu se přehraje jako večer dne D. Signály se vyberou z posledního
+    řádku panelu před D jako v generate_signals_for_tomorrow (včetně
+    zaokrouhlení SL a avg_range v signálu) a vyhodnotí stejně jako večer
+    (fill_intraday_positions) na barech dne D čtených přímo z memmapu.
+    Řádky panelu tvoří společný kalendář, jako v run_backtest_60d.
+    U každé strategie je pro porovnání i profit stejných obchodů se stejným
+    stopem simulovaných na denním baru D ('daily_total_profit').
+    """
+    longest = panel.tickers[int(np.argmax(panel.lengths))]
+    calendar = panel.dates[longest].values.astype('datetime64[D]')
+    first_row = panel.n_rows - len(calendar)
+
+    sessions = archive.sessions()
+    if start is not None:
+        sessions = sessions[sessions >= np.datetime64(start, 'D')]
+    if end is not None:
+        sessions = sessions[sessions <= np.datetime64(end, 'D')]
+    # Signální řádek = poslední řádek panelu před sezením
+    pos = np.searchsorted(calendar, sessions, side='left')
+    sessions, pos = sessions[pos > 0], pos[pos > 0]
+    sig_rows = first_row + pos - 1
+    # Denní bar sezení (jen pro porovnání), pokud už v panelu je
+    has_day = (pos < len(calendar)) & (calendar[np.minimum(pos, len(calendar) - 1)] == sessions)
+    now_rows = np.where(has_day, sig_rows + 1, -1)
+
+    print(f"\n{'='*70}")
+    print(f"⏪ INTRADENNÍ REPLAY NA 5MIN BARECH ({len(sessions)} sezení)")
     print(f"{'='*70}\n")
-    
-    # KROK 1: Vyhodnoť dnešní signály na 5min datech
-    evaluated_trades = evaluate_todays_signals_on_5min_data()
-    
-    # KROK 2: Stáhni data pro generaci zítřejších signálů
+
+    results = {}
+    for mode in strategies.STRATEGY_MODES:
+        tickers = [t for t in dict.fromkeys(STRATEGY_TICKER_GROUPS[mode]) if t in panel]
+        cols = np.array([panel.position[t] for t in tickers], dtype=int)
+
+        scores = _strategy_scores(signals, mode, cols, ticker_performance, tickers)[sig_rows]
+        picks = top_k_per_row(scores, top_k)
+        day_idx, slot = np.nonzero(picks >= 0)
+        picked = picks[day_idx, slot]
+        rows, c = sig_rows[day_idx], cols[picked]
+
+        is_long = signals[mode]['is_long'][rows, c]
+        sl_factor = np.array([round(optimized_sl[mode].get(t, 0.5), 2) for t in tickers], dtype=float)[picked]
+        avg_range = np.array([round(float(v), 4) for v in _signal_avg_ranges(panel, rows, c)], dtype=float)
+        start_bar, count = archive.locate([tickers[j] for j in picked], sessions[day_idx])
+
+        pnl = np.zeros(len(picked))
+        hit = np.zeros(len(picked), dtype=bool)
+        touch = np.full(len(picked), np.datetime64('NaT'), dtype='datetime64[ns]')
+        traded = np.flatnonzero(count > 0)
+        for b in range(0, len(traded), batch):
+            part = traded[b:b + batch]
+            bars, times, counts = archive.stack(start_bar[part], count[part])
+            _, pnl[part], fills = fill_intraday_positions(bars, counts, times, is_long[part],
+                                                          sl_factor[part], avg_range[part])
+            hit[part] = fills['hit']
+            touch[part] = fills['touch_time']
+
+        # Stejné obchody a stop na denním baru sezení
+        daily = traded[now_rows[day_idx[traded]] >= 0]
+        r, cc = now_rows[day_idx[daily]], c[daily]
+        open_ = panel.columns['Open'][r, cc]
+        sl_distance = np.where(np.isnan(avg_range[daily]), open_ * 0.02, sl_factor[daily] * avg_range[daily])
+        daily_pnl, _ = simulate_trades_vectorized(open_, panel.columns['High'][r, cc], panel.columns['Low'][r, cc],
+                                                  panel.columns['Close'][r, cc], sl_distance, is_long[daily],
+                                                  1.0, COMMISSION_PCT)
+
+        day_pnl = np.bincount(day_idx[traded], weights=pnl[traded], minlength=len(sessions))
+        equity_curve = [10000] + [round(float(e), 2) for e in 10000 + np.cumsum(day_pnl)]
+        total_profit = round(float(day_pnl.sum()), 2)
+        dd = calculate_max_drawdown(equity_curve)
+
+        results[mode] = {
+            "equity_curve": equity_curve,
+            "num_trades": len(traded),
+            "missing_bars": int(len(picked) - len(traded)),
+            "bars_scanned": int(count.sum()),
+            "total_profit": total_profit,
+            "max_drawdown": round(dd, 2),
+            "sl_hit_rate": round(float(hit[traded].mean() * 100), 2) if len(traded) else 0.0,
+            "daily_total_profit": round(float(np.nansum(daily_pnl)), 2),
+            "trades": [
+                {
+                    "date": str(sessions[day_idx[i]]),
+                    "ticker": tickers[picked[i]],
+                    "side": "Long" if is_long[i] else "Short",
+                    "profit": round(float(pnl[i]), 2),
+                    "hit_sl": bool(hit[i]),
+                    "touch_time": str(touch[i])[:19] if hit[i] else None
+                }
+                for i in traded
+            ]
+        }
+
+        print(f"🎯 {mode}: profit {total_profit:,.2f} (denní bary {results[mode]['daily_total_profit']:,.2f}) "
+              f"trades: {len(traded)} maxDD: {round(dd, 2)} bez 5min barů: {results[mode]['missing_bars']}")
+
+    return results
+
+class StageError(Exception):
+    """Fáze nemůže pokračovat (chybí data nebo mezivýsledek předchozí fáze)"""
+
+
+def _write_artifact(path, payload):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    payload = dict(payload, created=datetime.now().isoformat())
+    tmp = path + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(payload, f, separators=(',', ':'))
+    os.replace(tmp, path)
+
+
+def _read_artifact(path, stage):
+    if not os.path.exists(path):
+        raise StageError(f"Chybí výstup fáze '{stage}' ({path}) – spusť nejdřív: python agent.py {stage}")
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def _require_provider(ctx):
+    """Provider se vytvoří až pro fázi, která sahá na data (výchozí podle DATA_PROVIDER)"""
+    if ctx.get('provider') is None:
+        ctx['provider'] = market_data.get_provider(data_dir=DATA_DIR)
+        print(f"📡 Zdroj dat: {ctx['provider'].name}")
+    return ctx['provider']
+
+
+def stage_evaluate(tel, ctx):
+    """Vyhodnotí včerejší signály na 5min datech a zapíše je do logu obchodů"""
+    # Log existuje i před prvním vyhodnoceným obchodem (workflow ho commituje)
+    trade_log.ensure_log(TRADE_LOG_DIR)
+    with tel.stage('evaluate') as st:
+        evaluated_trades = evaluate_todays_signals_on_5min_data(ctx['provider'])
+        st['rows'] = len(evaluated_trades)
+
+
+def stage_fetch(tel, ctx):
+    """
+    Stáhne denní bary. Bary zůstanou na disku
+    (bar_cache, u lokálních zdrojů snapshot v STAGE_BARS_DIR) a fetch.json
+    říká, odkud je další fáze načtou.
+    """
+    provider = _require_provider(ctx)
     print(f"\n{'='*70}")
     print(f"📥 STAHOVÁNÍ DAT PRO GENERACI ZÍTŘEJŠÍCH SIGNÁLŮ")
     print(f"{'='*70}\n")
     
-    try:
-        raw = yf.download(ALL_TICKERS, period="8y", interval="1d", group_by='ticker', progress=False)
-    except Exception as e:
-        print(f"❌ Chyba při stahování dat: {e}")
-        return
-    
-    ticker_data = {}
-    for t in ALL_TICKERS:
-        try:
-            if t not in raw.columns.get_level_values(0):
-                continue
-            d = raw[t].dropna().copy()
-            if len(d) < 100:
-                continue
-            
-            d['Prev_High20_Strict'] = d['High'].rolling(window=20).max().shift(2)
-            d['Prev_Low20_Strict'] = d['Low'].rolling(window=20).min().shift(2)
-            d['Prev_Range'] = (d['High'] - d['Low']).shift(1)
-            d['Prev_AvgRange'] = d['Prev_Range'].rolling(window=20).mean()
-            d['Prev_Close'] = d['Close'].shift(1)
-            d['Prev_Open'] = d['Open'].shift(1)
-            d['Prev_Volume'] = d['Volume'].shift(1)
-            d['Prev_V_Avg'] = d['Volume'].rolling(window=20).mean().shift(1)
-            d['Prev_High'] = d['High'].shift(1)
-            d['Day_Return_Pct'] = (d['Close'] - d['Open']) / d['Open']
-            
-            d_clean = d.dropna()
-            if len(d_clean) >= 100:
-                ticker_data[t] = d_clean
-        except:
-            continue
+    with tel.stage('download', provider=provider.name) as st:
+        cache_stats = {}
+        if provider.cacheable:
+            raw_data = bar_cache.update_daily_bars(ALL_TICKERS, provider.daily, years=HISTORY_YEARS,
+                                                   cache_dir=BAR_CACHE_DIR, stats=cache_stats)
+            bars_dir = BAR_CACHE_DIR
+        else:
+            # Lokální zdroje (replay, synthetic) se čtou přímo, bez bar_cache
+            raw_data = provider.daily(ALL_TICKERS, period=f"{HISTORY_YEARS}y")
+            bars_dir = STAGE_BARS_DIR
+            for t, df in raw_data.items():
+                bar_cache.save_ticker_bars(t, df, bars_dir)
+        st['tickers'] = len(raw_data)
+        st['rows'] = sum(len(df) for df in raw_data.values())
+        st.update(cache_stats)
+        if getattr(provider, 'failures', None):
+            st['failed'] = len(provider.failures)
+    if not raw_data:
+        raise StageError("Chyba při stahování dat: žádná data")
     
-    print(f"✅ Načteno {len(ticker_data)} tickerů\n")
+    _write_artifact(FETCH_ARTIFACT, {'provider': provider.name, 'bars_dir': bars_dir,
+                                     'tickers': list(raw_data)})
+    ctx['raw_data'] = raw_data
+
+
+def _load_fetched_bars(tel):
+    """Denní bary z výstupu fáze fetch (bez sítě)"""
+    fetched = _read_artifact(FETCH_ARTIFACT, 'fetch')
+    with tel.stage('load_bars', provider=fetched['provider']) as st:
+        raw_data = {}
+        for t in fetched['tickers']:
+            df = bar_cache.load_ticker_bars(t, fetched['bars_dir'])
+            if df is not None and not df.empty:
+                raw_data[t] = df
+        st['tickers'] = len(raw_data)
+        st['rows'] = sum(len(df) for df in raw_data.values())
+    if not raw_data:
+        raise StageError(f"Výstup fáze fetch v {fetched['bars_dir']} neobsahuje žádné bary")
+    print(f"📂 Bary z fáze fetch ({fetched['created'][:19]}, {fetched['provider']}): {len(raw_data)} tickerů")
+    return raw_data
+
+
+def _require_panel(tel, ctx):
+    """Panel featur a signální matice – v běhu 'all' se spočítají jen jednou"""
+    if 'panel' not in ctx:
+        raw_data = ctx.get('raw_data') or _load_fetched_bars(tel)
+        with tel.stage('features') as st:
+            panel = features.build_feature_panel(raw_data, ALL_TICKERS)
+            # Signály všech strategií jednou pro celý panel – sdílí je optimalizace, backtest i generace
+            ctx['signals'] = strategies.compute_signal_matrix(panel)
+            st['tickers'] = len(panel)
+            st['rows'] = int(panel.lengths.sum())
+        ctx['panel'] = panel
+        print(f"✅ Načteno {len(panel)} tickerů\n")
+    return ctx['panel'], ctx['signals']
+
+
+def _require_optimization(ctx):
+    """(ticker_performance, optimized_sl) z fáze optimize"""
+    if 'optimized_sl' not in ctx:
+        optimized = _read_artifact(OPTIMIZE_ARTIFACT, 'optimize')
+        ctx['ticker_performance'] = optimized['ticker_performance']
+        ctx['optimized_sl'] = optimized['optimized_sl']
+    return ctx['ticker_performance'], ctx['optimized_sl']
+
+
+def stage_optimize(tel, ctx):
+    """Grid search SL a z-score dvojic (strategie, ticker)"""
+    panel, signals = _require_panel(tel, ctx)
     
-    # Grid search pro SL
     print(f"{'='*70}")
     print(f"🔍 GRID SEARCH PRO OPTIMÁLNÍ STOP LOSS")
     print(f"{'='*70}\n")
     
-    ticker_performance = {m: {} for m in ['A', 'B', 'V', 'M']}
-    optimized_sl = {m: {} for m in ['A', 'B', 'V', 'M']}
-    optimization_results = {m: {} for m in ['A', 'B', 'V', 'M']}
+    # Počet workerů se zapisuje jen tam, kde ho optimalizace používá (full)
+    info = {'workers': OPTIMIZE_WORKERS} if OPTIMIZE_MODE not in ('incremental', 'sweep') else {}
+    with tel.stage('optimize', mode=OPTIMIZE_MODE, **info) as st:
+        if OPTIMIZE_MODE == 'incremental':
+            ticker_performance, optimized_sl, optimization_results = optimize_all_strategies_incremental(
+                panel, signals, SL_STATS_FILE, rebuild=OPTIMIZE_REBUILD, verify=OPTIMIZE_VERIFY, stats=st)
+        elif OPTIMIZE_MODE == 'sweep':
+            ticker_performance, optimized_sl, optimization_results = optimize_all_strategies_sweep(
+                panel, signals, exact=SL_SWEEP_EXACT)
+        else:
+            ticker_performance, optimized_sl, optimization_results = optimize_all_strategies(panel, signals, OPTIMIZE_WORKERS)
+        st['tickers'] = len(panel)
+        st['rows'] = sum(len(v) for v in optimized_sl.values())
     
-    for mode_strat in ['A', 'B', 'V', 'M']:
-        allowed_tickers = STRATEGY_TICKER_GROUPS[mode_strat]
-        
-        for t in allowed_tickers:
-            if t not in ticker_data:
-                continue
-            df = ticker_data[t]
-            hist_df = df.iloc[:-65]
-            
-            if mode_strat == 'A':
-                sig_df = hist_df[abs(hist_df['Prev_Close'] - hist_df['Prev_High20_Strict']) / hist_df['Prev_AvgRange'] < 0.4]
-            elif mode_strat == 'B':
-                sig_df = hist_df[hist_df['Prev_Volume'] > hist_df['Prev_V_Avg'] * 1.5]
-            elif mode_strat == 'V':
-                sig_df = hist_df[hist_df['Prev_High'] > hist_df['Prev_High20_Strict']]
-            elif mode_strat == 'M':
-                sig_df = hist_df.copy()
-            
-            if len(sig_df) < 3:
-                ticker_performance[mode_strat][t] = 0
-                optimized_sl[mode_strat][t] = 0.5
-                continue
-            
-            best_sl, best_metrics = optimize_sl_for_ticker_strategy(sig_df, mode_strat, t)
-            
-            if mode_strat == 'M':
-                z_score = np.mean(sig_df['Day_Return_Pct'])
-            else:
-                z_score = calculate_z_score(sig_df['Day_Return_Pct'])
-            
-            ticker_performance[mode_strat][t] = z_score
-            optimized_sl[mode_strat][t] = best_sl
-            optimization_results[mode_strat][t] = best_metrics
+    # Nejistota výběru SL (jen do reportu, výběr faktoru se nemění)
+    if SL_BOOTSTRAP > 0:
+        with tel.stage('bootstrap', n_boot=SL_BOOTSTRAP) as st:
+            st['rows'] = bootstrap_sl_selection(panel, signals, optimization_results)
+    
+    ticker_performance = {m: {t: float(z) for t, z in v.items()} for m, v in ticker_performance.items()}
+    optimized_sl = {m: {t: float(sl) for t, sl in v.items()} for m, v in optimized_sl.items()}
+    ctx['ticker_performance'] = ticker_performance
+    ctx['optimized_sl'] = optimized_sl
+    _write_artifact(OPTIMIZE_ARTIFACT, {'ticker_performance': ticker_performance, 'optimized_sl': optimized_sl})
     
     # Ulož optimization
     try:
@@ -658,22 +1368,36 @@ def run_agent():
         print(f"\n✅ Optimization uloženy\n")
     except Exception as e:
         print(f"❌ Chyba: {e}\n")
+
+
+def stage_backtest(tel, ctx):
+    """Backtest posledních BACKTEST_DAYS dní a export do public/"""
+    panel, signals = _require_panel(tel, ctx)
+    ticker_performance, optimized_sl = _require_optimization(ctx)
     
-    # Backtest (minimal)
-    backtest_results = run_backtest_60d(ticker_data, optimized_sl, ticker_performance)
+    with tel.stage('backtest', days=BACKTEST_DAYS) as st:
+        backtest_results = run_backtest_60d(panel, signals, optimized_sl, ticker_performance)
+        st['tickers'] = len(panel)
+        st['rows'] = sum(r['num_trades'] for r in backtest_results.values())
 
     # ===== Export do public =====
-    import os
     BACKTEST_FILE = os.path.join("public", "backtest_60d_results.json")
     os.makedirs("public", exist_ok=True)  # zajistí existenci složky
 
     with open(BACKTEST_FILE, "w") as f:
-      json.dump(backtest_results, f, indent=2)
+      json.dump(backtest_results, f, separators=(',', ':'))
 
     print("✅ backtest_60d_results.json exported")
+
+
+def stage_signals(tel, ctx):
+    """Signály pro zítřek do SIGNAL_FILE"""
+    panel, signals = _require_panel(tel, ctx)
+    ticker_performance, optimized_sl = _require_optimization(ctx)
     
-    # Generuj signály pro zítřek
-    final_signals = generate_signals_for_tomorrow(ticker_data, optimized_sl, ticker_performance)
+    with tel.stage('signals') as st:
+        final_signals = generate_signals_for_tomorrow(panel, signals, optimized_sl, ticker_performance)
+        st['rows'] = sum(len(v) for v in final_signals.values())
     
     try:
         with open(SIGNAL_FILE, 'w') as f:
@@ -681,10 +1405,147 @@ def run_agent():
         print(f"\n💾 Signály pro zítřek uloženy do: {SIGNAL_FILE}\n")
     except Exception as e:
         print(f"❌ Chyba: {e}\n")
+
+
+def stage_sweep(tel, ctx):
+    """Sweep parametrů strategií do PARAM_SWEEP_FILE a Pareto front do PARAM_SWEEP_PARETO_FILE"""
+    panel, _ = _require_panel(tel, ctx)
+
+    print(f"\n{'='*70}")
+    print(f"🧪 SWEEP PARAMETRŮ ({PARAM_SWEEP_DAYS} DNÍ)")
+    print(f"{'='*70}\n")
+
+    with tel.stage('param_sweep', days=PARAM_SWEEP_DAYS) as st:
+        results, summary = run_param_sweep(panel)
+        st['tickers'] = len(panel)
+        st['rows'] = len(results)
+
+    for mode, part in results.groupby('strategy', sort=False):
+        best = part.iloc[0]
+        default = summary[mode]['default']
+        print(f"  {mode}: {len(part)} kombinací, Pareto {len(summary[mode]['pareto'])} | "
+              f"nejlepší profit {best['total_profit']:,.2f} (DD {best['max_drawdown']:.2f} %, "
+              f"top_k={best['top_k']}, SL={best['sl_factor']})"
+              + (f" | výchozí {default['total_profit']:,.2f}" if default else ""))
+
+    results.to_csv(PARAM_SWEEP_FILE, index=False)
+    with open(PARAM_SWEEP_PARETO_FILE, 'w') as f:
+        json.dump(summary, f, indent=2)
+    print(f"\n💾 Výsledky sweepu uloženy do: {PARAM_SWEEP_FILE} (Pareto: {PARAM_SWEEP_PARETO_FILE})\n")
+
+
+def stage_archive(tel, ctx):
+    """
+    Archiv 5min barů celého univerza (bar_archive) pro intradenní replay –
+    Yahoo drží 5min historii jen ~60 dní. Archivuje provider sám (yfinance,
+    yahoo); lokální zdroje se přeskočí. Večerní běh archivuje jen bary
+    tickerů ze signálů, které stahuje fáze evaluate; celé univerzum jen na
+    vyžádání, protože archiv v data_cache (actions/cache) není trvalé
+    úložiště.
+    """
+    provider = _require_provider(ctx)
+    if not getattr(provider, 'archive_dir', None):
+        print(f"ℹ️  Zdroj {provider.name} 5min bary nearchivuje – archiv přeskočen\n")
+        return
+    archive_dir = market_data.intraday_archive_dir(provider.archive_dir)
+
+    print(f"\n📼 Archiv 5min barů ({len(ALL_TICKERS)} tickerů, perioda {ARCHIVE_PERIOD})")
+    with tel.stage('archive', provider=provider.name, period=ARCHIVE_PERIOD) as st:
+        before = bar_archive.load_manifest(archive_dir)['n_bars']
+        bars = provider.bars(ALL_TICKERS, period=ARCHIVE_PERIOD, interval="5m")
+        manifest = bar_archive.load_manifest(archive_dir)
+        st['tickers'] = len(bars)
+        st['rows'] = manifest['n_bars'] - before
+    print(f"   ✅ Přidáno {st['rows']} barů, v archivu {manifest['n_bars']} barů / {len(manifest['tickers'])} tickerů\n")
+
+
+def stage_replay(tel, ctx):
+    """Intradenní replay nad archivem 5min barů do REPLAY_FILE"""
+    panel, signals = _require_panel(tel, ctx)
+    ticker_performance, optimized_sl = _require_optimization(ctx)
+    archive = bar_archive.BarArchive(market_data.intraday_archive_dir(DATA_DIR))
+    if not len(archive):
+        raise StageError(f"Archiv 5min barů {archive.archive_dir} je prázdný – spusť nejdřív: python agent.py archive")
+
+    with tel.stage('replay', sessions=len(archive.sessions())) as st:
+        replay_results = run_intraday_replay(panel, signals, optimized_sl, ticker_performance, archive,
+                                             REPLAY_START, REPLAY_END)
+        st['tickers'] = len(archive.tickers)
+        st['rows'] = sum(r['bars_scanned'] for r in replay_results.values())
+
+    with open(REPLAY_FILE, 'w') as f:
+        json.dump(replay_results, f, separators=(',', ':'))
+    print(f"\n💾 Intradenní replay uložen do: {REPLAY_FILE}\n")
+
+
+# Fáze v pořadí běhu; 'all' = DEFAULT_STAGES (archive, sweep a replay jen na vyžádání)
+STAGES = {
+    'evaluate': stage_evaluate,
+    'archive': stage_archive,
+    'fetch': stage_fetch,
+    'optimize': stage_optimize,
+    'backtest': stage_backtest,
+    'signals': stage_signals,
+    'sweep': stage_sweep,
+    'replay': stage_replay,
+}
+DEFAULT_STAGES = ['evaluate', 'fetch', 'optimize', 'backtest', 'signals']
+
+def run_agent(provider=None, stages=None):
+    """
+    VEČERNÍ REŽIM (Evening-only):
+    1. Vyhodnotí dnešní signály na 5min datech (jejich bary jdou do bar_archive)
+    2. Uloží výsledky do CSV
+    3. Přepočítá SL optimization
+    4. Vygeneruje signály pro zítřek
+    5. Uloží všechny soubory
+    `stages` vybere jen některé fáze (výchozí DEFAULT_STAGES, viz STAGES); fáze si
+    předávají data v paměti, a když předchozí fáze neběžela, načtou její
+    výstup z STAGE_DIR.
+    Časy a paměť jednotlivých fází se ukládají do RUN_REPORT_FILE.
+    Data jdou přes `provider` (výchozí podle DATA_PROVIDER, viz market_data);
+    vytvoří se až ve fázi, která ho potřebuje.
+    """
+    stages = [s for s in STAGES if s in (DEFAULT_STAGES if stages is None else stages)]
+    print(f"🚀 TRADING AGENT - EVENING MODE")
+    print(f"📅 Datum: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    if provider is not None:
+        print(f"📡 Zdroj dat: {provider.name}")
+    print(f"🧩 Fáze: {', '.join(stages)}")
+    print(f"{'='*70}\n")
+    
+    tel = telemetry.activate(telemetry.RunTelemetry(PROFILE_STAGE, OUTPUT_DIR))
+    ctx = {'provider': provider}
+    try:
+        for name in stages:
+            STAGES[name](tel, ctx)
+    except StageError as e:
+        print(f"❌ {e}")
+        return False
+    finally:
+        tel.print_summary()
+        try:
+            tel.write(RUN_REPORT_FILE)
+            print(f"\n📈 Run report uložen do: {RUN_REPORT_FILE}")
+        except Exception as e:
+            print(f"❌ Chyba při ukládání run reportu: {e}")
+        telemetry.activate(None)
     
     print(f"{'='*70}")
     print("✅ AGENT DOKONČEN!")
     print(f"{'='*70}\n")
+    return True
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Trading agent – večerní běh nebo jeho jednotlivé fáze')
+    parser.add_argument('stages', nargs='*', metavar='stage',
+                        help=f"fáze ke spuštění: {', '.join(STAGES)} nebo all (výchozí: {', '.join(DEFAULT_STAGES)})")
+    args = parser.parse_args(argv)
+    unknown = [s for s in args.stages if s != 'all' and s not in STAGES]
+    if unknown:
+        parser.error(f"neznámá fáze: {', '.join(unknown)} (možnosti: {', '.join(STAGES)}, all)")
+    stages = None if not args.stages or 'all' in args.stages else args.stages
+    return 0 if run_agent(stages=stages) else 1
 
 if __name__ == "__main__":
-    run_agent()
+    sys.exit(main())
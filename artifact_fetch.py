@@ -0,0 +1,131 @@
+"""
+Načítání artefaktů agenta (CSV log, signály, 60d backtest) pro dashboard.
+
+Pořadí zdrojů pro každý artefakt:
+- lokální soubor (dashboard běží ve stejném workflow, který ho vytvořil),
+- HTTP s diskovou cache validovanou přes ETag / If-Modified-Since
+  (304 = cache hit, tělo se nestahuje),
+- při chybě sítě poslední uložená kopie z cache (stale).
+
+Vzdálené artefakty se stahují souběžně. Základní URL je parametr, takže jde
+nasměrovat i na lokální HTTP server. Jen standardní knihovna (urllib).
+"""
+import json
+import os
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+CACHE_DIR = os.path.join(os.getcwd(), 'data_cache', 'http')
+SOURCES = ('local', 'hit', 'miss', 'stale')
+
+
+def _cache_paths(cache_dir, name):
+    safe = name.replace('/', '_')
+    return os.path.join(cache_dir, safe), os.path.join(cache_dir, safe + '.meta.json')
+
+
+def _read_cached(cache_dir, name, url):
+    """(tělo, meta) z cache, pokud je pro stejnou URL; jinak (None, {})"""
+    body_path, meta_path = _cache_paths(cache_dir, name)
+    try:
+        with open(meta_path, 'r') as f:
+            meta = json.load(f)
+        if meta.get('url') != url:
+            return None, {}
+        with open(body_path, 'rb') as f:
+            return f.read(), meta
+    except (OSError, ValueError):
+        return None, {}
+
+
+def _store(cache_dir, name, body, meta):
+    os.makedirs(cache_dir, exist_ok=True)
+    body_path, meta_path = _cache_paths(cache_dir, name)
+    for path, data, mode in ((body_path, body, 'wb'), (meta_path, json.dumps(meta), 'w')):
+        tmp = path + '.tmp'
+        with open(tmp, mode) as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+
+def fetch_remote(url, name, cache_dir=CACHE_DIR, timeout=10):
+    """
+    Podmíněný GET přes cache. Vrací (tělo, zdroj), zdroj je 'hit' (304),
+    'miss' (staženo) nebo 'stale' (síť selhala, vrácena uložená kopie).
+    Bez sítě i bez cache vyhodí původní chybu.
+    """
+    body, meta = _read_cached(cache_dir, name, url)
+    headers = {}
+    if body is not None:
+        if meta.get('etag'):
+            headers['If-None-Match'] = meta['etag']
+        if meta.get('last_modified'):
+            headers['If-Modified-Since'] = meta['last_modified']
+    try:
+        with urllib.request.urlopen(urllib.request.Request(url, headers=headers), timeout=timeout) as resp:
+            new = resp.read()
+            _store(cache_dir, name, new, {
+                'url': url,
+                'etag': resp.headers.get('ETag'),
+                'last_modified': resp.headers.get('Last-Modified'),
+            })
+            return new, 'miss'
+    except urllib.error.HTTPError as e:
+        if e.code == 304 and body is not None:
+            return body, 'hit'
+        error = e
+    except OSError as e:  # URLError, timeout, odmítnuté spojení
+        error = e
+    if body is not None:
+        return body, 'stale'
+    raise error
+
+
+def _read_local(paths):
+    for path in paths:
+        if os.path.isfile(path):
+            with open(path, 'rb') as f:
+                return f.read(), path
+    return None, None
+
+
+def fetch_artifacts(artifacts, base_url, cache_dir=CACHE_DIR, prefer_local=True,
+                    timeout=10, workers=4, stats=None):
+    """
+    artifacts: {jméno: [lokální cesty]} -> {jméno: tělo (bytes)}.
+    Jméno je zároveň cesta relativně k base_url. Artefakt, který nejde
+    získat, ve výsledku chybí. Do `stats` zapíše zdroj každého artefaktu,
+    počty podle zdroje a chyby.
+    """
+    out, sources, errors = {}, {}, {}
+    remote = []
+    for name, paths in artifacts.items():
+        body, _ = _read_local(paths) if prefer_local else (None, None)
+        if body is not None:
+            out[name] = body
+            sources[name] = 'local'
+        else:
+            remote.append(name)
+
+    def fetch(name):
+        try:
+            return name, fetch_remote(base_url + name, name, cache_dir, timeout), None
+        except Exception as e:
+            return name, (None, None), e
+
+    if remote:
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, len(remote)))) as pool:
+            for name, (body, source), error in pool.map(fetch, remote):
+                if error is not None:
+                    errors[name] = str(error)
+                else:
+                    out[name] = body
+                    sources[name] = source
+
+    if stats is not None:
+        stats['sources'] = sources
+        stats['errors'] = errors
+        for source in SOURCES:
+            stats[source] = sum(1 for s in sources.values() if s == source)
+    return out
@@ -0,0 +1,253 @@
+"""
+Archiv 5min barů v pevné šířce pro memory-mapping.
+
+Každý sloupec je jeden binární soubor (Date jako int64 ns v UTC, ceny
+a objem float64) a bary jednoho (ticker, den) leží za sebou. Index
+(index-N.npy) drží pro každý (ticker, den sezení) offset a počet barů,
+seřazený podle (ticker, den), takže vyhledání je searchsorted a čtení dne
+je jen řez memmapu – bez kopie a bez načtení zbytku archivu.
+
+Zápis je append-only: nové bary se připíšou na konec sloupců, pak se
+zapíše nový index a nakonec manifest.json (n_bars, jméno indexu), který
+je jediným bodem commitu. Nedokončený zápis tak čtenář nevidí a další
+zápis ho ořízne. Přepsaný den (dřív uložený neúplný) nechá staré bary
+v souboru jako mrtvé místo (manifest 'dead_bars').
+"""
+import json
+import os
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+ARCHIVE_DIR = os.path.join(os.getcwd(), 'data_cache', 'intraday_5m')
+MANIFEST_NAME = 'manifest.json'
+ARCHIVE_VERSION = 1
+EXCHANGE_TZ = 'America/New_York'
+COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+DTYPES = {'Date': np.dtype('<i8'), **{c: np.dtype('<f8') for c in COLUMNS}}
+INDEX_DTYPE = np.dtype([('ticker', '<i4'), ('day', '<i4'), ('start', '<i8'), ('count', '<i4')])
+
+
+def _column_path(archive_dir, column):
+    return os.path.join(archive_dir, f"{column}.bin")
+
+
+def _empty_manifest():
+    return {'version': ARCHIVE_VERSION, 'n_bars': 0, 'dead_bars': 0, 'index': None, 'tickers': []}
+
+
+def load_manifest(archive_dir=ARCHIVE_DIR):
+    path = os.path.join(archive_dir, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return _empty_manifest()
+    try:
+        with open(path, 'r') as f:
+            manifest = json.load(f)
+    except Exception:
+        return _empty_manifest()
+    if manifest.get('version') != ARCHIVE_VERSION:
+        return _empty_manifest()
+    return manifest
+
+
+def _load_index(archive_dir, manifest):
+    if not manifest['index']:
+        return np.zeros(0, dtype=INDEX_DTYPE)
+    return np.load(os.path.join(archive_dir, manifest['index']))
+
+
+def _index_keys(tickers, days):
+    return (np.asarray(tickers, dtype=np.int64) << 32) | np.asarray(days, dtype=np.int64)
+
+
+def _session_days(index):
+    """Den sezení (datetime64[D] jako int) v čase burzy"""
+    return index.tz_convert(EXCHANGE_TZ).tz_localize(None).normalize().values.astype('datetime64[D]').astype(np.int64)
+
+
+def _day_segments(df):
+    """DataFrame 5min barů -> [(den, {sloupec: pole})] po dnech sezení"""
+    index = pd.DatetimeIndex(df.index)
+    index = index.tz_localize(EXCHANGE_TZ) if index.tz is None else index
+    order = np.argsort(index.asi8, kind='stable')
+    index = index[order]
+    keep = ~index.duplicated(keep='last')
+    index = index[keep]
+    arrays = {'Date': index.tz_convert('UTC').tz_localize(None).values.astype('datetime64[ns]').astype(np.int64)}
+    for c in COLUMNS:
+        values = df[c].to_numpy(dtype=np.float64) if c in df.columns else np.full(len(order), np.nan)
+        arrays[c] = values[order][keep]
+    days = _session_days(index)
+    bounds = np.flatnonzero(np.diff(days)) + 1
+    starts = np.concatenate([[0], bounds])
+    ends = np.concatenate([bounds, [len(days)]])
+    return [(int(days[a]), {c: v[a:b] for c, v in arrays.items()}) for a, b in zip(starts, ends) if b > a]
+
+
+def append_bars(bars, archive_dir=ARCHIVE_DIR, stats=None):
+    """
+    Přidá 5min bary {ticker: DataFrame} do archivu po dnech sezení. Den,
+    který už v archivu je se stejnými bary, se přeskočí; jiný (typicky dřív
+    uložený neúplný den) se zapíše znovu a index ukáže na novou kopii.
+    """
+    os.makedirs(archive_dir, exist_ok=True)
+    manifest = load_manifest(archive_dir)
+    n_bars = manifest['n_bars']
+    tickers = list(manifest['tickers'])
+    code = {t: i for i, t in enumerate(tickers)}
+    index = _load_index(archive_dir, manifest)
+    position = {(int(t), int(d)): i for i, (t, d) in enumerate(zip(index['ticker'], index['day']))}
+    old = {c: _open_column(archive_dir, c, n_bars) for c in DTYPES}
+
+    added, replaced, unchanged = [], {}, 0
+    chunks = {c: [] for c in DTYPES}
+    offset = n_bars
+    for t, df in bars.items():
+        if df is None or df.empty:
+            continue
+        if t not in code:
+            code[t] = len(tickers)
+            tickers.append(t)
+        for day, arrays in _day_segments(df):
+            count = len(arrays['Date'])
+            i = position.get((code[t], day))
+            if i is not None:
+                a, n = int(index['start'][i]), int(index['count'][i])
+                if n == count and all(np.array_equal(old[c][a:a + n], arrays[c], equal_nan=c != 'Date')
+                                      for c in DTYPES):
+                    unchanged += 1
+                    continue
+                replaced[i] = (offset, count)
+            else:
+                added.append((code[t], day, offset, count))
+            for c in DTYPES:
+                chunks[c].append(arrays[c])
+            offset += count
+    del old
+
+    written = offset - n_bars
+    if written:
+        for c, dtype in DTYPES.items():
+            path = _column_path(archive_dir, c)
+            with open(path, 'ab') as f:
+                # Ořízne konec po nedokončeném zápisu (za manifestem)
+                f.truncate(n_bars * dtype.itemsize)
+            with open(path, 'ab') as f:
+                np.concatenate(chunks[c]).astype(dtype, copy=False).tofile(f)
+
+        dead = 0
+        index = index.copy()
+        for i, (start, count) in replaced.items():
+            dead += int(index['count'][i])
+            index['start'][i], index['count'][i] = start, count
+        if added:
+            index = np.concatenate([index, np.array(added, dtype=INDEX_DTYPE)])
+        index = index[np.argsort(_index_keys(index['ticker'], index['day']), kind='stable')]
+
+        generation = int(manifest.get('generation', 0)) + 1
+        index_name = f"index-{generation}.npy"
+        np.save(os.path.join(archive_dir, index_name), index)
+        previous = manifest['index']
+        manifest.update(n_bars=offset, dead_bars=manifest['dead_bars'] + dead, index=index_name,
+                        generation=generation, tickers=tickers, updated=datetime.now().isoformat())
+        tmp = os.path.join(archive_dir, MANIFEST_NAME + '.tmp')
+        with open(tmp, 'w') as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp, os.path.join(archive_dir, MANIFEST_NAME))
+        if previous and previous != index_name:
+            try:
+                os.remove(os.path.join(archive_dir, previous))
+            except OSError:
+                pass
+
+    if stats is not None:
+        stats.update(days_added=len(added), days_replaced=len(replaced), days_unchanged=unchanged,
+                     bars_added=written)
+    return written
+
+
+def _open_column(archive_dir, column, n_bars):
+    """Sloupec archivu jako read-only memmap (prvních n_bars hodnot)"""
+    if n_bars == 0:
+        return np.zeros(0, dtype=DTYPES[column])
+    return np.memmap(_column_path(archive_dir, column), dtype=DTYPES[column], mode='r', shape=(n_bars,))
+
+
+class BarArchive:
+    """
+    Čtení archivu: sloupce jsou memmapy a bary dne se vrací jako řezy.
+    Obsah odpovídá stavu manifestu při otevření (pozdější zápisy se
+    neprojeví, dokud se archiv neotevře znovu).
+    """
+
+    def __init__(self, archive_dir=ARCHIVE_DIR):
+        self.archive_dir = archive_dir
+        manifest = load_manifest(archive_dir)
+        self.n_bars = manifest['n_bars']
+        self.tickers = list(manifest['tickers'])
+        self.code = {t: i for i, t in enumerate(self.tickers)}
+        self.index = _load_index(archive_dir, manifest)
+        self._keys = _index_keys(self.index['ticker'], self.index['day'])
+        self.columns = {c: _open_column(archive_dir, c, self.n_bars) for c in DTYPES}
+
+    def __len__(self):
+        return len(self.index)
+
+    def __contains__(self, ticker):
+        return ticker in self.code
+
+    def sessions(self, ticker=None):
+        """Seřazené dny sezení (datetime64[D]) v archivu, případně jen tickeru"""
+        days = self.index['day']
+        if ticker is not None:
+            days = days[self.index['ticker'] == self.code.get(ticker, -1)]
+        return np.unique(days).astype('datetime64[D]')
+
+    def locate(self, tickers, days):
+        """
+        (start, count) barů pro páry (ticker, den) – vektorově přes searchsorted.
+        Chybějící páry mají count 0.
+        """
+        codes = np.array([self.code.get(t, -1) for t in tickers], dtype=np.int64)
+        keys = _index_keys(codes, np.asarray(days, dtype='datetime64[D]').astype(np.int64))
+        if len(self._keys) == 0:
+            return np.zeros(len(keys), dtype=np.int64), np.zeros(len(keys), dtype=np.int64)
+        pos = np.minimum(np.searchsorted(self._keys, keys), len(self._keys) - 1)
+        found = (codes >= 0) & (self._keys[pos] == keys)
+        start = np.where(found, self.index['start'][pos], 0).astype(np.int64)
+        count = np.where(found, self.index['count'][pos], 0).astype(np.int64)
+        return start, count
+
+    def day_bars(self, ticker, day):
+        """Bary (ticker, den) jako {sloupec: řez memmapu} bez kopie, nebo None"""
+        start, count = self.locate([ticker], [day])
+        if count[0] == 0:
+            return None
+        a, b = int(start[0]), int(start[0] + count[0])
+        return {c: col[a:b] for c, col in self.columns.items()}
+
+    def frame(self, ticker, tz=EXCHANGE_TZ):
+        """Všechny bary tickeru jako DataFrame (kopie, index v `tz`), nebo None"""
+        rows = self.index[self.index['ticker'] == self.code.get(ticker, -1)]
+        if len(rows) == 0:
+            return None
+        take = np.concatenate([np.arange(a, a + n) for a, n in zip(rows['start'], rows['count'])])
+        index = pd.DatetimeIndex(self.columns['Date'][take].astype('datetime64[ns]'), name='Datetime')
+        return pd.DataFrame({c: np.asarray(self.columns[c][take]) for c in COLUMNS},
+                            index=index.tz_localize('UTC').tz_convert(tz))
+
+    def stack(self, start, count, columns=('Open', 'High', 'Low', 'Close')):
+        """
+        Matice pozice × bary pro fill engine (jako intraday_fill.stack_bars)
+        přímo z memmapu: (dict sloupec -> matice, časy datetime64, počty barů).
+        """
+        start = np.asarray(start, dtype=np.int64)
+        count = np.asarray(count, dtype=np.int64)
+        width = int(count.max()) if len(count) else 0
+        slot = np.arange(width)
+        used = slot[None, :] < count[:, None]
+        take = np.where(used, start[:, None] + slot[None, :], 0)
+        out = {c: np.where(used, self.columns[c][take], np.nan) for c in columns}
+        times = np.where(used, self.columns['Date'][take], np.iinfo(np.int64).min).astype('datetime64[ns]')
+        return out, times, count
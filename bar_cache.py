@@ -0,0 +1,194 @@
+"""
+Lokální cache denních OHLCV barů.
+
+Každý ticker má vlastní sloupcový soubor (.npz, jedno pole na sloupec) a
+manifest.json drží datum posledního uloženého baru. Při dalším běhu se
+stahuje jen chybějící konec historie, nikoliv celých 8 let.
+"""
+import json
+import os
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+CACHE_DIR = os.path.join(os.getcwd(), 'data_cache', 'daily')
+MANIFEST_NAME = 'manifest.json'
+BAR_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+CACHE_VERSION = 1
+
+# Kolik posledních dní stahujeme znovu pro kontrolu, že se historie nezměnila
+# (yfinance vrací adjustované ceny – po dividendě/splitu se přepočítá celá řada)
+OVERLAP_DAYS = 5
+REVISION_TOLERANCE = 1e-4
+
+
+def _ticker_path(cache_dir, ticker):
+    safe = ticker.replace('^', '_').replace('/', '_')
+    return os.path.join(cache_dir, f"{safe}.npz")
+
+
+def load_manifest(cache_dir=CACHE_DIR):
+    path = os.path.join(cache_dir, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return {'version': CACHE_VERSION, 'tickers': {}}
+    try:
+        with open(path, 'r') as f:
+            manifest = json.load(f)
+    except Exception:
+        return {'version': CACHE_VERSION, 'tickers': {}}
+    if manifest.get('version') != CACHE_VERSION:
+        return {'version': CACHE_VERSION, 'tickers': {}}
+    return manifest
+
+
+def save_manifest(manifest, cache_dir=CACHE_DIR):
+    os.makedirs(cache_dir, exist_ok=True)
+    manifest['updated'] = datetime.now().isoformat()
+    tmp = os.path.join(cache_dir, MANIFEST_NAME + '.tmp')
+    with open(tmp, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp, os.path.join(cache_dir, MANIFEST_NAME))
+
+
+def load_ticker_bars(ticker, cache_dir=CACHE_DIR):
+    """Načte uložené bary tickeru, nebo None pokud v cache nejsou"""
+    path = _ticker_path(cache_dir, ticker)
+    if not os.path.exists(path):
+        return None
+    with np.load(path) as z:
+        index = pd.DatetimeIndex(z['Date'].astype('datetime64[ns]'), name='Date')
+        columns = {c: z[c] for c in BAR_COLUMNS if c in z.files}
+    return pd.DataFrame(columns, index=index)
+
+
+def save_ticker_bars(ticker, df, cache_dir=CACHE_DIR):
+    os.makedirs(cache_dir, exist_ok=True)
+    arrays = {'Date': df.index.values.astype('datetime64[ns]').astype(np.int64)}
+    for c in BAR_COLUMNS:
+        if c in df.columns:
+            arrays[c] = df[c].to_numpy(dtype=np.float64)
+    path = _ticker_path(cache_dir, ticker)
+    tmp = path + '.tmp.npz'
+    np.savez(tmp, **arrays)
+    os.replace(tmp, path)
+
+
+def _normalize_bars(df):
+    """Sjednotí index (bez timezone) a sloupce, zahodí neúplné řádky"""
+    df = df[[c for c in BAR_COLUMNS if c in df.columns]].dropna()
+    index = pd.DatetimeIndex(df.index)
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    df = df.copy()
+    df.index = index.normalize().rename('Date')
+    return df[~df.index.duplicated(keep='last')].sort_index()
+
+
+def _is_revised(cached, fresh):
+    """True pokud se překrývající bary liší (typicky zpětná adjustace cen)"""
+    common = cached.index.intersection(fresh.index)
+    if len(common) == 0:
+        # Mezera mezi cache a novými daty – nelze ověřit, stáhneme vše
+        return True
+    old = cached.loc[common, ['Open', 'High', 'Low', 'Close']].to_numpy()
+    new = fresh.loc[common, ['Open', 'High', 'Low', 'Close']].to_numpy()
+    rel = np.abs(new - old) / np.maximum(np.abs(old), 1e-9)
+    return bool(np.nanmax(rel) > REVISION_TOLERANCE)
+
+
+def update_daily_bars(tickers, download_fn, years=8, cache_dir=CACHE_DIR, stats=None):
+    """
+    Vrátí {ticker: DataFrame OHLCV} za posledních `years` let.
+
+    Nejdřív čte cache, pak přes `download_fn(tickers, start=..., period=...)`
+    dotáhne jen chybějící konec. Tickery bez cache nebo s přepočítanou
+    historií se stáhnou celé. `download_fn` vrací {ticker: DataFrame}.
+    Do `stats` (dict) zapíše počty cache hitů, plných stažení a requestů.
+    """
+    manifest = load_manifest(cache_dir)
+    today = pd.Timestamp.today().normalize()
+    cutoff = today - pd.DateOffset(years=years)
+
+    unique_tickers = list(dict.fromkeys(tickers))
+    cached = {}
+    full_fetch = []
+    tail_groups = {}
+
+    for t in unique_tickers:
+        entry = manifest['tickers'].get(t)
+        df = load_ticker_bars(t, cache_dir) if entry else None
+        if df is None or df.empty:
+            full_fetch.append(t)
+            continue
+        cached[t] = df
+        # Start se posune o OVERLAP_DAYS obchodních dní zpět kvůli kontrole revizí
+        start = (pd.Timestamp(entry['last_date']) - pd.tseries.offsets.BDay(OVERLAP_DAYS)).strftime('%Y-%m-%d')
+        tail_groups.setdefault(start, []).append(t)
+
+    print(f"   📦 Cache: {len(cached)} tickerů, plné stažení: {len(full_fetch)}")
+
+    result = {}
+    revised = []
+
+    for start, group in sorted(tail_groups.items()):
+        try:
+            fresh = download_fn(group, start=start)
+        except Exception as e:
+            print(f"   ⚠️  Dotažení od {start} selhalo ({e}), použiji cache")
+            fresh = {}
+        for t in group:
+            old = cached[t]
+            new = fresh.get(t)
+            if new is None or new.empty:
+                result[t] = old
+                continue
+            new = _normalize_bars(new)
+            if _is_revised(old, new):
+                revised.append(t)
+                continue
+            merged = pd.concat([old[old.index < new.index[0]], new])
+            result[t] = merged
+
+    if stats is not None:
+        stats['cache_hits'] = len(cached) - len(revised)
+        stats['full_fetch'] = len(full_fetch) + len(revised)
+        stats['revised'] = len(revised)
+        stats['requests'] = len(tail_groups) + (1 if full_fetch or revised else 0)
+
+    if revised:
+        print(f"   🔄 Přepočítaná historie (dividenda/split): {', '.join(revised)}")
+
+    to_fetch = full_fetch + revised
+    if to_fetch:
+        try:
+            fresh = download_fn(to_fetch, period=f"{years}y")
+        except Exception as e:
+            print(f"   ❌ Plné stažení selhalo: {e}")
+            fresh = {}
+        for t in to_fetch:
+            new = fresh.get(t)
+            if new is not None and not new.empty:
+                result[t] = _normalize_bars(new)
+            elif t in cached:
+                result[t] = cached[t]
+
+    ticker_data = {}
+    for t in unique_tickers:
+        df = result.get(t)
+        if df is None or df.empty:
+            continue
+        df = df[df.index >= cutoff]
+        ticker_data[t] = df
+        entry = manifest['tickers'].get(t, {})
+        last_date = df.index[-1].strftime('%Y-%m-%d')
+        if entry.get('last_date') != last_date or entry.get('rows') != len(df):
+            save_ticker_bars(t, df, cache_dir)
+            manifest['tickers'][t] = {
+                'first_date': df.index[0].strftime('%Y-%m-%d'),
+                'last_date': last_date,
+                'rows': len(df)
+            }
+
+    save_manifest(manifest, cache_dir)
+    return ticker_data
@@ -0,0 +1,210 @@
+"""
+Offline benchmark fází agent.py na syntetických datech (bez Yahoo).
+
+Měří feature building, signální matici, SL optimalizaci
+(optimize_sl_for_ticker_strategy přes všechny dvojice), run_backtest_60d,
+generate_signals_for_tomorrow a vyhodnocení na 5min barech. Pro každou fázi
+hlásí čas, propustnost a peak paměti a porovná výsledek s uloženým baseline.
+
+Příklady:
+    python benchmark.py --sizes 50x1,500x8
+    python benchmark.py --sizes 500x8 --save-baseline
+    python benchmark.py --sizes 5000x20 --no-memory --fail-on-regression
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+import agent
+from features import build_feature_panel
+from strategies import compute_signal_matrix
+from synthetic_data import synthetic_daily_bars, synthetic_intraday_bars
+
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bench_baseline.json')
+DEFAULT_TOLERANCE = 0.20
+# Fáze kratší než tohle se s baseline neporovnávají (šum měření)
+MIN_COMPARE_S = 0.01
+
+
+def _measure(fn, memory, repeat=1):
+    """
+    Spustí fn `repeat`-krát, vrátí (výsledek, wall_s, cpu_s, peak_mb) nejrychlejšího
+    běhu. Výpisy fáze potlačí.
+    """
+    with contextlib.redirect_stdout(io.StringIO()):
+        wall = cpu = float('inf')
+        for _ in range(max(repeat, 1)):
+            w = time.perf_counter()
+            c = time.process_time()
+            result = fn()
+            wall = min(wall, time.perf_counter() - w)
+            cpu = min(cpu, time.process_time() - c)
+
+        peak_mb = None
+        if memory:
+            # Samostatný běh pod tracemalloc, aby trasování nezkreslilo čas
+            tracemalloc.start()
+            fn()
+            peak_mb = tracemalloc.get_traced_memory()[1] / 1e6
+            tracemalloc.stop()
+    return result, wall, cpu, peak_mb
+
+
+def run_size(n_tickers, years, seed=0, memory=True, eval_positions=None, repeat=1):
+    """Benchmark jedné velikosti univerza; vrací {fáze: metriky}"""
+    raw = synthetic_daily_bars(n_tickers, years, seed=seed)
+    tickers = list(raw)
+    half = max(len(tickers) // 2, 1)
+
+    # Syntetické tickery rozdělíme na BIG (A, B) a SMALL (V, M) skupinu
+    saved_groups = dict(agent.STRATEGY_TICKER_GROUPS)
+    agent.STRATEGY_TICKER_GROUPS.update({
+        'A': tickers[:half], 'B': tickers[:half],
+        'V': tickers[half:], 'M': tickers[half:]
+    })
+    stages = {}
+
+    def record(name, fn, items, unit):
+        result, wall, cpu, peak = _measure(fn, memory, repeat)
+        stages[name] = {
+            'wall_s': round(wall, 4),
+            'cpu_s': round(cpu, 4),
+            'peak_mb': round(peak, 1) if peak is not None else None,
+            'items': items,
+            'unit': unit,
+            'throughput': round(items / wall, 1) if wall > 0 else None
+        }
+        return result
+
+    try:
+        total_rows = sum(len(df) for df in raw.values())
+        panel = record('features', lambda: build_feature_panel(raw, tickers), total_rows, 'bars')
+        signals = record('signal_matrix', lambda: compute_signal_matrix(panel), total_rows, 'bars')
+
+        pairs = sum(len(set(g) & set(panel.tickers)) for g in agent.STRATEGY_TICKER_GROUPS.values())
+        ticker_performance, optimized_sl, _ = record(
+            'optimize_sl', lambda: agent.optimize_all_strategies(panel, signals, 1), pairs, 'pairs')
+
+        record('backtest_60d',
+               lambda: agent.run_backtest_60d(panel, signals, optimized_sl, ticker_performance),
+               len(panel) * agent.BACKTEST_DAYS, 'ticker-days')
+
+        record('generate_signals',
+               lambda: agent.generate_signals_for_tomorrow(panel, signals, optimized_sl, ticker_performance),
+               len(panel), 'tickers')
+
+        # 5min vyhodnocení: jeden signál na ticker (max eval_positions pozic)
+        n_pos = min(eval_positions or len(tickers), len(tickers))
+        eval_tickers = tickers[:n_pos]
+        intraday = synthetic_intraday_bars(eval_tickers, days=5, seed=seed)
+        todays_signals = {'M': [
+            {'ticker': t, 'action': 'Long' if i % 2 == 0 else 'Short', 'sl_factor': 0.8}
+            for i, t in enumerate(eval_tickers)
+        ]}
+        avg_ranges = {t: float((df['High'] - df['Low']).mean()) for t, df in intraday.items()}
+        bars = sum(len(df) for df in intraday.values()) // 5
+        record('evaluate_5min',
+               lambda: agent.evaluate_signals_on_bars(todays_signals, intraday, avg_ranges),
+               bars, 'bars')
+    finally:
+        agent.STRATEGY_TICKER_GROUPS.clear()
+        agent.STRATEGY_TICKER_GROUPS.update(saved_groups)
+
+    return stages
+
+
+def compare_with_baseline(label, stages, baseline, tolerance):
+    """Vrátí seznam fází, které jsou pomalejší než baseline o víc než tolerance"""
+    base = baseline.get('results', {}).get(label)
+    if not base:
+        print(f"   ℹ️  Baseline pro {label} neexistuje")
+        return []
+    regressions = []
+    for name, m in stages.items():
+        b = base.get(name)
+        if not b or not b.get('wall_s') or b['wall_s'] < MIN_COMPARE_S:
+            continue
+        ratio = m['wall_s'] / b['wall_s']
+        flag = '✅'
+        if ratio > 1 + tolerance:
+            flag = '🔴'
+            regressions.append(name)
+        elif ratio < 1 - tolerance:
+            flag = '🚀'
+        print(f"   {flag} {name:18s} {b['wall_s']:>9.3f}s → {m['wall_s']:>9.3f}s  ({ratio:>5.2f}×)")
+    return regressions
+
+
+def _parse_sizes(text):
+    sizes = []
+    for part in text.split(','):
+        n, y = part.lower().split('x')
+        sizes.append((int(n), float(y)))
+    return sizes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Offline benchmark fází trading agenta')
+    parser.add_argument('--sizes', default='50x1', help='seznam TICKERŮxLET, např. 50x1,500x8,5000x20')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--eval-positions', type=int, default=None, help='počet pozic pro 5min vyhodnocení')
+    parser.add_argument('--repeat', type=int, default=3, help='počet opakování, bere se nejrychlejší')
+    parser.add_argument('--no-memory', action='store_true', help='neměřit peak paměti')
+    parser.add_argument('--baseline', default=BASELINE_FILE)
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument('--output', default=None, help='uložit výsledky jako JSON')
+    parser.add_argument('--fail-on-regression', action='store_true')
+    args = parser.parse_args(argv)
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)
+
+    report = {'timestamp': datetime.now().isoformat(), 'python': sys.version.split()[0], 'results': {}}
+    regressions = []
+
+    for n_tickers, years in _parse_sizes(args.sizes):
+        label = f"{n_tickers}x{years:g}"
+        print(f"\n{'='*70}")
+        print(f"⏱️  BENCHMARK {n_tickers} tickerů × {years:g} let")
+        print(f"{'='*70}")
+        stages = run_size(n_tickers, years, args.seed, not args.no_memory, args.eval_positions, args.repeat)
+        report['results'][label] = stages
+
+        for name, m in stages.items():
+            peak = f"{m['peak_mb']:>8.1f} MB" if m['peak_mb'] is not None else '       - '
+            print(f"   {name:18s} wall={m['wall_s']:>8.3f}s cpu={m['cpu_s']:>8.3f}s peak={peak} "
+                  f"{m['throughput'] or 0:>12,.0f} {m['unit']}/s")
+
+        print(f"\n   📏 Porovnání s baseline (tolerance {args.tolerance:.0%}):")
+        regressions += [f"{label}:{s}" for s in compare_with_baseline(label, stages, baseline, args.tolerance)]
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\n💾 Výsledky uloženy do {args.output}")
+
+    if args.save_baseline:
+        baseline.setdefault('results', {}).update(report['results'])
+        baseline['timestamp'] = report['timestamp']
+        with open(args.baseline, 'w') as f:
+            json.dump(baseline, f, indent=2)
+        print(f"💾 Baseline uložen do {args.baseline}")
+
+    if regressions:
+        print(f"\n🔴 Regrese: {', '.join(regressions)}")
+        if args.fail_on_regression:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,18 +1,38 @@
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
+import argparse
+import contextlib
+import io
 import json
-import requests
+import os
+import sys
 from datetime import datetime, timedelta
 import warnings
 warnings.filterwarnings('ignore')
 
+import artifact_fetch
+import dashboard_state
+import trade_log
+import web_export
+
 # === KONFIGURACE ===
+# Výchozí zdroj artefaktů; jiný server přes DASHBOARD_BASE_URL,
+# DASHBOARD_SOURCE=remote ignoruje lokální soubory
 GITHUB_BASE = 'https://raw.githubusercontent.com/pollcerny-sudo/trading-agent-bot/main/'
-CSV_URL = GITHUB_BASE + 'final_backtest_results.csv'
-JSON_URL = GITHUB_BASE + 'ibkr_signals.json'
-BACKTEST_URL = GITHUB_BASE + 'backtest_60d_results.json'
+CSV_NAME = 'final_backtest_results.csv'
+SIGNALS_NAME = 'ibkr_signals.json'
+BACKTEST_NAME = 'backtest_60d_results.json'
+# Lokální kopie artefaktů (agent.py ve stejném workflow) – mají přednost před sítí
+LOCAL_ARTIFACTS = {
+    CSV_NAME: [CSV_NAME],
+    SIGNALS_NAME: [SIGNALS_NAME],
+    BACKTEST_NAME: [os.path.join('public', BACKTEST_NAME), BACKTEST_NAME],
+}
+# Lokální log obchodů (agent.py) – má přednost před CSV z GitHubu
+TRADE_LOG_DIR = os.path.join(os.getcwd(), 'trade_log')
+DASHBOARD_JSON = 'public/dashboard_data.json'
+# Průběžné součty pro inkrementální export (commituje se spolu s public/*)
+DASHBOARD_STATE_FILE = 'public/dashboard_state.json'
 
 # Barvy pro strategie
 STRATEGY_COLORS = {
@@ -29,18 +49,48 @@ STRATEGY_NAMES = {
     'M': 'Momentum'
 }
 
+START_CAPITAL = 10000
+# Období tabulky metrik: (klíč, počet dní zpět od posledního obchodu; None = celá historie)
+METRIC_PERIODS = [('7d', 7), ('30d', 30), ('60d', 60), ('all', None)]
+METRIC_COLUMNS = ['total_profit', 'total_return_pct', 'num_trades', 'win_rate', 'avg_win',
+                  'avg_loss', 'sharpe_ratio', 'max_drawdown_pct', 'profit_factor']
+
 def download_data():
-    """Stáhne všechna data z GitHubu"""
+    """Načte historii obchodů, signály a backtest (lokálně, z cache nebo z GitHubu)"""
     print(f"{'='*80}")
-    print(f"📥 STAHOVÁNÍ DAT Z GITHUBU")
+    print(f"📥 NAČÍTÁNÍ DAT")
     print(f"{'='*80}\n")
 
     data = {}
-
-    # 1. CSV s historií obchodů
+    base_url = os.environ.get('DASHBOARD_BASE_URL', GITHUB_BASE)
+    if not base_url.endswith('/'):
+        base_url += '/'
+    prefer_local = os.environ.get('DASHBOARD_SOURCE', 'auto').lower() != 'remote'
+    use_trade_log = prefer_local and bool(trade_log.list_partitions(TRADE_LOG_DIR))
+
+    # Chybějící artefakty se stahují souběžně přes diskovou cache
+    artifacts = {name: paths for name, paths in LOCAL_ARTIFACTS.items()
+                 if not (name == CSV_NAME and use_trade_log)}
+    fetch_stats = {}
+    fetched = artifact_fetch.fetch_artifacts(artifacts, base_url, prefer_local=prefer_local, stats=fetch_stats)
+    sources = fetch_stats['sources']
+    print(f"📦 Artefakty: {fetch_stats['local']}× lokálně, {fetch_stats['hit']}× cache hit, "
+          f"{fetch_stats['miss']}× staženo, {fetch_stats['stale']}× stará kopie, "
+          f"{len(fetch_stats['errors'])}× chyba ({base_url})")
+
+    def payload(name):
+        if name not in fetched:
+            raise RuntimeError(fetch_stats['errors'].get(name, 'nedostupné'))
+        return fetched[name]
+
+    # 1. Historie obchodů – lokální log, jinak CSV
     try:
-        print(f"📄 Stahuji CSV historii obchodů...")
-        df = pd.read_csv(CSV_URL)
+        if use_trade_log:
+            print(f"📄 Načítám lokální log obchodů ({TRADE_LOG_DIR})...")
+            df = trade_log.read_trades(TRADE_LOG_DIR)
+        else:
+            print(f"📄 CSV historie obchodů ({sources.get(CSV_NAME, 'chyba')})...")
+            df = pd.read_csv(io.BytesIO(payload(CSV_NAME)))
         data['history'] = df
         print(f"   ✅ Načteno {len(df)} obchodů od {df['Date'].min()} do {df['Date'].max()}")
     except Exception as e:
@@ -49,10 +99,8 @@ def download_data():
 
     # 2. JSON s dnešními signály
     try:
-        print(f"📄 Stahuji dnešní signály (JSON)...")
-        response = requests.get(JSON_URL, timeout=10)
-        response.raise_for_status()
-        signals = response.json()
+        print(f"📄 Dnešní signály ({sources.get(SIGNALS_NAME, 'chyba')})...")
+        signals = json.loads(payload(SIGNALS_NAME))
         data['signals'] = signals
         total_signals = sum(len(signals.get(s, [])) for s in ['A', 'B', 'V', 'M'])
         print(f"   ✅ Načteno {total_signals} signálů pro dnes")
@@ -62,10 +110,8 @@ def download_data():
 
     # 3. JSON s výsledky 60d backtestů
     try:
-        print(f"📄 Stahuji výsledky 60d backtestu (JSON)...")
-        response = requests.get(BACKTEST_URL, timeout=10)
-        response.raise_for_status()
-        backtest = response.json()
+        print(f"📄 Výsledky 60d backtestu ({sources.get(BACKTEST_NAME, 'chyba')})...")
+        backtest = json.loads(payload(BACKTEST_NAME))
         data['backtest'] = backtest
         print(f"   ✅ Načteny backtest výsledky pro {len(backtest)} strategií")
     except Exception as e:
@@ -75,6 +121,20 @@ def download_data():
     print(f"\n{'='*80}\n")
     return data
 
+def _pyplot(headless):
+    """matplotlib.pyplot se importuje až při prvním grafu; headless = backend Agg (bez oken)"""
+    import matplotlib
+    if headless:
+        matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    return plt
+
+def _default_headless():
+    """Bez displeje (CI, server) nemá smysl otevírat okna"""
+    if os.environ.get('CI') or os.environ.get('DASHBOARD_HEADLESS'):
+        return True
+    return sys.platform.startswith('linux') and not os.environ.get('DISPLAY') and not os.environ.get('WAYLAND_DISPLAY')
+
 def calculate_metrics(df):
     """Vypočítá metriky pro celé portfolio nebo strategii"""
     if df.empty:
@@ -115,6 +175,82 @@ def calculate_metrics(df):
         'profit_factor': abs(avg_win / avg_loss) if avg_loss != 0 else 0
     }
 
+def build_metrics_table(history):
+    """
+    Metriky pro všechny kombinace strategie × období × strana v jednom
+    groupby průchodu. Index (Strategy, Period, Side), sloupce stejné jako
+    vrací calculate_metrics + first_date/last_date. Side 'All' = obě strany.
+    Obchody se berou v pořadí zápisu do logu (jako calculate_metrics nad
+    historií), takže drawdown odpovídá inkrementálnímu stavu dashboardu.
+    """
+    index_names = ['Strategy', 'Period', 'Side']
+    if history.empty:
+        empty = pd.MultiIndex.from_tuples([], names=index_names)
+        return pd.DataFrame(columns=METRIC_COLUMNS + ['first_date', 'last_date'], index=empty)
+
+    base = pd.DataFrame({
+        'Strategy': history['Strategy'].to_numpy(),
+        'Side': history['Side'].to_numpy(),
+        'Date': pd.to_datetime(history['Date']).to_numpy(),
+        'Profit': history['Profit'].to_numpy(dtype=float),
+    })
+    max_date = base['Date'].max()
+
+    # Každý obchod se zopakuje pro každé období, do kterého patří, a pro stranu 'All'
+    parts = []
+    for period, days in METRIC_PERIODS:
+        part = base if days is None else base[base['Date'] > max_date - timedelta(days=days)]
+        parts.append(part.assign(Period=period))
+        parts.append(part.assign(Period=period, Side='All'))
+    rows = pd.concat(parts, ignore_index=True)
+
+    profit = rows['Profit']
+    rows['Win'] = profit.where(profit > 0)
+    rows['Loss'] = profit.where(profit < 0)
+    keys = [rows[k] for k in index_names]
+    equity = START_CAPITAL + profit.groupby(keys, sort=False).cumsum()
+    peak = equity.groupby(keys, sort=False).cummax()
+    rows['Drawdown'] = (peak - equity) / peak * 100
+
+    grouped = rows.groupby(index_names, sort=False)
+    table = grouped.agg(
+        total_profit=('Profit', 'sum'),
+        num_trades=('Profit', 'size'),
+        wins=('Win', 'count'),
+        avg_win=('Win', 'mean'),
+        avg_loss=('Loss', 'mean'),
+        mean=('Profit', 'mean'),
+        max_drawdown_pct=('Drawdown', 'max'),
+        first_date=('Date', 'min'),
+        last_date=('Date', 'max'),
+    )
+    std = grouped['Profit'].std(ddof=0)
+
+    n = table['num_trades']
+    table['total_return_pct'] = table['total_profit'] / START_CAPITAL * 100
+    table['win_rate'] = table['wins'] / n * 100
+    table['avg_win'] = table['avg_win'].fillna(0.0)
+    table['avg_loss'] = table['avg_loss'].fillna(0.0)
+    table['sharpe_ratio'] = np.where(n > 1, table['mean'] / (std + 1e-9) * np.sqrt(252), 0.0)
+    safe_loss = table['avg_loss'].where(table['avg_loss'] != 0, 1.0)
+    table['profit_factor'] = np.where(table['avg_loss'] != 0, (table['avg_win'] / safe_loss).abs(), 0.0)
+    return table[METRIC_COLUMNS + ['first_date', 'last_date']]
+
+def metrics_table(data):
+    """Tabulka metrik z data['history'] – spočítá se jednou a uloží do data['metrics']"""
+    if 'metrics' not in data:
+        data['metrics'] = build_metrics_table(data['history'])
+    return data['metrics']
+
+def get_metrics(data, strategy, period='all', side='All'):
+    """Metriky jedné kombinace jako dict (stejné klíče jako calculate_metrics), nebo None"""
+    table = metrics_table(data)
+    key = (strategy, period, side)
+    if key not in table.index:
+        return None
+    row = table.loc[key]
+    return {c: int(row[c]) if c == 'num_trades' else float(row[c]) for c in METRIC_COLUMNS}
+
 def compare_backtest_vs_actual(data):
     """Porovná backtest předpověď vs skutečné výsledky"""
     print(f"{'='*80}")
@@ -125,16 +261,11 @@ def compare_backtest_vs_actual(data):
         print("⚠️  Nedostatek dat pro porovnání\n")
         return
 
-    # Použijeme poslední 60 dní z CSV jako "skutečnost"
-    df = data['history'].copy()
-    df['Date'] = pd.to_datetime(df['Date'])
-    df = df.sort_values('Date')
-
-    # Posledních 60 dní
-    cutoff_date = df['Date'].max() - timedelta(days=60)
-    recent_df = df[df['Date'] > cutoff_date]
+    # Použijeme poslední 60 dní z historie jako "skutečnost"
+    table = metrics_table(data)
+    recent = table.xs(('60d', 'All'), level=['Period', 'Side'])
 
-    print(f"📊 Analýza období: {recent_df['Date'].min().strftime('%Y-%m-%d')} až {recent_df['Date'].max().strftime('%Y-%m-%d')}\n")
+    print(f"📊 Analýza období: {recent['first_date'].min().strftime('%Y-%m-%d')} až {recent['last_date'].max().strftime('%Y-%m-%d')}\n")
 
     comparison = []
 
@@ -143,8 +274,7 @@ def compare_backtest_vs_actual(data):
         backtest_result = data['backtest'].get(strategy, {})
 
         # Skutečné výsledky
-        actual_df = recent_df[recent_df['Strategy'] == strategy]
-        actual_metrics = calculate_metrics(actual_df) if not actual_df.empty else None
+        actual_metrics = get_metrics(data, strategy, '60d')
 
         if backtest_result and actual_metrics:
             bt_profit = backtest_result.get('total_profit', 0)
@@ -194,7 +324,7 @@ def compare_backtest_vs_actual(data):
     print(f"{'='*80}\n")
     return comparison
 
-def plot_equity_curves(data):
+def plot_equity_curves(data, headless=False):
     """Vykreslí equity křivky pro všechny strategie"""
     print(f"📊 Generuji Equity Curves...\n")
 
@@ -202,6 +332,8 @@ def plot_equity_curves(data):
         print("⚠️  Žádná data pro equity křivky\n")
         return
 
+    plt = _pyplot(headless)
+
     df = data['history'].copy()
     df['Date'] = pd.to_datetime(df['Date'])
     df = df.sort_values('Date')
@@ -299,9 +431,11 @@ def plot_equity_curves(data):
     plt.tight_layout()
     plt.savefig('dashboard_equity_curves.png', dpi=150, bbox_inches='tight')
     print("✅ Graf uložen jako 'dashboard_equity_curves.png'\n")
-    plt.show()
+    if not headless:
+        plt.show()
+    plt.close(fig)
 
-def plot_strategy_comparison(data):
+def plot_strategy_comparison(data, headless=False):
     """Vytvoří srovnávací metriky pro strategie"""
     print(f"📊 Generuji Strategy Comparison Matrix...\n")
 
@@ -309,14 +443,11 @@ def plot_strategy_comparison(data):
         print("⚠️  Žádná data pro porovnání\n")
         return
 
-    df = data['history'].copy()
-
-    # Výpočet metrik pro každou strategii
+    # Metriky pro každou strategii z tabulky metrik
     metrics_data = []
     for strategy in ['A', 'B', 'V', 'M']:
-        strat_df = df[df['Strategy'] == strategy]
-        if not strat_df.empty:
-            metrics = calculate_metrics(strat_df)
+        metrics = get_metrics(data, strategy)
+        if metrics:
             metrics['Strategy'] = f"{strategy}\n{STRATEGY_NAMES[strategy]}"
             metrics_data.append(metrics)
 
@@ -325,6 +456,7 @@ def plot_strategy_comparison(data):
         return
 
     metrics_df = pd.DataFrame(metrics_data)
+    plt = _pyplot(headless)
 
     # Vytvoř 2x3 grid grafů
     fig, axes = plt.subplots(2, 3, figsize=(18, 10))
@@ -407,7 +539,48 @@ def plot_strategy_comparison(data):
     plt.tight_layout()
     plt.savefig('dashboard_comparison.png', dpi=150, bbox_inches='tight')
     print("✅ Graf uložen jako 'dashboard_comparison.png'\n")
-    plt.show()
+    if not headless:
+        plt.show()
+    plt.close(fig)
+
+# Grafy dashboardu v pořadí vykreslení
+FIGURES = {
+    'equity': plot_equity_curves,
+    'comparison': plot_strategy_comparison,
+}
+
+def _render_figure(name, data, headless):
+    """Worker: vykreslí jeden graf a vrátí jeho textový výstup"""
+    buf = io.StringIO()
+    with contextlib.redirect_stdout(buf):
+        FIGURES[name](data, headless=headless)
+    return buf.getvalue()
+
+def render_figures(data, headless=False, workers=2):
+    """
+    Vykreslí všechny grafy. Headless režim je kreslí paralelně ve worker
+    procesech (každý graf má vlastní matplotlib); interaktivní okna
+    (plt.show) jen postupně v hlavním procesu.
+    """
+    names = list(FIGURES)
+    if not headless or workers <= 1:
+        for name in names:
+            FIGURES[name](data, headless=headless)
+        return
+
+    from concurrent.futures import ProcessPoolExecutor
+    # Workerům stačí historie, backtest a hotová tabulka metrik
+    payload = {'history': data['history'], 'backtest': data['backtest'], 'metrics': metrics_table(data)}
+    try:
+        with ProcessPoolExecutor(max_workers=min(workers, len(names))) as pool:
+            outputs = list(pool.map(_render_figure, names, [payload] * len(names), [True] * len(names)))
+    except Exception as e:
+        print(f"⚠️  Paralelní vykreslení selhalo ({e}), kreslím postupně\n")
+        for name in names:
+            FIGURES[name](data, headless=True)
+        return
+    for out in outputs:
+        print(out, end='')
 
 def show_today_signals(data):
     """Zobrazí dnešní signály"""
@@ -454,13 +627,10 @@ def show_summary_table(data):
         print("⚠️  Žádná data pro tabulku\n")
         return
 
-    df = data['history'].copy()
-
     summary_data = []
     for strategy in ['A', 'B', 'V', 'M']:
-        strat_df = df[df['Strategy'] == strategy]
-        if not strat_df.empty:
-            metrics = calculate_metrics(strat_df)
+        metrics = get_metrics(data, strategy)
+        if metrics:
             summary_data.append({
                 'Strategy': f"{strategy} - {STRATEGY_NAMES[strategy]}",
                 'Total Profit': f"${metrics['total_profit']:,.2f}",
@@ -480,16 +650,10 @@ def show_summary_table(data):
         print()
 
         # Najdi nejlepší strategii podle různých metrik
-        df_numeric = data['history'].copy()
-        best_by_profit = df_numeric.groupby('Strategy')['Profit'].sum().idxmax()
-        best_by_sharpe = None
-
-        for strategy in ['A', 'B', 'V', 'M']:
-            strat_df = df[df['Strategy'] == strategy]
-            if not strat_df.empty:
-                metrics = calculate_metrics(strat_df)
-                if best_by_sharpe is None or metrics['sharpe_ratio'] > calculate_metrics(df[df['Strategy'] == best_by_sharpe])['sharpe_ratio']:
-                    best_by_sharpe = strategy
+        overall = metrics_table(data).xs(('all', 'All'), level=['Period', 'Side'])
+        best_by_profit = overall['total_profit'].idxmax()
+        sharpe = overall['sharpe_ratio'].reindex([s for s in ['A', 'B', 'V', 'M'] if s in overall.index])
+        best_by_sharpe = sharpe.idxmax() if not sharpe.empty else None
 
         print(f"🏆 Nejlepší strategie:")
         print(f"   Podle Profit:      {best_by_profit} - {STRATEGY_NAMES[best_by_profit]}")
@@ -509,37 +673,27 @@ def show_recent_performance(data):
         print("⚠️  Žádná data\n")
         return
 
-    df = data['history'].copy()
-    df['Date'] = pd.to_datetime(df['Date'])
-    df = df.sort_values('Date')
-
-    max_date = df['Date'].max()
+    table = metrics_table(data)
 
     periods = [
-        ('7 dní', 7),
-        ('30 dní', 30),
-        ('60 dní', 60)
+        ('7 dní', '7d'),
+        ('30 dní', '30d'),
+        ('60 dní', '60d')
     ]
 
-    for period_name, days in periods:
+    for period_name, period in periods:
         print(f"\n📊 Poslední {period_name}:")
         print("-" * 80)
 
-        cutoff = max_date - timedelta(days=days)
-        period_df = df[df['Date'] > cutoff]
-
-        if period_df.empty:
+        if not (table.index.get_level_values('Period') == period).any():
             print(f"   Žádná data za tento období")
             continue
 
         for strategy in ['A', 'B', 'V', 'M']:
-            strat_df = period_df[period_df['Strategy'] == strategy]
-            if not strat_df.empty:
-                profit = strat_df['Profit'].sum()
-                trades = len(strat_df)
-                win_rate = (strat_df['Profit'] > 0).sum() / trades * 100
+            metrics = get_metrics(data, strategy, period)
+            if metrics:
                 print(f"   {strategy} - {STRATEGY_NAMES[strategy]:20s}: "
-                      f"Profit=${profit:>10,.2f} | Trades={trades:>4} | WR={win_rate:>5.1f}%")
+                      f"Profit=${metrics['total_profit']:>10,.2f} | Trades={metrics['num_trades']:>4} | WR={metrics['win_rate']:>5.1f}%")
 
     print(f"\n{'='*80}\n")
 
@@ -548,50 +702,31 @@ def export_dashboard_json(data):
         print("⚠️ history empty — JSON not exported")
         return
 
-    df = data['history'].copy()
-    df['Date'] = pd.to_datetime(df['Date'])
+    # ===== INKREMENTÁLNÍ STAV =====
+    state = dashboard_state.load_state(DASHBOARD_STATE_FILE, START_CAPITAL)
+    stats = {}
+    state, rebuilt = dashboard_state.update_state(state, data['history'], stats=stats)
+    if rebuilt:
+        print(f"🔄 Stav dashboardu přepočítán celý ({stats['rebuild_reason']}, {stats['new_trades']} obchodů)")
+    else:
+        print(f"➕ Stav dashboardu: {stats['new_trades']} nových obchodů")
 
     strategies = {}
+    equity = {}
 
     for s in ['A','B','V','M']:
-        strat_df = df[df['Strategy'] == s]
-        if strat_df.empty:
+        st = state['strategies'].get(s)
+        if st is None or st['n'] == 0:
+            equity[s] = []
             continue
 
-        m = calculate_metrics(strat_df)
-
         strategies[s] = {
             "name": STRATEGY_NAMES[s],
-            "metrics": m
+            "metrics": dashboard_state.strategy_metrics(st, START_CAPITAL)
         }
-
-    # ===== DAILY PROFIT =====
-    df_daily = df.groupby(['Date','Strategy'])['Profit'].sum().reset_index()
-
-    # ===== EQUITY BUILD =====
-    equity = {}
-
-    for s in ['A','B','V','M']:
-        d = df_daily[df_daily['Strategy'] == s].sort_values('Date')
-
-        if d.empty:
-            equity[s] = []
-            continue
-
-        d['Equity'] = 10000 + d['Profit'].cumsum()
-
-        equity[s] = [
-            {
-                "date": str(r['Date'])[:10],
-                "equity": round(r['Equity'], 2)
-            }
-            for _, r in d.iterrows()
-        ]
+        equity[s] = dashboard_state.equity_points(st)
 
     # ===== JSON EXPORT =====
-    import os, json
-    from datetime import datetime
-
     os.makedirs("public", exist_ok=True)
 
     out = {
@@ -601,14 +736,28 @@ def export_dashboard_json(data):
         "equity": equity
     }
 
-    with open("public/dashboard_data.json", "w") as f:
-        json.dump(out, f, indent=2)
+    with open(DASHBOARD_JSON, "w") as f:
+        json.dump(out, f, separators=(',', ':'))
+    dashboard_state.save_state(state, DASHBOARD_STATE_FILE)
 
     print("✅ dashboard_data.json exported")
 
+    # Rozdělená kompaktní data pro web (summary + obchody po strategiích)
+    manifest = web_export.write_web_artifacts(out, data.get('backtest') or {}, data['history'])
+    summary = manifest['files']['summary.json']
+    print(f"✅ {web_export.WEB_DATA_DIR}: {len(manifest['files'])} souborů, "
+          f"summary {summary['bytes'] / 1024:.1f} KB")
 
-def main():
+
+def main(argv=None):
     """Hlavní funkce dashboardu"""
+    parser = argparse.ArgumentParser(description='Dashboard trading agenta')
+    parser.add_argument('--json-only', action='store_true', help='jen export JSON pro web, bez grafů (matplotlib se neimportuje)')
+    parser.add_argument('--headless', action='store_true', help='grafy jen do PNG (backend Agg), bez oken')
+    parser.add_argument('--workers', type=int, default=2, help='počet procesů pro headless vykreslení grafů')
+    args = parser.parse_args(argv)
+    headless = args.headless or _default_headless()
+
     print(f"\n{'='*80}")
     print(f"🚀 TRADING AGENT DASHBOARD")
     print(f"{'='*80}")
@@ -630,11 +779,9 @@ def main():
     # 5. Porovnání backtest vs skutečnost
     compare_backtest_vs_actual(data)
 
-    # 6. Equity křivky
-    plot_equity_curves(data)
-
-    # 7. Srovnání strategií
-    plot_strategy_comparison(data)
+    # 6.–7. Equity křivky a srovnání strategií
+    if not args.json_only:
+        render_figures(data, headless=headless, workers=args.workers)
 
     # ✅ 8. EXPORT JSON PRO WEB DASHBOARD
     export_dashboard_json(data)
@@ -643,9 +790,11 @@ def main():
     print(f"✅ DASHBOARD DOKONČEN")
     print(f"{'='*80}")
     print(f"📁 Vygenerované soubory:")
-    print(f"   • dashboard_equity_curves.png")
-    print(f"   • dashboard_comparison.png")
+    if not args.json_only:
+        print(f"   • dashboard_equity_curves.png")
+        print(f"   • dashboard_comparison.png")
     print(f"   • public/dashboard_data.json")
+    print(f"   • public/data/ (summary, obchody po strategiích, manifest)")
     print(f"{'='*80}\n")
 
 
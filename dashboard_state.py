@@ -0,0 +1,180 @@
+"""
+Inkrementální stav web dashboardu (public/dashboard_state.json).
+
+Pro každou strategii drží průběžné součty přes všechny zpracované obchody:
+počet, sum a sum² profitu, součty a počty výher/ztrát, aktuální equity,
+peak a max drawdown a denní equity řadu. Další běh přičte jen obchody
+přidané od minula – metriky i equity křivka se čtou přímo ze stavu.
+
+Obchody se počítají v pořadí zápisu do logu (stejně jako
+build_metrics_table), takže drawdown jde jen prodloužit. Obchod se starším
+datem (zpožděná data tickeru) jen posune denní equity řadu od svého dne.
+Stav si pamatuje počet zpracovaných řádků logu a jejich kontrolní součet;
+když nesedí (přepsaný nebo zkrácený log), stav se přepočítá celý.
+"""
+import bisect
+import json
+import os
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+STATE_VERSION = 1
+
+
+def empty_state(capital):
+    return {'version': STATE_VERSION, 'capital': capital, 'rows': 0,
+            'checksum': None, 'last_date': None, 'strategies': {}}
+
+
+def _empty_strategy(capital):
+    return {'n': 0, 'sum': 0.0, 'sumsq': 0.0, 'wins': 0, 'win_sum': 0.0,
+            'losses': 0, 'loss_sum': 0.0, 'equity': float(capital),
+            'peak': None, 'max_dd': 0.0, 'daily': []}
+
+
+def load_state(path, capital):
+    """Načte stav; při chybě, jiné verzi nebo jiném kapitálu vrátí prázdný"""
+    if not os.path.exists(path):
+        return empty_state(capital)
+    try:
+        with open(path, 'r') as f:
+            state = json.load(f)
+    except Exception:
+        return empty_state(capital)
+    if state.get('version') != STATE_VERSION or state.get('capital') != capital:
+        return empty_state(capital)
+    return state
+
+
+def save_state(state, path):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    state['updated'] = datetime.now().isoformat()
+    tmp = path + '.tmp'
+    with open(tmp, 'w') as f:
+        f.write(json.dumps(state))
+    os.replace(tmp, path)
+
+
+def _row_hashes(history):
+    """Hash každého řádku logu (datum, strategie, ticker, profit, pozice)"""
+    cols = pd.DataFrame({
+        'Date': history['Date'].astype(str).str[:10],
+        'Strategy': history['Strategy'].astype(str),
+        'Ticker': history['Ticker'].astype(str),
+        'Profit': history['Profit'].astype(float),
+    }, index=pd.RangeIndex(len(history)))
+    return pd.util.hash_pandas_object(cols, index=True).to_numpy()
+
+
+def _checksum(hashes):
+    """Kontrolní součet prvních řádků logu"""
+    return format(int(hashes.sum(dtype=np.uint64)), '016x') if len(hashes) else None
+
+
+def _add_daily(daily, dates, date, profit, capital):
+    """Přičte denní profit do equity řady [[datum, equity], ...] od daného dne dál"""
+    pos = bisect.bisect_left(dates, date)
+    if pos == len(daily) or dates[pos] != date:
+        daily.insert(pos, [date, daily[pos - 1][1] if pos else float(capital)])
+        dates.insert(pos, date)
+    for point in daily[pos:]:
+        point[1] += profit
+
+
+def _fold(state, trades):
+    """Přičte obchody (DataFrame Date 'YYYY-MM-DD', Strategy, Profit) v pořadí zápisu"""
+    capital = state['capital']
+    for strategy, g in trades.groupby('Strategy', sort=False):
+        s = state['strategies'].setdefault(str(strategy), _empty_strategy(capital))
+        p = g['Profit'].to_numpy(dtype=float)
+        s['n'] += len(p)
+        s['sum'] += float(p.sum())
+        s['sumsq'] += float((p ** 2).sum())
+        s['wins'] += int((p > 0).sum())
+        s['win_sum'] += float(p[p > 0].sum())
+        s['losses'] += int((p < 0).sum())
+        s['loss_sum'] += float(p[p < 0].sum())
+
+        # Equity po každém obchodu, peak navazuje na uložený
+        equity = s['equity'] + np.cumsum(p)
+        peak = np.maximum.accumulate(equity if s['peak'] is None else np.maximum(equity, s['peak']))
+        s['max_dd'] = max(s['max_dd'], float(((peak - equity) / peak * 100).max()))
+        s['peak'] = float(peak[-1])
+        s['equity'] = float(equity[-1])
+
+        # Denní equity řada podle data obchodu
+        dates = [d for d, _ in s['daily']]
+        for date, profit in g.groupby('Date', sort=True)['Profit'].sum().items():
+            _add_daily(s['daily'], dates, str(date), float(profit), capital)
+
+
+def _normalized(trades):
+    return pd.DataFrame({
+        'Date': pd.to_datetime(trades['Date']).dt.strftime('%Y-%m-%d').to_numpy(),
+        'Strategy': trades['Strategy'].to_numpy(),
+        'Profit': trades['Profit'].to_numpy(dtype=float),
+    })
+
+
+def update_state(state, history, stats=None):
+    """
+    Posune stav na aktuální log (history v pořadí zápisu, jako read_trades
+    nebo CSV). Vrací (state, rebuilt). Do `stats` zapíše počet nových
+    obchodů a důvod plného přepočtu.
+    """
+    reason = None
+    done = state['rows']
+    hashes = _row_hashes(history)
+    if done > len(history):
+        reason = 'log je kratší'
+    elif done and _checksum(hashes[:done]) != state['checksum']:
+        reason = 'log byl přepsán'
+    elif not done:
+        reason = 'nový stav'
+
+    if reason is not None:
+        state = empty_state(state['capital'])
+        done = 0
+
+    new = _normalized(history.iloc[done:])
+    if len(new):
+        _fold(state, new)
+        state['last_date'] = max([state['last_date'] or ''] + list(new['Date']))
+    state['rows'] = len(history)
+    state['checksum'] = _checksum(hashes)
+
+    if stats is not None:
+        stats['new_trades'] = len(new)
+        stats['rebuild_reason'] = reason
+    return state, reason is not None
+
+
+def strategy_metrics(s, capital):
+    """Metriky strategie ze součtů – stejné klíče jako calculate_metrics"""
+    n = s['n']
+    mean = s['sum'] / n
+    if n > 1:
+        std = np.sqrt(max(s['sumsq'] / n - mean ** 2, 0.0))
+        sharpe = float(mean / (std + 1e-9) * np.sqrt(252))
+    else:
+        sharpe = 0
+    avg_win = s['win_sum'] / s['wins'] if s['wins'] else 0
+    avg_loss = s['loss_sum'] / s['losses'] if s['losses'] else 0
+    return {
+        'total_profit': s['sum'],
+        'total_return_pct': s['sum'] / capital * 100,
+        'num_trades': n,
+        'win_rate': s['wins'] / n * 100,
+        'avg_win': avg_win,
+        'avg_loss': avg_loss,
+        'sharpe_ratio': sharpe,
+        'max_drawdown_pct': s['max_dd'],
+        'profit_factor': abs(avg_win / avg_loss) if avg_loss != 0 else 0
+    }
+
+
+def equity_points(s):
+    """Denní equity řada ve formátu dashboard_data.json"""
+    return [{"date": d, "equity": round(e, 2)} for d, e in s['daily']]
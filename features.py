@@ -0,0 +1,136 @@
+"""
+Výpočet odvozených sloupců (Prev_High20_Strict, Prev_AvgRange, ...) pro celé
+univerzum tickerů najednou.
+
+Bary všech tickerů se složí do jednoho širokého panelu (řádky × tickery),
+zarovnaného podle posledního baru: řádek -1 je poslední bar každého tickeru,
+řádek -2 předposlední atd. Rolling okna se pak počítají jedním vektorovým
+průchodem přes všechny sloupce a pozice odpovídají `df.iloc[-k]` v původních
+per-ticker DataFrame.
+"""
+import numpy as np
+import pandas as pd
+
+BAR_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+FEATURE_COLUMNS = [
+    'Prev_High20_Strict', 'Prev_Low20_Strict', 'Prev_Range', 'Prev_AvgRange',
+    'Prev_Close', 'Prev_Open', 'Prev_Volume', 'Prev_V_Avg', 'Prev_High',
+    'Day_Return_Pct'
+]
+MIN_ROWS = 100
+
+
+class FeaturePanel:
+    """
+    Panel featur pro všechny tickery.
+
+    columns[name] je matice (n_rows × n_tickers) zarovnaná podle konce;
+    buňky před prvním platným řádkem tickeru jsou NaN. dates[ticker] drží
+    DatetimeIndex platných řádků.
+    """
+
+    def __init__(self, tickers, columns, dates):
+        self.tickers = list(tickers)
+        self.position = {t: j for j, t in enumerate(self.tickers)}
+        self.columns = columns
+        self.dates = dates
+        self.lengths = np.array([len(dates[t]) for t in self.tickers], dtype=int)
+
+    @property
+    def n_rows(self):
+        return next(iter(self.columns.values())).shape[0] if self.columns else 0
+
+    def __contains__(self, ticker):
+        return ticker in self.position
+
+    def __len__(self):
+        return len(self.tickers)
+
+    def column(self, name, tickers=None):
+        """Matice sloupce, případně jen pro vybrané tickery (v daném pořadí)"""
+        arr = self.columns[name]
+        if tickers is None:
+            return arr
+        return arr[:, [self.position[t] for t in tickers]]
+
+    def frame(self, ticker):
+        """Per-ticker DataFrame ve stejném tvaru jako dřívější ticker_data[t]"""
+        j = self.position[ticker]
+        n = self.lengths[j]
+        data = {name: arr[-n:, j] for name, arr in self.columns.items()}
+        return pd.DataFrame(data, index=self.dates[ticker])
+
+    def ticker_data(self):
+        return {t: self.frame(t) for t in self.tickers}
+
+
+def _pack_right_aligned(frames, tickers, column, n_rows):
+    out = np.full((n_rows, len(tickers)), np.nan)
+    for j, t in enumerate(tickers):
+        values = frames[t][column].to_numpy(dtype=float)
+        out[n_rows - len(values):, j] = values
+    return out
+
+
+def build_feature_panel(raw_data, tickers=None, min_rows=MIN_ROWS):
+    """
+    Spočítá všechny featury pro {ticker: OHLCV DataFrame} jedním průchodem.
+    Tickery s méně než `min_rows` platnými řádky vynechá (jako dřív).
+    """
+    if tickers is None:
+        tickers = list(raw_data)
+    tickers = list(dict.fromkeys(t for t in tickers if t in raw_data))
+
+    frames = {}
+    for t in tickers:
+        d = raw_data[t][BAR_COLUMNS].dropna()
+        if len(d) >= min_rows:
+            frames[t] = d
+    tickers = [t for t in tickers if t in frames]
+    if not tickers:
+        return FeaturePanel([], {}, {})
+
+    n_rows = max(len(frames[t]) for t in tickers)
+    bars = {c: _pack_right_aligned(frames, tickers, c, n_rows) for c in BAR_COLUMNS}
+
+    high = pd.DataFrame(bars['High'])
+    low = pd.DataFrame(bars['Low'])
+    volume = pd.DataFrame(bars['Volume'])
+    day_range = high - low
+
+    cols = dict(bars)
+    cols['Prev_High20_Strict'] = high.rolling(window=20).max().shift(2).to_numpy(copy=True)
+    cols['Prev_Low20_Strict'] = low.rolling(window=20).min().shift(2).to_numpy(copy=True)
+    prev_range = day_range.shift(1)
+    cols['Prev_Range'] = prev_range.to_numpy(copy=True)
+    cols['Prev_AvgRange'] = prev_range.rolling(window=20).mean().to_numpy(copy=True)
+    cols['Prev_Close'] = np.roll(bars['Close'], 1, axis=0)
+    cols['Prev_Open'] = np.roll(bars['Open'], 1, axis=0)
+    cols['Prev_Volume'] = np.roll(bars['Volume'], 1, axis=0)
+    cols['Prev_V_Avg'] = volume.rolling(window=20).mean().shift(1).to_numpy(copy=True)
+    cols['Prev_High'] = np.roll(bars['High'], 1, axis=0)
+    for name in ['Prev_Close', 'Prev_Open', 'Prev_Volume', 'Prev_High']:
+        cols[name][0, :] = np.nan
+    cols['Day_Return_Pct'] = (bars['Close'] - bars['Open']) / bars['Open']
+
+    # Ekvivalent d.dropna(): platné jsou řádky, kde jsou všechny sloupce vyplněné
+    valid = np.ones((n_rows, len(tickers)), dtype=bool)
+    for arr in cols.values():
+        valid &= ~np.isnan(arr)
+    for arr in cols.values():
+        arr[~valid] = np.nan
+
+    lengths = valid.sum(axis=0)
+    keep = [j for j in range(len(tickers)) if lengths[j] >= min_rows]
+    if len(keep) < len(tickers):
+        cols = {name: arr[:, keep] for name, arr in cols.items()}
+        valid = valid[:, keep]
+        tickers = [tickers[j] for j in keep]
+
+    dates = {}
+    for j, t in enumerate(tickers):
+        raw_index = frames[t].index
+        row_valid = valid[n_rows - len(raw_index):, j]
+        dates[t] = raw_index[row_valid]
+
+    return FeaturePanel(tickers, cols, dates)
@@ -0,0 +1,131 @@
+"""
+Asynchronní stahování po tickerech: omezená souběžnost, token-bucket rate
+limit a opakování s exponenciálním backoffem (full jitter).
+
+Každý klíč (ticker) se stahuje samostatně, takže chyba jednoho tickeru
+neshodí ostatní – selhané klíče se vrátí zvlášť i s poslední chybou.
+Samotné stažení je blokující funkce (urllib), běží ve vlákně a engine jen
+řídí, kdy a kolikrát se zavolá. Jen standardní knihovna.
+"""
+import asyncio
+import json
+import random
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+USER_AGENT = 'Mozilla/5.0 (trading-agent-bot)'
+# HTTP kódy, po kterých má smysl to zkusit znovu (rate limit, chyby serveru)
+RETRY_STATUS = {408, 425, 429, 500, 502, 503, 504}
+
+
+class FetchError(Exception):
+    """Chyba stažení; `retryable` říká, jestli má smysl další pokus"""
+
+    def __init__(self, message, retryable=True, retry_after=None):
+        super().__init__(message)
+        self.retryable = retryable
+        self.retry_after = retry_after
+
+
+def http_get_json(url, timeout=10):
+    """GET a JSON tělo; chyby převede na FetchError s příznakem retryable"""
+    request = urllib.request.Request(url, headers={'User-Agent': USER_AGENT})
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as resp:
+            body = resp.read()
+    except urllib.error.HTTPError as e:
+        retry_after = e.headers.get('Retry-After') if e.headers else None
+        try:
+            retry_after = float(retry_after) if retry_after else None
+        except ValueError:
+            retry_after = None
+        raise FetchError(f"HTTP {e.code}", e.code in RETRY_STATUS, retry_after) from e
+    except OSError as e:  # URLError, timeout, odmítnuté spojení
+        raise FetchError(str(e)) from e
+    try:
+        return json.loads(body)
+    except ValueError as e:
+        raise FetchError(f"neplatný JSON: {e}") from e
+
+
+class TokenBucket:
+    """Nejvýš `rate` požadavků za sekundu, krátkodobě až `burst` najednou"""
+
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.capacity = float(burst or max(1.0, rate))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+def backoff_delay(attempt, base_delay, max_delay, rng):
+    """Full jitter: náhodně z <0, min(max_delay, base_delay * 2^attempt)>"""
+    return rng.uniform(0, min(max_delay, base_delay * 2 ** attempt))
+
+
+async def fetch_async(keys, fetch_one, concurrency=8, rate=None, burst=None, retries=3,
+                      base_delay=0.5, max_delay=8.0, seed=None, stats=None):
+    """
+    Zavolá `fetch_one(key)` pro každý klíč. Vrací (výsledky, chyby):
+    {klíč: hodnota} a {klíč: text poslední chyby}. Opakuje se jen po
+    FetchError s retryable=True (a po ostatních výjimkách kromě ValueError),
+    nejvýš `retries`-krát. rate=None = bez rate limitu.
+    """
+    keys = list(dict.fromkeys(keys))
+    bucket = TokenBucket(rate, burst) if rate else None
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    rng = random.Random(seed)
+    loop = asyncio.get_running_loop()
+    results, failures = {}, {}
+    counts = {'requests': 0, 'retries': 0}
+
+    async def run(key, pool):
+        for attempt in range(retries + 1):
+            async with semaphore:
+                if bucket is not None:
+                    await bucket.acquire()
+                counts['requests'] += 1
+                try:
+                    results[key] = await loop.run_in_executor(pool, fetch_one, key)
+                    return
+                except FetchError as e:
+                    error, retryable, wait = e, e.retryable, e.retry_after
+                except ValueError as e:  # data přišla, ale nedají se použít
+                    error, retryable, wait = e, False, None
+                except Exception as e:
+                    error, retryable, wait = e, True, None
+            if not retryable or attempt == retries:
+                failures[key] = str(error) or type(error).__name__
+                return
+            counts['retries'] += 1
+            # Čeká se mimo semafor, aby backoff neblokoval ostatní tickery
+            await asyncio.sleep(max(backoff_delay(attempt, base_delay, max_delay, rng), wait or 0))
+
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        await asyncio.gather(*(run(key, pool) for key in keys))
+
+    results = {key: results[key] for key in keys if key in results}
+    if stats is not None:
+        stats.update(counts)
+        stats['ok'] = len(results)
+        stats['failed'] = len(failures)
+    return results, failures
+
+
+def fetch_all(keys, fetch_one, **options):
+    """Synchronní obálka nad fetch_async (pro volání mimo event loop)"""
+    return asyncio.run(fetch_async(keys, fetch_one, **options))
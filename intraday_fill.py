@@ -0,0 +1,80 @@
+"""
+Intradenní fill engine: hledá první bar, kterým cena protne stop loss,
+pro mnoho pozic najednou (pozice × bary), bez iterace v Pythonu.
+
+Vstupem jsou matice (n_pozic × max_barů) doplněné NaN za posledním barem
+pozice. Stejná logika slouží večernímu vyhodnocení i intradennímu backtestu.
+"""
+import numpy as np
+
+
+def stack_bars(frames, columns=('Open', 'High', 'Low', 'Close')):
+    """
+    Složí seznam DataFrame s bary (jeden na pozici) do matic pozice × bary.
+    Vrací (dict sloupec -> matice, matice časů datetime64, počty barů).
+    """
+    n = len(frames)
+    counts = np.array([len(f) for f in frames], dtype=int)
+    width = int(counts.max()) if n else 0
+    out = {c: np.full((n, width), np.nan) for c in columns}
+    times = np.full((n, width), np.datetime64('NaT'), dtype='datetime64[ns]')
+    for i, f in enumerate(frames):
+        k = counts[i]
+        for c in columns:
+            out[c][i, :k] = f[c].to_numpy(dtype=float)
+        index = f.index
+        if getattr(index, 'tz', None) is not None:
+            index = index.tz_convert('UTC').tz_localize(None)
+        times[i, :k] = index.values.astype('datetime64[ns]')
+    return out, times, counts
+
+
+def first_touch_fills(entry, sl_price, is_long, high, low, close, counts, times=None):
+    """
+    Vyhodnotí stop loss pro všechny pozice najednou.
+
+    Long je stopnutý prvním barem s Low <= sl_price, Short prvním barem
+    s High >= sl_price (včetně vstupního baru). Nestopnuté pozice končí
+    Close posledního baru. Vrací dict polí:
+      hit, touch_idx (-1 bez zásahu), exit_idx, exit_price,
+      bars_in_trade, touch_time / time_in_trade (pokud jsou dány časy),
+      mae, mfe (maximální nepříznivý / příznivý pohyb v ceně, >= 0).
+    """
+    entry = np.asarray(entry, dtype=float)
+    sl_price = np.asarray(sl_price, dtype=float)
+    is_long = np.asarray(is_long, dtype=bool)
+    counts = np.asarray(counts, dtype=int)
+    n, width = high.shape
+    rows = np.arange(n)
+
+    with np.errstate(invalid='ignore'):
+        crossed = np.where(is_long[:, None], low <= sl_price[:, None], high >= sl_price[:, None])
+    hit = crossed.any(axis=1)
+    touch_idx = np.where(hit, crossed.argmax(axis=1), -1)
+    exit_idx = np.where(hit, touch_idx, counts - 1)
+    last_close = close[rows, np.maximum(counts - 1, 0)]
+    exit_price = np.where(hit, sl_price, last_close)
+
+    # Extrémy jen přes bary, kdy byla pozice otevřená (včetně baru výstupu)
+    in_trade = np.arange(width)[None, :] <= exit_idx[:, None]
+    low_min = np.where(in_trade, low, np.inf).min(axis=1)
+    high_max = np.where(in_trade, high, -np.inf).max(axis=1)
+    adverse = np.where(is_long, entry - low_min, high_max - entry)
+    favorable = np.where(is_long, high_max - entry, entry - low_min)
+    # Po zásahu stopu jsme venku – ztráta nemůže přesáhnout vzdálenost stopu
+    adverse = np.where(hit, np.minimum(adverse, np.abs(entry - sl_price)), adverse)
+
+    result = {
+        'hit': hit,
+        'touch_idx': touch_idx,
+        'exit_idx': exit_idx,
+        'exit_price': exit_price,
+        'bars_in_trade': exit_idx + 1,
+        'mae': np.maximum(adverse, 0.0),
+        'mfe': np.maximum(favorable, 0.0),
+    }
+    if times is not None:
+        exit_time = times[rows, np.maximum(exit_idx, 0)]
+        result['touch_time'] = np.where(hit, exit_time, np.datetime64('NaT'))
+        result['time_in_trade'] = exit_time - times[:, 0]
+    return result
@@ -0,0 +1,371 @@
+"""
+Zdroje tržních dat pro agenta.
+
+Každý provider má stejné rozhraní:
+    daily(tickers, start=None, period=None) -> {ticker: DataFrame OHLCV}
+    bars(tickers, period="5d", interval="5m") -> {ticker: DataFrame OHLCV}
+
+- yfinance:  živá data z Yahoo (volitelně archivuje stažené 5min bary)
+- yahoo:     živá data z Yahoo chart API po tickerech přes fetch_engine
+             (souběžně, s rate limitem a opakováním; selhané tickery chybí)
+- replay:    lokální soubory (denní cache + archiv 5min barů, bar_archive) k datu `as_of`,
+             umožňuje deterministicky zopakovat libovolný historický večer
+- synthetic: GBM data ze synthetic_data, bez sítě i bez souborů
+
+Výběr přes proměnnou prostředí DATA_PROVIDER (a DATA_AS_OF, DATA_DIR).
+Provider 'yahoo' se ladí přes YAHOO_BASE_URL, FETCH_CONCURRENCY, FETCH_RATE
+a FETCH_RETRIES.
+"""
+import os
+import re
+import urllib.parse
+
+import numpy as np
+import pandas as pd
+
+import bar_archive
+import fetch_engine
+from bar_cache import BAR_COLUMNS, load_ticker_bars
+from synthetic_data import TRADING_DAYS_PER_YEAR, synthetic_daily_bars, synthetic_intraday_bars
+
+DATA_DIR = os.path.join(os.getcwd(), 'data_cache')
+INTRADAY_TZ = 'America/New_York'
+YAHOO_BASE_URL = 'https://query1.finance.yahoo.com'
+
+
+def _split_by_ticker(raw, tickers):
+    """Rozdělí výstup yf.download (MultiIndex i plochý) na {ticker: DataFrame}"""
+    out = {}
+    if raw is None or raw.empty:
+        return out
+    if isinstance(raw.columns, pd.MultiIndex):
+        level0 = set(raw.columns.get_level_values(0))
+        for t in tickers:
+            if t in level0:
+                d = raw[t].dropna(how='all')
+                if not d.empty:
+                    out[t] = d
+    elif len(tickers) == 1:
+        out[tickers[0]] = raw.dropna(how='all')
+    return out
+
+
+def _parse_period(period):
+    """'5d' -> (5, 'd'), '8y' -> (8, 'y'), '1mo' -> (1, 'mo')"""
+    m = re.fullmatch(r'(\d+)(d|wk|mo|y)', str(period))
+    if not m:
+        raise ValueError(f"Neznámá perioda: {period}")
+    return int(m.group(1)), m.group(2)
+
+
+def _period_start(end, period):
+    """Začátek kalendářního období `period` končícího v `end`"""
+    n, unit = _parse_period(period)
+    if unit == 'd':
+        return end - pd.Timedelta(days=n)
+    if unit == 'wk':
+        return end - pd.Timedelta(weeks=n)
+    if unit == 'mo':
+        return end - pd.DateOffset(months=n)
+    return end - pd.DateOffset(years=n)
+
+
+def _intraday_path(data_dir, ticker):
+    """Starý archiv (jeden .npz na ticker) – jen pro čtení a převod do bar_archive"""
+    safe = ticker.replace('^', '_').replace('/', '_')
+    return os.path.join(data_dir, 'intraday', f"{safe}.npz")
+
+
+def intraday_archive_dir(data_dir=DATA_DIR):
+    """Adresář archivu 5min barů (bar_archive) v data_dir"""
+    return os.path.join(data_dir, 'intraday_5m')
+
+
+def _load_legacy_intraday_bars(ticker, data_dir):
+    path = _intraday_path(data_dir, ticker)
+    if not os.path.exists(path):
+        return None
+    with np.load(path) as z:
+        index = pd.DatetimeIndex(z['Date'].astype('datetime64[ns]'), name='Datetime')
+        columns = {c: z[c] for c in BAR_COLUMNS if c in z.files}
+    return pd.DataFrame(columns, index=index.tz_localize('UTC').tz_convert(INTRADAY_TZ))
+
+
+def load_intraday_bars(ticker, data_dir=DATA_DIR, archive=None):
+    """
+    Načte archivované 5min bary tickeru (index v INTRADAY_TZ), nebo None.
+    `archive` = už otevřený BarArchive (při čtení mnoha tickerů).
+    """
+    if archive is None:
+        archive = bar_archive.BarArchive(intraday_archive_dir(data_dir))
+    df = archive.frame(ticker, INTRADAY_TZ)
+    return df if df is not None else _load_legacy_intraday_bars(ticker, data_dir)
+
+
+def archive_intraday_bars(bars, data_dir=DATA_DIR, stats=None):
+    """
+    Přidá stažené 5min bary {ticker: DataFrame} do lokálního archivu
+    (bar_archive). Ticker, který má jen starý .npz archiv, se převede celý.
+    """
+    archive_dir = intraday_archive_dir(data_dir)
+    archived = bar_archive.BarArchive(archive_dir)
+    out = {}
+    for t, df in bars.items():
+        legacy = _load_legacy_intraday_bars(t, data_dir) if t not in archived else None
+        if legacy is not None and not df.empty:
+            index = pd.DatetimeIndex(df.index)
+            index = index.tz_localize(INTRADAY_TZ) if index.tz is None else index
+            df = pd.concat([legacy[legacy.index < index[0]], df.set_axis(index, axis=0)])
+        out[t] = df
+    return bar_archive.append_bars(out, archive_dir, stats)
+
+
+class YFinanceProvider:
+    """Živá data z Yahoo Finance; každé volání = jeden hromadný request"""
+
+    name = 'yfinance'
+    # Denní bary jdou přes lokální bar_cache (stahuje se jen chybějící konec)
+    cacheable = True
+
+    def __init__(self, archive_dir=None):
+        self.archive_dir = archive_dir
+
+    def daily(self, tickers, start=None, period=None):
+        import yfinance as yf
+        if start is not None:
+            raw = yf.download(tickers, start=start, interval="1d", group_by='ticker', progress=False)
+        else:
+            raw = yf.download(tickers, period=period, interval="1d", group_by='ticker', progress=False)
+        return _split_by_ticker(raw, tickers)
+
+    def bars(self, tickers, period="5d", interval="5m"):
+        import yfinance as yf
+        raw = yf.download(tickers, period=period, interval=interval, group_by='ticker', progress=False, auto_adjust=True)
+        out = {}
+        for t, d in _split_by_ticker(raw, tickers).items():
+            d = d.dropna()
+            if not d.empty:
+                out[t] = d
+        # Archiv 5min barů je zdrojem pro pozdější replay večera
+        if self.archive_dir and out and interval == '5m':
+            try:
+                archive_intraday_bars(out, self.archive_dir)
+            except Exception as e:
+                print(f"   ⚠️  Archivace 5min barů selhala: {e}")
+        return out
+
+
+def _chart_frame(payload, interval, adjust=True):
+    """
+    DataFrame OHLCV z odpovědi Yahoo chart API. Denní bary mají index bez
+    času (jako yfinance), intraday v čase burzy. adjust=True přepočte
+    OHLC přes adjclose (jako yf.download s auto_adjust).
+    """
+    chart = (payload or {}).get('chart') or {}
+    if chart.get('error'):
+        error = chart['error']
+        raise ValueError(f"{error.get('code')}: {error.get('description')}")
+    result = (chart.get('result') or [None])[0]
+    if not result or not result.get('timestamp'):
+        raise ValueError("prázdná odpověď")
+    quote = result['indicators']['quote'][0]
+    df = pd.DataFrame({c: np.asarray(quote.get(c.lower()) or [], dtype=float) for c in BAR_COLUMNS})
+    tz = result.get('meta', {}).get('exchangeTimezoneName') or INTRADAY_TZ
+    index = pd.to_datetime(np.asarray(result['timestamp'], dtype=np.int64), unit='s', utc=True).tz_convert(tz)
+    if interval == '1d':
+        index = index.tz_localize(None).normalize()
+        adjclose = (result['indicators'].get('adjclose') or [{}])[0].get('adjclose')
+        if adjust and adjclose:
+            ratio = np.asarray(adjclose, dtype=float) / df['Close'].to_numpy()
+            for c in ['Open', 'High', 'Low', 'Close']:
+                df[c] = df[c].to_numpy() * ratio
+    df.index = index.rename('Date' if interval == '1d' else 'Datetime')
+    df = df.dropna(subset=['Open', 'High', 'Low', 'Close'])
+    if df.empty:
+        raise ValueError("žádné kompletní bary")
+    return df[~df.index.duplicated(keep='last')]
+
+
+class YahooHttpProvider:
+    """
+    Živá data z Yahoo chart API, jeden request na ticker přes fetch_engine.
+    Přechodné chyby (timeout, 429, 5xx) se opakují s backoffem; tickery, které
+    ani tak nevyšly, ve výsledku chybí a jsou ve `failures` (za celý běh).
+    """
+
+    name = 'yahoo'
+    cacheable = True
+
+    def __init__(self, archive_dir=None, base_url=None, concurrency=8, rate=5.0, retries=3, timeout=10):
+        self.archive_dir = archive_dir
+        self.base_url = (base_url or YAHOO_BASE_URL).rstrip('/')
+        self.options = {'concurrency': concurrency, 'rate': rate, 'retries': retries}
+        self.timeout = timeout
+        self.failures = {}
+
+    def _url(self, ticker, interval, start=None, period=None):
+        now = pd.Timestamp.now(tz='UTC').tz_localize(None)
+        begin = pd.Timestamp(start) if start is not None else _period_start(now, period or '8y')
+        query = urllib.parse.urlencode({
+            'period1': int(begin.timestamp()),
+            'period2': int(now.timestamp()),
+            'interval': interval,
+            'events': 'div,splits',
+        })
+        return f"{self.base_url}/v8/finance/chart/{urllib.parse.quote(ticker)}?{query}"
+
+    def _fetch(self, tickers, interval, start=None, period=None):
+        def fetch_one(ticker):
+            payload = fetch_engine.http_get_json(self._url(ticker, interval, start, period), self.timeout)
+            return _chart_frame(payload, interval)
+
+        stats = {}
+        out, failures = fetch_engine.fetch_all(tickers, fetch_one, stats=stats, **self.options)
+        self.failures.update(failures)
+        if failures:
+            shown = ', '.join(f"{t} ({e})" for t, e in list(failures.items())[:10])
+            more = len(failures) - 10
+            print(f"   ⚠️  Nestaženo {len(failures)}/{len(tickers)} tickerů: {shown}"
+                  + (f" a dalších {more}" if more > 0 else ""))
+        if stats.get('retries'):
+            print(f"   🔁 Opakované requesty: {stats['retries']}")
+        return out
+
+    def daily(self, tickers, start=None, period=None):
+        return self._fetch(list(dict.fromkeys(tickers)), '1d', start, period)
+
+    def bars(self, tickers, period="5d", interval="5m"):
+        n, unit = _parse_period(period)
+        if interval != '1d' and unit == 'd':
+            # Perioda "5d" = posledních 5 obchodních sezení, jako u yfinance
+            out = self._fetch(list(dict.fromkeys(tickers)), interval, period=f"{n + n // 5 * 2 + 4}d")
+            for t, df in out.items():
+                days = df.index.tz_localize(None).normalize()
+                out[t] = df[days.isin(days.unique()[-n:])]
+        else:
+            out = self._fetch(list(dict.fromkeys(tickers)), interval, period=period)
+        # Archiv 5min barů je zdrojem pro pozdější replay večera
+        if self.archive_dir and out and interval == '5m':
+            try:
+                archive_intraday_bars(out, self.archive_dir)
+            except Exception as e:
+                print(f"   ⚠️  Archivace 5min barů selhala: {e}")
+        return out
+
+
+class ReplayProvider:
+    """
+    Lokální data tak, jak vypadala večer dne `as_of`: denní bary z bar_cache
+    (data_dir/daily) a 5min bary z archivu (data_dir/intraday). Bez as_of se
+    bere poslední dostupný den.
+    """
+
+    name = 'replay'
+    cacheable = False
+
+    def __init__(self, data_dir=DATA_DIR, as_of=None):
+        self.data_dir = data_dir
+        self.as_of = pd.Timestamp(as_of).normalize() if as_of else None
+
+    def _end(self, frames):
+        if self.as_of is not None:
+            return self.as_of
+        last = [df.index[-1] for df in frames.values() if not df.empty]
+        return pd.Timestamp(max(last)).normalize() if last else pd.Timestamp.today().normalize()
+
+    def daily(self, tickers, start=None, period=None):
+        frames = {}
+        for t in dict.fromkeys(tickers):
+            df = load_ticker_bars(t, os.path.join(self.data_dir, 'daily'))
+            if df is not None and not df.empty:
+                frames[t] = df
+        end = self._end(frames)
+        begin = pd.Timestamp(start) if start is not None else _period_start(end, period or '8y')
+        out = {}
+        for t, df in frames.items():
+            df = df[(df.index >= begin) & (df.index <= end)]
+            if not df.empty:
+                out[t] = df
+        return out
+
+    def bars(self, tickers, period="5d", interval="5m"):
+        if interval == '1d':
+            return self.daily(tickers, period=period)
+        if interval != '5m':
+            raise ValueError(f"Replay umí jen 5m a 1d bary, ne {interval}")
+        n_sessions, unit = _parse_period(period)
+        if unit != 'd':
+            raise ValueError(f"Replay 5min barů podporuje periodu ve dnech, ne {period}")
+        archive = bar_archive.BarArchive(intraday_archive_dir(self.data_dir))
+        out = {}
+        for t in dict.fromkeys(tickers):
+            df = load_intraday_bars(t, self.data_dir, archive)
+            if df is None or df.empty:
+                continue
+            days = df.index.tz_localize(None).normalize()
+            if self.as_of is not None:
+                df, days = df[days <= self.as_of], days[days <= self.as_of]
+            # Perioda "5d" = posledních 5 obchodních sezení, jako u yfinance
+            sessions = days.unique()[-n_sessions:]
+            df = df[days.isin(sessions)]
+            if not df.empty:
+                out[t] = df
+        return out
+
+
+class SyntheticProvider:
+    """Deterministická syntetická data (GBM) končící dnem `as_of`"""
+
+    name = 'synthetic'
+    cacheable = False
+
+    def __init__(self, seed=0, as_of=None):
+        self.seed = seed
+        self.as_of = pd.Timestamp(as_of).normalize() if as_of else pd.Timestamp.today().normalize()
+
+    def daily(self, tickers, start=None, period=None):
+        tickers = list(dict.fromkeys(tickers))
+        begin = pd.Timestamp(start) if start is not None else _period_start(self.as_of, period or '8y')
+        years = max((self.as_of - begin).days / 365.25, 1 / TRADING_DAYS_PER_YEAR)
+        data = synthetic_daily_bars(len(tickers), years, seed=self.seed, end=self.as_of)
+        return {t: df for t, df in zip(tickers, data.values())}
+
+    def bars(self, tickers, period="5d", interval="5m"):
+        if interval == '1d':
+            return self.daily(tickers, period=period)
+        n_sessions, _ = _parse_period(period)
+        tickers = list(dict.fromkeys(tickers))
+        return synthetic_intraday_bars(tickers, days=n_sessions, seed=self.seed, end=self.as_of)
+
+
+PROVIDERS = {
+    'yfinance': YFinanceProvider,
+    'yahoo': YahooHttpProvider,
+    'replay': ReplayProvider,
+    'synthetic': SyntheticProvider,
+}
+
+
+def get_provider(name=None, as_of=None, data_dir=None):
+    """
+    Vytvoří provider podle jména (výchozí z DATA_PROVIDER, jinak yfinance).
+    as_of a data_dir se berou z DATA_AS_OF / DATA_DIR, pokud nejsou zadané.
+    """
+    name = (name or os.environ.get('DATA_PROVIDER') or 'yfinance').lower()
+    as_of = as_of or os.environ.get('DATA_AS_OF') or None
+    data_dir = data_dir or os.environ.get('DATA_DIR') or DATA_DIR
+    if name not in PROVIDERS:
+        raise ValueError(f"Neznámý DATA_PROVIDER: {name} (možnosti: {', '.join(PROVIDERS)})")
+    if name == 'yfinance':
+        return YFinanceProvider(archive_dir=data_dir)
+    if name == 'yahoo':
+        return YahooHttpProvider(
+            archive_dir=data_dir,
+            base_url=os.environ.get('YAHOO_BASE_URL') or None,
+            concurrency=int(os.environ.get('FETCH_CONCURRENCY', '8')),
+            rate=float(os.environ.get('FETCH_RATE', '5')),
+            retries=int(os.environ.get('FETCH_RETRIES', '3')),
+        )
+    if name == 'replay':
+        return ReplayProvider(data_dir, as_of)
+    return SyntheticProvider(int(os.environ.get('DATA_SEED', '0')), as_of)
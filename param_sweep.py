@@ -0,0 +1,73 @@
+"""
+Sweep parametrů strategií: práh signálu × top-k × SL faktor.
+
+Kostka se počítá bez opakované práce:
+- maska signálu (a z-score tickerů, per-ticker SL) se počítá jednou na
+  hodnotu prahu a sdílí ji všechny kombinace top-k × SL,
+- top-k je prefix pořadí pro největší k (top_k_per_row je stabilní), takže
+  stačí jeden výběr na práh a denní P&L pro každé k je kumulativní součet
+  přes sloty,
+- profit obchodu (den, ticker) pro všechny SL faktory se simuluje jednou
+  pro sjednocení vybraných obchodů přes všechny prahy.
+
+Tady jsou jen čisté numpy funkce; sestavení nad panelem je v agent.py
+(run_param_sweep).
+"""
+import itertools
+
+import numpy as np
+
+START_EQUITY = 10000.0
+
+
+def grid_points(grid):
+    """{'param': [hodnoty]} -> seznam dictů kartézského součinu ({} pro prázdný grid)"""
+    keys = list(grid)
+    return [dict(zip(keys, values)) for values in itertools.product(*(grid[k] for k in keys))]
+
+
+def masked_z(values, mask, mean_only=False):
+    """
+    calculate_z_score po sloupcích jen přes řádky masky (osa 0; další osy se
+    broadcastují). Sloupce s < 3 řádky mají 0 jako optimize_pair.
+    mean_only=True vrací jen průměr (z-score strategie M).
+    """
+    n = mask.sum(axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = np.where(mask, values, 0.0).sum(axis=0) / np.maximum(n, 1)
+        if mean_only:
+            z = mean
+        else:
+            dev = np.where(mask, values - mean, 0.0)
+            std = np.sqrt((dev * dev).sum(axis=0) / np.maximum(n - 1, 1))
+            z = mean / (std + 1e-9)
+    return np.where(n >= 3, z, 0.0)
+
+
+def equity_metrics(daily_pnl, start=START_EQUITY):
+    """
+    daily_pnl: (dny × ...) -> (total_profit, max_drawdown v %) pro každý
+    sloupec; drawdown jako calculate_max_drawdown nad křivkou zaokrouhlenou
+    na centy (stejně jako equity_curve backtestu).
+    """
+    equity = start + np.cumsum(daily_pnl, axis=0)
+    total = equity[-1] - start if len(equity) else np.zeros(daily_pnl.shape[1:])
+    curve = np.concatenate([np.full((1,) + daily_pnl.shape[1:], start), np.round(equity, 2)])
+    peak = np.maximum.accumulate(curve, axis=0)
+    drawdown = ((peak - curve) / peak * 100).max(axis=0)
+    return total, drawdown
+
+
+def pareto_front(profit, drawdown):
+    """
+    Indexy nedominovaných bodů (vyšší profit, nižší drawdown), seřazené
+    podle drawdownu. Ze shodných bodů zůstane první.
+    """
+    profit = np.asarray(profit, dtype=float)
+    drawdown = np.asarray(drawdown, dtype=float)
+    if len(profit) == 0:
+        return np.zeros(0, dtype=int)
+    order = np.lexsort((-profit, drawdown))
+    best = np.maximum.accumulate(profit[order])
+    prev = np.concatenate([[-np.inf], best[:-1]])
+    return order[profit[order] > prev]
@@ -0,0 +1,112 @@
+"""
+Bootstrap nejistoty výběru SL faktoru.
+
+Nejlepší faktor z grid searche je bodový odhad z-score (mean / std profitu),
+u desítek obchodů z velké části šum. Tady se profity každé dvojice
+(strategie, ticker) převzorkují s vracením `n_boot`-krát a pro každý SL
+faktor se spočítá interval spolehlivosti z-score a pravděpodobnost, že je
+faktor nejlepší.
+
+Převzorkování je vektorové přes dvojice i faktory: vzorek dvojice je vektor
+četností obchodů (multinomický, přes np.bincount) a součty profitu a profitu²
+všech vzorků a faktorů dá jedno dávkové np.matmul. Dvojice s podobnou
+velikostí jdou do jednoho bloku (doplněné nulami na nejdelší), bloky se
+dělí jen podle paměti.
+"""
+import numpy as np
+
+DEFAULT_BOOT = 2000
+CI_LEVEL = 0.95
+# Max. počet prvků matice četností (dvojice × vzorky × obchody) v jednom kroku
+BATCH_ELEMENTS = 1 << 22
+
+
+def _z_from_sums(s1, s2, n):
+    """z-score jako calculate_z_score (std s ddof=1) ze součtů přes obchody"""
+    var = np.maximum(s2 - s1 ** 2 / n, 0.0) / (n - 1)
+    return (s1 / n) / (np.sqrt(var) + 1e-9)
+
+
+def _blocks(order, counts, n_boot, n_columns, budget):
+    """
+    Rozdělí dvojice seřazené podle počtu obchodů na bloky do rozpočtu paměti:
+    aspoň 64 vzorků bloku najednou a součty všech vzorků bloku.
+    """
+    blocks, start = [], 0
+    for i, p in enumerate(order):
+        # Blok je doplněný na počet obchodů poslední (největší) dvojice
+        size = i - start + 1
+        if i > start and (size * counts[p] * min(n_boot, 64) > budget or size * n_boot * n_columns > budget):
+            blocks.append(order[start:i])
+            start = i
+    if start < len(order):
+        blocks.append(order[start:])
+    return blocks
+
+
+def _resampled_sums(values, counts, n_boot, rng, budget):
+    """
+    values: (dvojice × n_max × sloupce) doplněné nulami, counts: obchody dvojic.
+    Vrací součty sloupců přes převzorkované obchody (dvojice × n_boot × sloupce).
+    """
+    n_pairs, n_max, _ = values.shape
+    used = np.arange(n_max)[None, None, :] < counts[:, None, None]
+    scale = counts[:, None, None].astype(np.float32)
+    step = max(1, min(n_boot, budget // (n_pairs * n_max)))
+    out = np.empty((n_pairs, n_boot, values.shape[2]))
+    for b in range(0, n_boot, step):
+        size = min(step, n_boot - b)
+        # Každý vzorek = counts[p] tahů z obchodů dvojice p; pozice za koncem
+        # dvojice (doplnění) padnou do odkládací přihrádky na konci
+        draws = (rng.random((n_pairs, size, n_max), dtype=np.float32) * scale).astype(np.int64)
+        np.minimum(draws, counts[:, None, None] - 1, out=draws)
+        draws += (np.arange(n_pairs)[:, None, None] * size + np.arange(size)[None, :, None]) * n_max
+        bins = n_pairs * size * n_max
+        if not used.all():
+            draws = np.where(used, draws, bins)
+        weights = np.bincount(draws.ravel(), minlength=bins + 1)[:bins]
+        out[:, b:b + size] = np.matmul(weights.reshape(n_pairs, size, n_max).astype(float), values)
+    return out
+
+
+def bootstrap_sl_grid(profits, counts, n_boot=DEFAULT_BOOT, seed=0, ci=CI_LEVEL, budget=BATCH_ELEMENTS):
+    """
+    profits: matice (obchody × SL faktory), obchody dvojic za sebou;
+    counts: počet obchodů každé dvojice (součet = počet řádků).
+    Vrací dict polí (dvojice × faktory): 'sharpe' (bodový odhad), 'ci_low',
+    'ci_high' a 'p_best'. Dvojice s < 3 obchody mají NaN (jako u grid
+    searche se pro ně nic nevybírá).
+    """
+    counts = np.asarray(counts, dtype=np.int64)
+    profits = np.asarray(profits, dtype=float)
+    n_pairs, n_factors = len(counts), profits.shape[1]
+    starts = np.concatenate([[0], np.cumsum(counts)[:-1]]).astype(np.int64)
+    out = {key: np.full((n_pairs, n_factors), np.nan) for key in ('sharpe', 'ci_low', 'ci_high', 'p_best')}
+    rng = np.random.default_rng(seed)
+    tail = (1 - ci) / 2 * 100
+
+    valid = np.flatnonzero(counts >= 3)
+    order = valid[np.argsort(counts[valid], kind='stable')]
+    for block in _blocks(order, counts, n_boot, 2 * n_factors, budget):
+        block_counts = counts[block]
+        n_max = int(block_counts.max())
+        slot = np.arange(n_max)
+        used = slot[None, :] < block_counts[:, None]
+        # Profit a profit² dvojic bloku, doplněné nulami na n_max obchodů
+        values = np.zeros((len(block), n_max, 2 * n_factors))
+        rows = profits[(starts[block][:, None] + slot[None, :])[used]]
+        values[used] = np.hstack([rows, rows * rows])
+
+        sums = _resampled_sums(values, block_counts, n_boot, rng, budget)
+        n = block_counts[:, None, None]
+        z = _z_from_sums(sums[..., :n_factors], sums[..., n_factors:], n)
+
+        total = values.sum(axis=1)
+        out['sharpe'][block] = _z_from_sums(total[:, :n_factors], total[:, n_factors:], n[:, 0])
+        out['ci_low'][block] = np.percentile(z, tail, axis=1)
+        out['ci_high'][block] = np.percentile(z, 100 - tail, axis=1)
+        # Při shodě vyhrává nižší faktor, stejně jako max() v grid searchi
+        best = np.argmax(z, axis=2)
+        out['p_best'][block] = (best[:, :, None] == np.arange(n_factors)).mean(axis=1)
+
+    return out
@@ -0,0 +1,224 @@
+"""
+Inkrementální SL optimalizace přes uložené postačující statistiky.
+
+Pro každou dvojici (strategie, ticker) drží stav součty přes signální řádky
+historického okna: počet, sum a sum² profitu, počet výher a SL hitů pro každý
+SL faktor, plus sum a sum² Day_Return_Pct pro z-score. Další večer se
+přičtou jen nově způsobilé řádky a odečtou řádky, které z 8letého okna
+vypadly – metriky i nejlepší faktor se pak čtou přímo ze součtů.
+
+Aby šly staré řádky odečíst, stav si pamatuje příspěvky FRONT_ROWS
+nejstarších signálních řádků okna a poslední započtený řádek jako otisk. Když otisk nesedí
+(přepočítaná historie, změna strategie) nebo odečítané řádky nejsou známé,
+dvojice se přepočítá celá.
+"""
+import json
+import os
+from datetime import datetime
+
+import numpy as np
+
+STATE_VERSION = 1
+# Kolik nejstarších příspěvků držet pro odečtení (~ počet vynechaných nocí)
+FRONT_ROWS = 10
+# Po tolika inkrementálních krocích se dvojice přepočítá celá (drift float součtů)
+REBUILD_EVERY = 250
+# Relativní tolerance ověření inkrementálních součtů proti plnému přepočtu
+VERIFY_RTOL = 1e-9
+
+
+def empty_state(params):
+    return {'version': STATE_VERSION, 'params': params, 'pairs': {}}
+
+
+def load_state(path, params):
+    """Načte stav; při jiné verzi nebo parametrech (SL grid, komise) vrátí prázdný"""
+    if not os.path.exists(path):
+        return empty_state(params)
+    try:
+        with open(path, 'r') as f:
+            state = json.load(f)
+    except Exception:
+        return empty_state(params)
+    if state.get('version') != STATE_VERSION or state.get('params') != params:
+        return empty_state(params)
+    return state
+
+
+def save_state(state, path):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    state['updated'] = datetime.now().isoformat()
+    tmp = path + '.tmp'
+    # json.dumps používá C encoder, json.dump po kouscích je u velkého stavu řádově pomalejší
+    with open(tmp, 'w') as f:
+        f.write(json.dumps(state))
+    os.replace(tmp, path)
+
+
+def _row_entries(dates, profits, hits, ret):
+    return [
+        {'date': str(dates[i]), 'profit': profits[i].tolist(), 'hit': hits[i].tolist(), 'ret': float(ret[i])}
+        for i in range(len(dates))
+    ]
+
+
+def _fold(entry, profits, hits, ret, sign):
+    """Přičte (sign=1) nebo odečte (sign=-1) příspěvky řádků"""
+    if len(ret) == 0:
+        return
+    entry['n'] += sign * len(ret)
+    entry['sum'] = (np.asarray(entry['sum']) + sign * profits.sum(axis=0)).tolist()
+    entry['sumsq'] = (np.asarray(entry['sumsq']) + sign * (profits ** 2).sum(axis=0)).tolist()
+    entry['wins'] = (np.asarray(entry['wins']) + sign * (profits > 0).sum(axis=0)).tolist()
+    entry['hits'] = (np.asarray(entry['hits']) + sign * hits.sum(axis=0)).tolist()
+    entry['ret_sum'] += sign * float(ret.sum())
+    entry['ret_sumsq'] += sign * float((ret ** 2).sum())
+
+
+def build_pair(dates, rows, simulate, n_factors):
+    """Plný přepočet statistik dvojice ze všech signálních řádků okna"""
+    entry = {'n': 0, 'sum': [0.0] * n_factors, 'sumsq': [0.0] * n_factors,
+             'wins': [0] * n_factors, 'hits': [0] * n_factors,
+             'ret_sum': 0.0, 'ret_sumsq': 0.0, 'updates': 0}
+    profits, hits = simulate(rows, slice(None))
+    _fold(entry, profits, hits, rows['ret'], 1)
+    k = min(FRONT_ROWS, len(dates))
+    entry['front'] = _row_entries(dates[:k], profits[:k], hits[:k], rows['ret'][:k])
+    _set_tail(entry, dates, rows, profits, hits)
+    return entry
+
+
+def _set_tail(entry, dates, rows, profits, hits):
+    """Poslední započtený řádek – otisk pro kontrolu přepočítané historie"""
+    if len(dates):
+        entry['tail'] = _row_entries(dates[-1:], profits[-1:], hits[-1:], rows['ret'][-1:])[0]
+        entry['last_date'] = str(dates[-1])
+    else:
+        entry['tail'] = None
+        entry['last_date'] = None
+
+
+def _same_rows(entry_rows, profits, hits, ret):
+    """Shodují se uložené příspěvky řádků s přepočtenými?"""
+    old_p = np.array([e['profit'] for e in entry_rows], dtype=float)
+    old_r = np.array([e['ret'] for e in entry_rows], dtype=float)
+    # Tolerance: rolling mean v pandas sčítá průběžně, takže Prev_AvgRange
+    # se po posunu začátku okna liší v posledních bitech
+    return np.array_equal(hits, [e['hit'] for e in entry_rows]) \
+        and bool(np.all(np.abs(profits - old_p) <= 1e-9 + VERIFY_RTOL * np.abs(old_p))) \
+        and bool(np.all(np.abs(ret - old_r) <= 1e-12 + VERIFY_RTOL * np.abs(old_r)))
+
+
+def update_pair(entry, dates, rows, window_start, simulate, n_factors):
+    """
+    Posune statistiky dvojice na aktuální okno.
+    dates: datum každého signálního řádku okna (datetime64[D], vzestupně),
+    rows: sloupce těchto řádků (Open, High, Low, Close, Prev_AvgRange,
+    is_long, ret), window_start: datum prvního řádku historického okna.
+    `simulate(rows, slice)` vrací (profits, hits) řádků × SL faktorů.
+    Vrací (entry, rebuilt) – rebuilt=True pokud bylo nutné přepočítat vše.
+    """
+    if entry is None or not len(dates) or entry.get('updates', 0) >= REBUILD_EVERY:
+        return build_pair(dates, rows, simulate, n_factors), True
+
+    front = entry.get('front') or []
+    front_dates = np.array([e['date'] for e in front], dtype='datetime64[D]')
+    n_dropped = int((front_dates < window_start).sum())
+    kept = len(front) - n_dropped
+
+    # Všechny známé staré řádky vypadly a mohly vypadnout i další – nelze odečíst
+    if kept == 0 and entry['n'] > len(front):
+        return build_pair(dates, rows, simulate, n_factors), True
+
+    # Zbylé nejstarší řádky musí být stále první signální řádky okna
+    k = min(FRONT_ROWS, len(dates))
+    if kept > k or not np.array_equal(dates[:kept], front_dates[n_dropped:]):
+        return build_pair(dates, rows, simulate, n_factors), True
+
+    # Otisk: poslední dříve započtený řádek (pokud je v okně) dává stejný
+    # příspěvek; simuluje se od něj do konce, nové řádky jsou ve stejném volání
+    tail = entry.get('tail')
+    start = 0
+    if tail is not None and np.datetime64(tail['date']) >= window_start:
+        pos = int(np.searchsorted(dates, np.datetime64(tail['date'])))
+        if pos >= len(dates) or dates[pos] != np.datetime64(tail['date']):
+            return build_pair(dates, rows, simulate, n_factors), True
+        start = pos + 1
+    new_p, new_h = simulate(rows, slice(max(start - 1, 0), len(dates)))
+    if start:
+        if not _same_rows([tail], new_p[:1], new_h[:1], rows['ret'][start - 1:start]):
+            return build_pair(dates, rows, simulate, n_factors), True
+        tail_p, tail_h = new_p, new_h
+        new_p, new_h = new_p[1:], new_h[1:]
+    else:
+        tail_p, tail_h = new_p, new_h
+
+    # Odečti vypadlé řádky (přesně to, co se kdysi přičetlo), přičti nové
+    if n_dropped:
+        gone = front[:n_dropped]
+        _fold(entry,
+              np.array([e['profit'] for e in gone], dtype=float),
+              np.array([e['hit'] for e in gone], dtype=bool),
+              np.array([e['ret'] for e in gone], dtype=float), -1)
+    _fold(entry, new_p, new_h, rows['ret'][start:], 1)
+
+    # Počet řádků musí sedět s aktuálním oknem, jinak se něco rozešlo
+    if entry['n'] != len(dates):
+        return build_pair(dates, rows, simulate, n_factors), True
+
+    # Doplň zásobník nejstarších řádků na FRONT_ROWS
+    front = front[n_dropped:]
+    if kept < k:
+        p, h = simulate(rows, slice(kept, k))
+        front += _row_entries(dates[kept:k], p, h, rows['ret'][kept:k])
+    entry['front'] = front
+    entry['updates'] = entry.get('updates', 0) + 1
+    _set_tail(entry, dates, rows, tail_p, tail_h)
+    return entry, False
+
+
+def metrics_from_stats(entry, sl_grid, mode_strat):
+    """
+    Stejný výstup jako optimize_pair: (z_score, best_sl, best_metrics),
+    best_metrics je None při < 3 signálech.
+    """
+    n = entry['n']
+    if n < 3:
+        return 0, 0.5, None
+
+    total = np.asarray(entry['sum'], dtype=float)
+    sumsq = np.asarray(entry['sumsq'], dtype=float)
+    var = np.maximum(sumsq - total ** 2 / n, 0.0) / (n - 1)
+    sharpe = (total / n) / (np.sqrt(var) + 1e-9)
+    i = int(np.argmax(sharpe))
+
+    best = {
+        'sl_factor': sl_grid[i],
+        'total_profit': float(total[i]),
+        'win_rate': float(entry['wins'][i] / n * 100),
+        'avg_profit': float(total[i] / n),
+        'sharpe': float(sharpe[i]),
+        'num_trades': int(n),
+        'sl_hit_rate': float(entry['hits'][i] / n * 100)
+    }
+
+    ret_mean = entry['ret_sum'] / n
+    if mode_strat == 'M':
+        z_score = ret_mean
+    else:
+        ret_var = max(entry['ret_sumsq'] - entry['ret_sum'] ** 2 / n, 0.0) / (n - 1)
+        z_score = ret_mean / (np.sqrt(ret_var) + 1e-9)
+    return float(z_score), sl_grid[i], best
+
+
+def compare_stats(a, b, rtol=VERIFY_RTOL):
+    """Největší relativní rozdíl dvou statistik (inf pokud se liší počty)"""
+    if a['n'] != b['n'] or a['wins'] != b['wins'] or a['hits'] != b['hits']:
+        return float('inf')
+    diff = 0.0
+    for key in ('sum', 'sumsq', 'ret_sum', 'ret_sumsq'):
+        x = np.atleast_1d(np.asarray(a[key], dtype=float))
+        y = np.atleast_1d(np.asarray(b[key], dtype=float))
+        scale = np.maximum(np.abs(y), 1.0)
+        diff = max(diff, float(np.max(np.abs(x - y) / scale)) if len(x) else 0.0)
+    return diff
@@ -0,0 +1,111 @@
+"""
+Spojitý sweep stop-lossu přes seřazené adverse excursion.
+
+Obchod s SL faktorem s skončí na stopu, právě když jeho nepříznivý pohyb
+(Open - Low u longu, High - Open u shortu) v násobcích Prev_AvgRange je
+aspoň s. Pro dané s tedy obchody s excursion >= s prodělají s * shares * R
+(+ komise) a ostatní mají profit Open -> Close. Po jednom seřazení
+excursion dají prefixové součty profit, profit², výhry a SL hity pro
+libovolně mnoho prahů najednou – O(n log n) na dvojici místo jednoho
+průchodu všemi obchody za každý bod gridu.
+
+Prahy se zaokrouhlí na přesnost SL v signálech (SL_DECIMALS) ještě před
+vyhodnocením, takže vybraný faktor je přesně ten, se kterým se obchoduje.
+
+Pro prahy z SL_GRID dává stejná čísla jako evaluate_sl_grid v agent.py.
+"""
+import numpy as np
+
+# Přesnost SL faktoru v signálech (generate_signals_for_tomorrow: round(sl, 2))
+SL_DECIMALS = 2
+# Hustý grid SL faktorů v přesnosti signálů
+SWEEP_GRID = np.round(np.arange(0.2, 5.0 + 1e-9, 0.01), SL_DECIMALS)
+
+
+def trade_terms(open_, high, low, close, avg_range, is_long, allocation_usd, commission_pct):
+    """
+    Rozloží obchody na (excursion, loss_per_sl, close_pnl): profit obchodu
+    při faktoru s je -s * loss_per_sl - komise, pokud excursion >= s,
+    jinak close_pnl (už po komisi). Vrací i komisi na obchod.
+    """
+    shares = np.floor(allocation_usd / open_)
+    adverse = np.where(is_long, open_ - low, high - open_)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        excursion = adverse / avg_range
+    # R = 0 -> stop na Open, zasáhne každý práh; R = NaN -> stop se nikdy nespustí
+    excursion = np.where(avg_range == 0, np.inf, excursion)
+    excursion = np.where(np.isnan(excursion), -np.inf, excursion)
+    commission = allocation_usd * commission_pct * 2
+    close_pnl = np.where(is_long, shares * (close - open_), shares * (open_ - close)) - commission
+    return excursion, shares * np.nan_to_num(avg_range), close_pnl, commission
+
+
+def sweep_curve(excursion, loss_per_sl, close_pnl, commission, thresholds):
+    """
+    Metriky pro každý práh (pole délky len(thresholds)): total_profit,
+    sumsq, wins, sl_hits a sharpe (jako calculate_z_score).
+    """
+    thresholds = np.asarray(thresholds, dtype=float)
+    n = len(excursion)
+    order = np.argsort(excursion, kind='stable')
+    ex = excursion[order]
+    a = loss_per_sl[order]
+    b = close_pnl[order]
+
+    def prefix(x):
+        return np.concatenate([[0.0], np.cumsum(x)])
+
+    pre_b, pre_b2, pre_w = prefix(b), prefix(b * b), prefix(b > 0)
+    pre_a, pre_a2 = prefix(a), prefix(a * a)
+    # k = počet obchodů pod prahem (bez SL); zbytek zasáhne stop
+    k = np.searchsorted(ex, thresholds, side='left')
+    suf_a = pre_a[-1] - pre_a[k]
+    suf_a2 = pre_a2[-1] - pre_a2[k]
+    hits = n - k
+
+    total = pre_b[k] - thresholds * suf_a - commission * hits
+    sumsq = pre_b2[k] + thresholds ** 2 * suf_a2 + 2 * thresholds * commission * suf_a + commission ** 2 * hits
+    if n < 3:
+        sharpe = np.zeros(len(thresholds))
+    else:
+        var = np.maximum(sumsq - total ** 2 / n, 0.0) / (n - 1)
+        sharpe = (total / n) / (np.sqrt(var) + 1e-9)
+    return {'total_profit': total, 'sumsq': sumsq, 'wins': pre_w[k], 'sl_hits': hits, 'sharpe': sharpe}
+
+
+def sweep_thresholds(excursion, grid=SWEEP_GRID, exact=False):
+    """
+    Prahy ke zkoušení v přesnosti SL_DECIMALS: hustý grid, s exact=True navíc
+    sousední obchodovatelné faktory (zaokrouhlení dolů a nahoru) každé
+    excursion v jeho rozsahu – obě strany místa, kde se mění množina
+    zasažených obchodů. Mezi nimi se zasažené obchody nemění; faktory
+    jemnější než SL v signálech se nezkouší, protože by se neobchodovaly.
+    """
+    grid = np.unique(np.round(np.asarray(grid, dtype=float), SL_DECIMALS))
+    if not exact:
+        return grid
+    ex = excursion[(excursion >= grid[0]) & (excursion <= grid[-1])] * 10 ** SL_DECIMALS
+    snapped = np.concatenate([np.floor(ex), np.ceil(ex)]) / 10 ** SL_DECIMALS
+    return np.unique(np.concatenate([grid, np.round(snapped, SL_DECIMALS)]))
+
+
+def best_threshold(excursion, loss_per_sl, close_pnl, commission, thresholds):
+    """
+    Nejlepší práh podle sharpe a jeho metriky (stejné klíče jako evaluate_sl_grid).
+    Prahy se nejdřív zaokrouhlí na SL_DECIMALS, metriky tedy platí pro
+    faktor, který se zapíše do signálu.
+    """
+    thresholds = np.unique(np.round(np.asarray(thresholds, dtype=float), SL_DECIMALS))
+    curve = sweep_curve(excursion, loss_per_sl, close_pnl, commission, thresholds)
+    # Při shodě vyhrává nižší práh, stejně jako max() v grid searchi
+    i = int(np.argmax(curve['sharpe']))
+    n = len(excursion)
+    return {
+        'sl_factor': float(thresholds[i]),
+        'total_profit': float(curve['total_profit'][i]),
+        'win_rate': float(curve['wins'][i] / n * 100),
+        'avg_profit': float(curve['total_profit'][i] / n),
+        'sharpe': float(curve['sharpe'][i]),
+        'num_trades': int(n),
+        'sl_hit_rate': float(curve['sl_hits'][i] / n * 100)
+    }
@@ -0,0 +1,80 @@
+"""
+Registr strategií: vstupní pravidlo, směr a skóre každé strategie jsou
+definované jen jednou jako vektorové výrazy nad sloupci featur.
+
+Výrazy dostanou funkci `c(name)`, která vrací sloupec jako numpy pole –
+matici celého panelu (řádky × tickery) i 1D sloupec jednoho tickeru –
+a dict parametrů `p` (výchozí hodnoty v 'params', přepisují se např. při
+sweepu parametrů).
+Signální matice se spočítá jednou za běh a sdílí ji optimalizace,
+backtest i generace signálů.
+"""
+import numpy as np
+
+
+def _always_long(c):
+    return np.ones(np.shape(c('Close')), dtype=bool)
+
+
+def _distance_to_high20(c):
+    return np.abs(c('Prev_Close') - c('Prev_High20_Strict')) / (c('Prev_AvgRange') + 1e-9)
+
+
+# score=None -> skóre je z-score tickeru z optimalizace (ticker_performance)
+STRATEGIES = {
+    'A': {
+        'name': 'Mean Reversion',
+        'params': {'distance': 0.4},
+        'mask': lambda c, p: _distance_to_high20(c) < p['distance'],
+        'is_long': _always_long,
+        'score': None,
+    },
+    'B': {
+        'name': 'Volume Breakout',
+        'params': {'volume_mult': 1.5},
+        'mask': lambda c, p: c('Prev_Volume') > c('Prev_V_Avg') * p['volume_mult'],
+        'is_long': lambda c: c('Prev_Close') > c('Prev_Open'),
+        'score': None,
+    },
+    'V': {
+        'name': 'Trend Breakout',
+        'params': {},
+        'mask': lambda c, p: c('Prev_High') > c('Prev_High20_Strict'),
+        'is_long': _always_long,
+        'score': None,
+    },
+    'M': {
+        'name': 'Momentum',
+        'params': {},
+        'mask': lambda c, p: ~np.isnan(c('Day_Return_Pct')),
+        'is_long': _always_long,
+        'score': lambda c: c('Day_Return_Pct'),
+    },
+}
+STRATEGY_MODES = list(STRATEGIES)
+
+
+def evaluate_strategy(mode, c, params=None):
+    """
+    Vrátí (mask, is_long, score nebo None) pro strategii nad sloupci `c`.
+    `params` přepíše výchozí parametry strategie (jen zadané klíče).
+    """
+    spec = STRATEGIES[mode]
+    p = dict(spec['params'], **(params or {}))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mask = np.asarray(spec['mask'](c, p), dtype=bool)
+        is_long = np.asarray(spec['is_long'](c), dtype=bool)
+        score = spec['score'](c) if spec['score'] is not None else None
+    return mask, is_long, score
+
+
+def compute_signal_matrix(panel, modes=None):
+    """
+    Signální matice všech strategií nad celým panelem featur.
+    signals[mode] = {'mask', 'is_long', 'score'}; matice mají tvar panelu.
+    """
+    signals = {}
+    for mode in modes or STRATEGY_MODES:
+        mask, is_long, score = evaluate_strategy(mode, panel.column)
+        signals[mode] = {'mask': mask, 'is_long': is_long, 'score': score}
+    return signals
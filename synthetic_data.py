@@ -0,0 +1,72 @@
+"""
+Syntetická OHLCV data (geometrický Brownův pohyb) pro offline benchmarky
+a testy bez připojení k Yahoo.
+"""
+import numpy as np
+import pandas as pd
+
+TRADING_DAYS_PER_YEAR = 252
+BARS_PER_DAY = 78  # 5min bary 9:30-16:00
+
+
+def synthetic_tickers(n_tickers):
+    return [f"SYN{i:04d}" for i in range(n_tickers)]
+
+
+def _ohlc_paths(rng, n_steps, n_tickers, vol, start_price):
+    """Matice Open/High/Low/Close (kroky × tickery) z GBM"""
+    log_ret = rng.normal(0.0002, vol, size=(n_steps, n_tickers))
+    close = start_price * np.exp(np.cumsum(log_ret, axis=0))
+    gap = np.exp(rng.normal(0, vol / 3, size=(n_steps, n_tickers)))
+    open_ = np.vstack([start_price[None, :], close[:-1]]) * gap
+    wick = np.abs(rng.normal(0, vol / 2, size=(2, n_steps, n_tickers)))
+    high = np.maximum(open_, close) * np.exp(wick[0])
+    low = np.minimum(open_, close) * np.exp(-wick[1])
+    return open_, high, low, close
+
+
+def synthetic_daily_bars(n_tickers=50, years=1, seed=0, end=None, min_history=0.8):
+    """
+    Denní bary {ticker: DataFrame} za `years` let. Tickery mají různě dlouhou
+    historii (od `min_history` do 100 % období), jako reálné univerzum.
+    """
+    rng = np.random.default_rng(seed)
+    n_days = int(years * TRADING_DAYS_PER_YEAR)
+    end = pd.Timestamp(end or pd.Timestamp.today()).normalize()
+    index = pd.bdate_range(end=end, periods=n_days, name='Date')
+
+    start_price = rng.uniform(5, 500, size=n_tickers)
+    vol = rng.uniform(0.01, 0.04, size=n_tickers)
+    open_, high, low, close = _ohlc_paths(rng, n_days, n_tickers, vol, start_price)
+    volume = rng.lognormal(13, 1, size=(n_days, n_tickers)).round()
+    lengths = rng.integers(int(n_days * min_history), n_days + 1, size=n_tickers)
+
+    out = {}
+    for j, t in enumerate(synthetic_tickers(n_tickers)):
+        k = lengths[j]
+        out[t] = pd.DataFrame({
+            'Open': open_[-k:, j], 'High': high[-k:, j], 'Low': low[-k:, j],
+            'Close': close[-k:, j], 'Volume': volume[-k:, j]
+        }, index=index[-k:])
+    return out
+
+
+def synthetic_intraday_bars(tickers, days=5, bars_per_day=BARS_PER_DAY, seed=0, end=None):
+    """5min bary {ticker: DataFrame} s indexem v America/New_York, jako yfinance"""
+    rng = np.random.default_rng(seed)
+    end = pd.Timestamp(end or pd.Timestamp.today()).normalize()
+    sessions = pd.bdate_range(end=end, periods=days)
+    offsets = pd.to_timedelta(np.arange(bars_per_day) * 5 + 9 * 60 + 30, unit='min')
+    index = pd.DatetimeIndex([d + o for d in sessions for o in offsets]).tz_localize('America/New_York')
+
+    n = len(tickers)
+    start_price = rng.uniform(5, 500, size=n)
+    open_, high, low, close = _ohlc_paths(rng, len(index), n, np.full(n, 0.002), start_price)
+    volume = rng.lognormal(9, 1, size=(len(index), n)).round()
+    return {
+        t: pd.DataFrame({
+            'Open': open_[:, j], 'High': high[:, j], 'Low': low[:, j],
+            'Close': close[:, j], 'Volume': volume[:, j]
+        }, index=index)
+        for j, t in enumerate(tickers)
+    }
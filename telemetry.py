@@ -0,0 +1,216 @@
+"""
+Telemetrie běhu agenta: čas (wall/CPU), peak RSS fáze (high-water mark
+od začátku fáze), RSS na konci a přírůstek během fáze a počty zpracovaných
+řádků/tickerů pro každou fázi, plus agregované náklady opakovaně volaných
+funkcí (např. optimize_pair po strategiích).
+
+Výsledek se ukládá jako JSON report; volitelně se jedna fáze profiluje
+přes cProfile (PROFILE_STAGE=<fáze>).
+"""
+import cProfile
+import functools
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Aktivní telemetrie běhu (None = hooky nic neměří)
+_ACTIVE = None
+
+
+def peak_rss_mb():
+    """Peak RSS procesu v MB (None kde to OS neumí)"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux hlásí KB, macOS bajty
+    return round(peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024, 1)
+
+
+def rss_mb():
+    """
+    Aktuální RSS procesu v MB z /proc/self/statm. Kde /proc není, vrací
+    peak RSS (ru_maxrss je maximum za celý běh, ne aktuální stav).
+    """
+    try:
+        with open('/proc/self/statm') as f:
+            pages = int(f.read().split()[1])
+        return round(pages * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024), 1)
+    except (OSError, ValueError, IndexError, AttributeError):
+        return peak_rss_mb()
+
+
+def _hwm_mb():
+    """High-water mark RSS (VmHWM z /proc/self/status) v MB; kde /proc není, ru_maxrss"""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except (OSError, ValueError, IndexError):
+        pass
+    return peak_rss_mb()
+
+
+def _reset_hwm():
+    """
+    Srovná high-water mark RSS na aktuální RSS (Linux: '5' do
+    /proc/self/clear_refs). Vynuluje i ru_maxrss, proto peak celého běhu
+    drží RunTelemetry sama. False, kde to nejde – peak fáze je pak
+    maximum za celý běh.
+    """
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+class RunTelemetry:
+
+    def __init__(self, profile_stage=None, profile_dir=None):
+        self.started = datetime.now()
+        self.stages = []
+        self.counters = {}
+        self.profile_stage = profile_stage
+        self.profile_dir = profile_dir or os.getcwd()
+        self.peak_mb = None
+        # Running peak otevřených fází (vnořené fáze high-water mark resetují)
+        self._open = []
+
+    def _note_peak(self, value):
+        """Započte high-water mark do peaku běhu a všech otevřených fází"""
+        if value is None:
+            return
+        self.peak_mb = value if self.peak_mb is None else max(self.peak_mb, value)
+        for peak in self._open:
+            peak[0] = value if peak[0] is None else max(peak[0], value)
+
+    @contextmanager
+    def stage(self, name, **info):
+        """
+        Změří blok kódu jako fázi. Volající může do vráceného dictu doplnit
+        rows, tickers, cache_hits apod.
+        """
+        record = {'stage': name}
+        record.update(info)
+        profiler = cProfile.Profile() if name == self.profile_stage else None
+        self._note_peak(_hwm_mb())
+        per_stage = _reset_hwm()
+        peak = [None]
+        self._open.append(peak)
+        rss = rss_mb()
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        if profiler:
+            profiler.enable()
+        try:
+            yield record
+        finally:
+            if profiler:
+                profiler.disable()
+                path = os.path.join(self.profile_dir, f"profile_{name}.prof")
+                profiler.dump_stats(path)
+                record['profile'] = path
+            record['wall_s'] = round(time.perf_counter() - wall, 4)
+            record['cpu_s'] = round(time.process_time() - cpu, 4)
+            self._note_peak(_hwm_mb())
+            self._open.remove(peak)
+            record['peak_rss_mb'] = peak[0]
+            if not per_stage:
+                record['peak_rss_cumulative'] = True
+            end = rss_mb()
+            record['rss_mb'] = end
+            record['rss_delta_mb'] = round(end - rss, 1) if end is not None and rss is not None else None
+            self.stages.append(record)
+
+    def add(self, name, wall_s, cpu_s, calls=1, rows=0):
+        """Přičte náklady jednoho či více volání k agregovanému čítači"""
+        c = self.counters.setdefault(name, {'calls': 0, 'wall_s': 0.0, 'cpu_s': 0.0, 'rows': 0})
+        c['calls'] += calls
+        c['wall_s'] += wall_s
+        c['cpu_s'] += cpu_s
+        c['rows'] += rows
+
+    def report(self):
+        peaks = [v for v in (self.peak_mb, _hwm_mb()) if v is not None]
+        return {
+            'started': self.started.isoformat(),
+            'finished': datetime.now().isoformat(),
+            'total_wall_s': round(sum(s['wall_s'] for s in self.stages), 4),
+            'peak_rss_mb': max(peaks) if peaks else None,
+            'stages': self.stages,
+            'counters': {
+                k: {**v, 'wall_s': round(v['wall_s'], 4), 'cpu_s': round(v['cpu_s'], 4)}
+                for k, v in sorted(self.counters.items())
+            }
+        }
+
+    def write(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.report(), f, indent=2)
+
+    def print_summary(self):
+        print(f"\n⏱️  Telemetrie fází:")
+        for s in self.stages:
+            extra = ', '.join(f"{k}={s[k]}" for k in ('rows', 'tickers', 'cache_hits') if k in s)
+            rss = (f"peak={s['peak_rss_mb']} MB rss={s['rss_mb']} MB (Δ{s['rss_delta_mb']:+} MB)"
+                   if s['rss_delta_mb'] is not None else "rss=n/a")
+            print(f"   {s['stage']:12s} wall={s['wall_s']:>8.2f}s cpu={s['cpu_s']:>8.2f}s {rss} {extra}")
+
+
+def activate(telemetry):
+    """Nastaví telemetrii, do které zapisují hooky (track_calls)"""
+    global _ACTIVE
+    _ACTIVE = telemetry
+    return telemetry
+
+
+def current():
+    return _ACTIVE
+
+
+@contextmanager
+def timed(name, rows=0):
+    """Jako track_calls pro blok kódu: přičte jeho čas k čítači aktivní telemetrie"""
+    tel = _ACTIVE
+    if tel is None:
+        yield
+        return
+    wall = time.perf_counter()
+    cpu = time.process_time()
+    try:
+        yield
+    finally:
+        tel.add(name, time.perf_counter() - wall, time.process_time() - cpu, rows=rows)
+
+
+def track_calls(name, key_arg=None):
+    """
+    Dekorátor: agreguje čas volání funkce do aktivní telemetrie.
+    key_arg = index pozičního argumentu, jehož hodnota se přidá k názvu
+    (např. strategie -> 'optimize_sl.A').
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if _ACTIVE is None:
+                return fn(*args, **kwargs)
+            wall = time.perf_counter()
+            cpu = time.process_time()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                key = name if key_arg is None or len(args) <= key_arg else f"{name}.{args[key_arg]}"
+                rows = len(args[0]) if args and hasattr(args[0], '__len__') else 0
+                _ACTIVE.add(key, time.perf_counter() - wall, time.process_time() - cpu, rows=rows)
+        return wrapper
+    return decorator
@@ -0,0 +1,55 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# Moduly agenta leží v kořeni repozitáře (nejsou balíček)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from synthetic_data import synthetic_daily_bars  # noqa: E402
+
+# Pevný konec syntetických dat, aby testy nezávisely na dnešním datu
+END = '2026-06-30'
+
+
+def make_trades(n_days=90, per_day=2, seed=0, end=END):
+    """
+    Log obchodů ve formátu final_backtest_results.csv z denních syntetických
+    barů (Open -> Close), v pořadí zápisu. Pár obchodů je zapsaný o den
+    později (zpožděná data tickeru), jako ve skutečném logu.
+    """
+    bars = synthetic_daily_bars(12, years=1, seed=seed, end=end, min_history=1.0)
+    tickers = list(bars)
+    dates = bars[tickers[0]].index[-n_days:]
+    rng = np.random.default_rng(seed)
+    rows = []
+    for day in dates:
+        for s, group in (('A', 'BIG + ETF'), ('B', 'BIG + ETF'), ('V', 'SMALL'), ('M', 'SMALL')):
+            for t in rng.choice(tickers, size=per_day, replace=False):
+                bar = bars[t].loc[day]
+                side = 'Long' if rng.random() < 0.6 else 'Short'
+                shares = np.floor(10000 / bar['Open'])
+                move = bar['Close'] - bar['Open']
+                profit = shares * (move if side == 'Long' else -move) - 2.0
+                rows.append({
+                    'Date': day.strftime('%Y-%m-%d'), 'Strategy': s, 'Ticker': t, 'Side': side,
+                    'Type': 'INTRADAY-5MIN', 'Entry': round(float(bar['Open']), 2),
+                    'Exit': round(float(bar['Close']), 2), 'Profit': round(float(profit), 2),
+                    'SL-Factor': float(rng.choice([0.4, 0.6, 0.8, 1.6, 3.2])),
+                    'Hit-SL': bool(rng.random() < 0.2), 'Ticker-Group': group,
+                    'Num-5min-Bars': 78,
+                })
+    df = pd.DataFrame(rows)
+    # Obchody zapsané o den později (8 obchodů na den) – řádek i přijde až za i + 8
+    order = list(range(len(df)))
+    for i in range(20, len(df) - 10, len(df) // 5):
+        order.remove(i)
+        order.insert(order.index(i + 8) + 1, i)
+    return df.iloc[order].reset_index(drop=True)
+
+
+@pytest.fixture
+def trades():
+    return make_trades()
@@ -0,0 +1,113 @@
+"""
+artifact_fetch: podmíněný GET přes diskovou cache proti lokálnímu HTTP
+serveru s ETag (304 = cache hit), stará kopie při výpadku, lokální soubory.
+"""
+import hashlib
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import artifact_fetch
+
+
+class ArtifactServer:
+    """Statické artefakty s ETag; zaznamenává (cesta, status) každého requestu"""
+
+    def __init__(self, files):
+        self.files = dict(files)
+        self.log = []
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = server.files.get(self.path.lstrip('/'))
+                if body is None:
+                    status = 404
+                else:
+                    etag = '"%s"' % hashlib.sha1(body).hexdigest()
+                    status = 304 if self.headers.get('If-None-Match') == etag else 200
+                server.log.append((self.path.lstrip('/'), status))
+                self.send_response(status)
+                if body is not None:
+                    self.send_header('ETag', etag)
+                if status == 200:
+                    self.send_header('Content-Length', str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                else:
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}/"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def stop(self):
+        if self.httpd is not None:
+            self.httpd.shutdown()
+            self.httpd.server_close()
+            self.httpd = None
+
+
+@pytest.fixture
+def server():
+    srv = ArtifactServer({'a.csv': b'Date,Profit\n2026-06-30,1.5\n', 'b.json': b'{"A": []}'})
+    yield srv
+    srv.stop()
+
+
+def test_conditional_fetch_hit_miss_and_change(server, tmp_path):
+    cache = str(tmp_path / 'http')
+    artifacts = {'a.csv': [], 'b.json': []}
+
+    stats = {}
+    first = artifact_fetch.fetch_artifacts(artifacts, server.url, cache, stats=stats)
+    assert first == server.files and stats['miss'] == 2
+
+    stats = {}
+    second = artifact_fetch.fetch_artifacts(artifacts, server.url, cache, stats=stats)
+    assert second == server.files and stats['hit'] == 2
+    assert sorted(server.log[-2:]) == [('a.csv', 304), ('b.json', 304)]
+
+    server.files['a.csv'] = b'Date,Profit\n2026-07-01,-2.0\n'
+    stats = {}
+    third = artifact_fetch.fetch_artifacts(artifacts, server.url, cache, stats=stats)
+    assert third['a.csv'] == server.files['a.csv']
+    assert stats['sources'] == {'a.csv': 'miss', 'b.json': 'hit'}
+
+
+def test_stale_copy_when_server_is_down(server, tmp_path):
+    cache = str(tmp_path / 'http')
+    artifact_fetch.fetch_artifacts({'a.csv': []}, server.url, cache)
+    url = server.url
+    server.stop()
+
+    stats = {}
+    out = artifact_fetch.fetch_artifacts({'a.csv': [], 'b.json': []}, url, cache, timeout=2, stats=stats)
+    assert out == {'a.csv': server.files['a.csv']}
+    assert stats['sources'] == {'a.csv': 'stale'}
+    assert list(stats['errors']) == ['b.json']
+
+
+def test_missing_artifact_is_reported(server, tmp_path):
+    stats = {}
+    out = artifact_fetch.fetch_artifacts({'nope.json': []}, server.url, str(tmp_path / 'http'), stats=stats)
+    assert out == {} and 'nope.json' in stats['errors']
+
+
+def test_local_file_wins_without_request(server, tmp_path):
+    local = tmp_path / 'a.csv'
+    local.write_bytes(b'local')
+    stats = {}
+    out = artifact_fetch.fetch_artifacts({'a.csv': [str(local)]}, server.url, str(tmp_path / 'http'), stats=stats)
+    assert out == {'a.csv': b'local'} and stats['local'] == 1
+    assert server.log == []
+
+    stats = {}
+    out = artifact_fetch.fetch_artifacts({'a.csv': [str(local)]}, server.url, str(tmp_path / 'http'),
+                                         prefer_local=False, stats=stats)
+    assert out == {'a.csv': server.files['a.csv']} and stats['miss'] == 1
@@ -0,0 +1,159 @@
+"""
+bar_archive: append po dnech sezení, přeskočení stejných dnů, přepsání
+neúplného dne a čtení (frame, day_bars, stack) proti původním barům.
+"""
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+import bar_archive
+from conftest import END
+from intraday_fill import stack_bars
+from synthetic_data import synthetic_intraday_bars
+
+TICKERS = ['SYN0000', 'SYN0001', 'SYN0002']
+
+
+def _bars(days=5, end=END):
+    return synthetic_intraday_bars(TICKERS, days=days, seed=7, end=end)
+
+
+def _assert_frame(got, want):
+    # Archiv drží čas v ns, pandas může syntetický index vytvořit v us
+    want = want[bar_archive.COLUMNS].set_axis(want.index.as_unit('ns'))
+    pd.testing.assert_frame_equal(got, want, check_names=False, check_freq=False)
+
+
+def test_append_and_read_back(tmp_path):
+    archive_dir = str(tmp_path / 'archive')
+    bars = _bars()
+    stats = {}
+    written = bar_archive.append_bars(bars, archive_dir, stats=stats)
+    assert written == sum(len(df) for df in bars.values())
+    assert stats == {'days_added': 15, 'days_replaced': 0, 'days_unchanged': 0, 'bars_added': written}
+
+    archive = bar_archive.BarArchive(archive_dir)
+    assert len(archive) == 15 and all(t in archive for t in TICKERS)
+    sessions = pd.DatetimeIndex(bars[TICKERS[0]].index.tz_localize(None).normalize().unique())
+    assert list(archive.sessions()) == list(sessions.values.astype('datetime64[D]'))
+    for t, df in bars.items():
+        _assert_frame(archive.frame(t), df)
+
+    day = sessions[2]
+    one = archive.day_bars(TICKERS[1], day)
+    want = bars[TICKERS[1]][bars[TICKERS[1]].index.tz_localize(None).normalize() == day]
+    np.testing.assert_array_equal(one['Close'], want['Close'].to_numpy())
+    assert archive.day_bars('NOPE', day) is None
+    assert archive.day_bars(TICKERS[1], np.datetime64('2000-01-03')) is None
+
+
+def test_reappend_same_days_is_noop(tmp_path):
+    archive_dir = str(tmp_path / 'archive')
+    bar_archive.append_bars(_bars(), archive_dir)
+    manifest = bar_archive.load_manifest(archive_dir)
+
+    stats = {}
+    assert bar_archive.append_bars(_bars(), archive_dir, stats=stats) == 0
+    assert stats['days_unchanged'] == 15 and stats['days_added'] == 0
+    assert bar_archive.load_manifest(archive_dir) == manifest
+
+
+def test_partial_day_replaced_by_full_day(tmp_path):
+    archive_dir = str(tmp_path / 'archive')
+    bars = _bars()
+    # Poslední den uložený jen do poledne (běh během obchodování)
+    partial = {t: df.iloc[:-40] for t, df in bars.items()}
+    bar_archive.append_bars(partial, archive_dir)
+
+    stats = {}
+    written = bar_archive.append_bars(bars, archive_dir, stats=stats)
+    full_day = len(bars[TICKERS[0]]) // 5
+    assert stats['days_replaced'] == 3 and stats['days_unchanged'] == 12 and stats['days_added'] == 0
+    assert written == 3 * full_day
+
+    manifest = bar_archive.load_manifest(archive_dir)
+    assert manifest['dead_bars'] == 3 * (full_day - 40)
+    assert manifest['n_bars'] == sum(len(df) for df in bars.values()) + manifest['dead_bars']
+    # Stará generace indexu je smazaná
+    assert sorted(f for f in os.listdir(archive_dir) if f.startswith('index-')) == [manifest['index']]
+
+    archive = bar_archive.BarArchive(archive_dir)
+    for t, df in bars.items():
+        _assert_frame(archive.frame(t), df)
+
+
+def test_new_days_appended(tmp_path):
+    archive_dir = str(tmp_path / 'archive')
+    bars = _bars(days=6)
+    older = {t: df.iloc[:-len(df) // 6] for t, df in bars.items()}
+    bar_archive.append_bars(older, archive_dir)
+    stats = {}
+    bar_archive.append_bars(bars, archive_dir, stats=stats)
+    assert stats['days_added'] == 3 and stats['days_unchanged'] == 15
+
+    archive = bar_archive.BarArchive(archive_dir)
+    assert len(archive.sessions()) == 6
+    for t, df in bars.items():
+        _assert_frame(archive.frame(t), df)
+
+
+def test_stack_matches_stack_bars(tmp_path):
+    archive_dir = str(tmp_path / 'archive')
+    bars = _bars()
+    bar_archive.append_bars(bars, archive_dir)
+    archive = bar_archive.BarArchive(archive_dir)
+
+    days = archive.sessions()
+    pairs = [(TICKERS[0], days[4]), (TICKERS[2], days[1]), ('NOPE', days[0]), (TICKERS[1], days[4])]
+    start, count = archive.locate([t for t, _ in pairs], [d for _, d in pairs])
+    assert list(count > 0) == [True, True, False, True]
+
+    frames = [bars[t][bars[t].index.tz_localize(None).normalize() == pd.Timestamp(d)] if t in bars
+              else bars[TICKERS[0]].iloc[:0] for t, d in pairs]
+    want, want_times, want_counts = stack_bars(frames)
+    got, got_times, got_counts = archive.stack(start, count)
+    np.testing.assert_array_equal(got_counts, want_counts)
+    np.testing.assert_array_equal(got_times, want_times)
+    for c in want:
+        np.testing.assert_array_equal(got[c], want[c])
+
+
+def test_torn_write_is_invisible_and_truncated(tmp_path):
+    archive_dir = str(tmp_path / 'archive')
+    bars = _bars(days=6)
+    older = {t: df.iloc[:-len(df) // 6] for t, df in bars.items()}
+    bar_archive.append_bars(older, archive_dir)
+    n_bars = bar_archive.load_manifest(archive_dir)['n_bars']
+
+    # Zápis spadl po připsání sloupců, ale před manifestem
+    for c, dtype in bar_archive.DTYPES.items():
+        with open(os.path.join(archive_dir, f"{c}.bin"), 'ab') as f:
+            np.zeros(17, dtype=dtype).tofile(f)
+    archive = bar_archive.BarArchive(archive_dir)
+    assert archive.n_bars == n_bars
+    for t, df in older.items():
+        _assert_frame(archive.frame(t), df)
+    del archive
+
+    bar_archive.append_bars(bars, archive_dir)
+    manifest = bar_archive.load_manifest(archive_dir)
+    assert manifest['dead_bars'] == 0
+    for c, dtype in bar_archive.DTYPES.items():
+        assert os.path.getsize(os.path.join(archive_dir, f"{c}.bin")) == manifest['n_bars'] * dtype.itemsize
+    archive = bar_archive.BarArchive(archive_dir)
+    for t, df in bars.items():
+        _assert_frame(archive.frame(t), df)
+
+
+def test_unknown_manifest_version_starts_empty(tmp_path):
+    archive_dir = str(tmp_path / 'archive')
+    bar_archive.append_bars(_bars(), archive_dir)
+    path = os.path.join(archive_dir, bar_archive.MANIFEST_NAME)
+    with open(path) as f:
+        manifest = json.load(f)
+    manifest['version'] = bar_archive.ARCHIVE_VERSION + 1
+    with open(path, 'w') as f:
+        json.dump(manifest, f)
+    assert len(bar_archive.BarArchive(archive_dir)) == 0
@@ -0,0 +1,106 @@
+"""
+Inkrementální stav dashboardu (dashboard_state) proti plnému přepočtu:
+stejné metriky jako calculate_metrics a stejný export jako z prázdného stavu.
+"""
+import json
+import os
+
+import pytest
+
+import dashboard
+import dashboard_state
+
+CAPITAL = dashboard.START_CAPITAL
+
+
+def _fold_in_steps(history, steps):
+    state = dashboard_state.empty_state(CAPITAL)
+    for end in steps:
+        state, _ = dashboard_state.update_state(state, history.iloc[:end].reset_index(drop=True))
+    return state
+
+
+def _equity_reference(df):
+    """Denní equity řada jako dřív: kumulativní součet denního profitu"""
+    daily = df.groupby('Date', sort=True)['Profit'].sum()
+    return [{'date': d, 'equity': round(CAPITAL + v, 2)} for d, v in daily.cumsum().items()]
+
+
+def test_incremental_state_matches_full_rebuild(trades):
+    full, rebuilt = dashboard_state.update_state(dashboard_state.empty_state(CAPITAL), trades)
+    assert rebuilt
+    stepped = _fold_in_steps(trades, [100, 101, 350, 600, len(trades)])
+    assert stepped['rows'] == full['rows'] and stepped['checksum'] == full['checksum']
+
+    for s, st in full['strategies'].items():
+        inc = stepped['strategies'][s]
+        assert dashboard_state.strategy_metrics(inc, CAPITAL) == pytest.approx(
+            dashboard_state.strategy_metrics(st, CAPITAL), rel=1e-9)
+        assert dashboard_state.equity_points(inc) == dashboard_state.equity_points(st)
+
+        # A obojí sedí s původním výpočtem nad celou historií strategie
+        part = trades[trades['Strategy'] == s]
+        assert dashboard_state.strategy_metrics(st, CAPITAL) == pytest.approx(
+            dashboard.calculate_metrics(part), rel=1e-9)
+        assert dashboard_state.equity_points(st) == _equity_reference(part)
+
+
+def test_no_new_trades_is_noop(trades):
+    state, _ = dashboard_state.update_state(dashboard_state.empty_state(CAPITAL), trades)
+    stats = {}
+    again, rebuilt = dashboard_state.update_state(json.loads(json.dumps(state)), trades, stats=stats)
+    assert not rebuilt and stats['new_trades'] == 0
+    assert again['strategies'] == state['strategies']
+
+
+@pytest.mark.parametrize('change', ['rewrite', 'truncate'])
+def test_changed_log_triggers_rebuild(trades, change):
+    state, _ = dashboard_state.update_state(dashboard_state.empty_state(CAPITAL), trades.iloc[:400])
+    if change == 'rewrite':
+        history = trades.copy()
+        history.loc[5, 'Profit'] += 100.0
+    else:
+        history = trades.iloc[:300].reset_index(drop=True)
+    stats = {}
+    state, rebuilt = dashboard_state.update_state(state, history, stats=stats)
+    fresh, _ = dashboard_state.update_state(dashboard_state.empty_state(CAPITAL), history)
+    assert rebuilt and stats['rebuild_reason']
+    assert state['strategies'] == fresh['strategies']
+
+
+def test_export_incremental_equals_rebuild(trades, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    signals = {'A': [{'ticker': 'SYN0001', 'action': 'Long', 'sl_factor': 0.8}]}
+
+    def export(history):
+        dashboard.export_dashboard_json({'history': history, 'signals': signals, 'backtest': {}})
+        with open(dashboard.DASHBOARD_JSON) as f:
+            out = json.load(f)
+        out.pop('timestamp')
+        web = {}
+        for name in os.listdir(os.path.join('public', 'data')):
+            with open(os.path.join('public', 'data', name)) as f:
+                web[name] = json.load(f)
+        web['summary.json'].pop('timestamp')
+        web.pop('manifest.json')
+        return out, web
+
+    for end in (250, 500, len(trades)):
+        incremental, incremental_web = export(trades.iloc[:end].reset_index(drop=True))
+    os.remove(dashboard.DASHBOARD_STATE_FILE)
+    rebuilt, rebuilt_web = export(trades)
+
+    assert incremental['equity'] == rebuilt['equity']
+    assert incremental['signals'] == rebuilt['signals']
+    assert set(incremental['strategies']) == set(rebuilt['strategies']) == set('ABVM')
+    for s, info in rebuilt['strategies'].items():
+        assert incremental['strategies'][s]['metrics'] == pytest.approx(info['metrics'], rel=1e-9)
+    # Rozdělená data pro web (summary bez času, obchody po strategiích)
+    assert set(rebuilt_web) == {'summary.json'} | {f'trades_{s}.json' for s in 'ABVM'}
+    for name, payload in rebuilt_web.items():
+        if name != 'summary.json':
+            assert incremental_web[name] == payload
+    for s, info in rebuilt_web['summary.json']['strategies'].items():
+        inc = incremental_web['summary.json']['strategies'][s]
+        assert inc['metrics'] == pytest.approx(info['metrics'], rel=1e-9)
+        assert {k: v for k, v in inc.items() if k != 'metrics'} == {k: v for k, v in info.items() if k != 'metrics'}
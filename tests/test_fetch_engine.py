@@ -0,0 +1,168 @@
+"""
+fetch_engine a provider 'yahoo' proti falešnému chart API na localhostu
+(http.server): opakování, 429 s Retry-After, omezená souběžnost.
+"""
+import json
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pytest
+
+import fetch_engine
+import market_data
+
+DAYS = [1760448600, 1760535000, 1760621400]  # 3 sezení (14.–16. 10. 2025, 13:30 UTC)
+
+
+def chart_payload(ticker):
+    base = 100.0 + len(ticker)
+    return {'chart': {'error': None, 'result': [{
+        'meta': {'symbol': ticker, 'exchangeTimezoneName': 'America/New_York'},
+        'timestamp': DAYS,
+        'indicators': {'quote': [{
+            'open': [base, base + 1, base + 2],
+            'high': [base + 2, base + 3, base + 4],
+            'low': [base - 1, base, base + 1],
+            'close': [base + 1, base + 2, base + 3],
+            'volume': [1000, 2000, 3000],
+        }]},
+    }]}}
+
+
+class FakeChartServer:
+    """
+    Chart API: `script` = {ticker: [status, ...]} pro postupné requesty
+    (po vyčerpání 200), `delay` = doba vyřízení requestu. Zaznamenává časy
+    requestů po tickerech a největší počet souběžných requestů.
+    """
+
+    def __init__(self, script=None, delay=0.0, retry_after='0'):
+        self.script = {t: list(v) for t, v in (script or {}).items()}
+        self.delay = delay
+        self.retry_after = retry_after
+        self.requests = {}
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                ticker = urllib.parse.unquote(urllib.parse.urlparse(self.path).path.rsplit('/', 1)[-1])
+                with server.lock:
+                    server.requests.setdefault(ticker, []).append(time.monotonic())
+                    server.in_flight += 1
+                    server.max_in_flight = max(server.max_in_flight, server.in_flight)
+                    queue = server.script.get(ticker)
+                    status = queue.pop(0) if queue else 200
+                try:
+                    time.sleep(server.delay)
+                    body = json.dumps(chart_payload(ticker) if status == 200 else {}).encode()
+                    self.send_response(status)
+                    if status == 429:
+                        self.send_header('Retry-After', server.retry_after)
+                    self.send_header('Content-Type', 'application/json')
+                    self.send_header('Content-Length', str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                finally:
+                    with server.lock:
+                        server.in_flight -= 1
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def fetch_one(self, ticker):
+        return fetch_engine.http_get_json(f"{self.url}/v8/finance/chart/{ticker}", timeout=5)
+
+
+def test_yahoo_provider_end_to_end():
+    with FakeChartServer({'BBB': [500]}) as server:
+        provider = market_data.YahooHttpProvider(base_url=server.url, concurrency=4, rate=None, retries=2)
+        bars = provider.daily(['AAA', 'BBB', 'AAA'], period='5d')
+    assert list(bars) == ['AAA', 'BBB']
+    df = bars['AAA']
+    assert list(df.columns) == market_data.BAR_COLUMNS
+    assert [str(d.date()) for d in df.index] == ['2025-10-14', '2025-10-15', '2025-10-16']
+    assert np.allclose(df['Close'], [104.0, 105.0, 106.0])
+    assert len(server.requests['BBB']) == 2
+    assert provider.failures == {}
+
+
+def test_transient_errors_are_retried():
+    with FakeChartServer({'AAA': [500, 503], 'BBB': [502]}) as server:
+        stats = {}
+        results, failures = fetch_engine.fetch_all(['AAA', 'BBB', 'CCC'], server.fetch_one, concurrency=2,
+                                                   retries=3, base_delay=0.01, seed=1, stats=stats)
+    assert sorted(results) == ['AAA', 'BBB', 'CCC'] and failures == {}
+    assert {t: len(v) for t, v in server.requests.items()} == {'AAA': 3, 'BBB': 2, 'CCC': 1}
+    assert stats['requests'] == 6 and stats['retries'] == 3 and stats['ok'] == 3
+
+
+def test_gives_up_after_retries_and_keeps_other_keys():
+    with FakeChartServer({'AAA': [500] * 10}) as server:
+        results, failures = fetch_engine.fetch_all(['AAA', 'BBB'], server.fetch_one, retries=2, base_delay=0.01)
+    assert list(results) == ['BBB']
+    assert failures == {'AAA': 'HTTP 500'}
+    assert len(server.requests['AAA']) == 3
+
+
+def test_client_errors_are_not_retried():
+    with FakeChartServer({'AAA': [404] * 5}) as server:
+        results, failures = fetch_engine.fetch_all(['AAA'], server.fetch_one, retries=3, base_delay=0.01)
+    assert results == {} and failures == {'AAA': 'HTTP 404'}
+    assert len(server.requests['AAA']) == 1
+
+
+def test_429_waits_for_retry_after():
+    with FakeChartServer({'AAA': [429, 429]}, retry_after='0.3') as server:
+        stats = {}
+        results, failures = fetch_engine.fetch_all(['AAA'], server.fetch_one, retries=3, base_delay=0.001,
+                                                   stats=stats)
+    assert list(results) == ['AAA'] and failures == {}
+    times = server.requests['AAA']
+    assert len(times) == 3 and stats['retries'] == 2
+    # Backoff (nejvýš 1–2 ms) je kratší než Retry-After, rozhoduje Retry-After
+    assert min(np.diff(times)) >= 0.25
+
+
+def test_429_exhausted_is_reported():
+    with FakeChartServer({'AAA': [429] * 10}) as server:
+        _, failures = fetch_engine.fetch_all(['AAA'], server.fetch_one, retries=1, base_delay=0.001)
+    assert failures == {'AAA': 'HTTP 429'}
+    assert len(server.requests['AAA']) == 2
+
+
+@pytest.mark.parametrize('concurrency', [1, 3])
+def test_concurrency_is_bounded(concurrency):
+    tickers = [f"T{i:02d}" for i in range(12)]
+    with FakeChartServer(delay=0.05) as server:
+        results, failures = fetch_engine.fetch_all(tickers, server.fetch_one, concurrency=concurrency)
+    assert list(results) == tickers and failures == {}
+    assert server.max_in_flight == concurrency
+
+
+def test_rate_limit_spaces_requests():
+    with FakeChartServer() as server:
+        start = time.monotonic()
+        results, _ = fetch_engine.fetch_all([f"T{i}" for i in range(6)], server.fetch_one, concurrency=6,
+                                            rate=20, burst=1)
+        elapsed = time.monotonic() - start
+    assert len(results) == 6
+    # 1 token hned, dalších 5 po 1/20 s
+    assert elapsed >= 0.2
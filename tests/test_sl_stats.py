@@ -0,0 +1,79 @@
+"""
+Inkrementální SL statistiky (sl_stats) proti plné optimalizaci:
+optimize_all_strategies_incremental musí dát stejné SL a z-score jako
+optimize_all_strategies, ať stav vzniká od nuly, nebo se posouvá o nové dny.
+"""
+import pytest
+
+import agent
+from conftest import END
+from features import build_feature_panel
+from strategies import compute_signal_matrix
+from synthetic_data import synthetic_daily_bars
+
+
+@pytest.fixture
+def universe(monkeypatch):
+    """Syntetické denní bary; tickery rozdělené na BIG (A, B) a SMALL (V, M) jako v benchmarku"""
+    raw = synthetic_daily_bars(16, years=1.5, seed=3, end=END)
+    tickers = list(raw)
+    half = len(tickers) // 2
+    monkeypatch.setattr(agent, 'STRATEGY_TICKER_GROUPS', {
+        'A': tickers[:half], 'B': tickers[:half],
+        'V': tickers[half:], 'M': tickers[half:]
+    })
+    return raw
+
+
+def _optimize_inputs(raw):
+    panel = build_feature_panel(raw, list(raw))
+    return panel, compute_signal_matrix(panel)
+
+
+def _assert_same(full, incremental):
+    full_perf, full_sl, full_results = full
+    inc_perf, inc_sl, inc_results = incremental
+    assert inc_sl == full_sl
+    # Součty se skládají v jiném pořadí – shoda na zaokrouhlovací chybu
+    for m, pairs in full_perf.items():
+        assert inc_perf[m] == pytest.approx(pairs, rel=1e-9, abs=1e-12)
+    for m, pairs in full_results.items():
+        assert set(inc_results[m]) == set(pairs)
+        for t, metrics in pairs.items():
+            assert inc_results[m][t] == pytest.approx(metrics, rel=1e-9)
+
+
+def test_fresh_state_matches_full(universe, tmp_path):
+    panel, signals = _optimize_inputs(universe)
+    stats = {}
+    incremental = agent.optimize_all_strategies_incremental(panel, signals, str(tmp_path / 'sl_stats.json'),
+                                                            stats=stats)
+    assert stats['incremental'] == 0 and stats['rebuilt'] > 0
+    _assert_same(agent.optimize_all_strategies(panel, signals), incremental)
+
+
+@pytest.mark.parametrize('new_days', [1, 5])
+def test_rolled_state_matches_full(universe, tmp_path, new_days):
+    state_path = str(tmp_path / 'sl_stats.json')
+    older = {t: df.iloc[:-new_days] for t, df in universe.items()}
+    agent.optimize_all_strategies_incremental(*_optimize_inputs(older), state_path)
+
+    panel, signals = _optimize_inputs(universe)
+    stats = {}
+    incremental = agent.optimize_all_strategies_incremental(panel, signals, state_path, verify=True,
+                                                            stats=stats)
+    assert stats['incremental'] > 0
+    assert stats['verify_max_diff'] <= 1e-9
+    _assert_same(agent.optimize_all_strategies(panel, signals), incremental)
+
+
+def test_changed_params_rebuild(universe, tmp_path, monkeypatch):
+    state_path = str(tmp_path / 'sl_stats.json')
+    panel, signals = _optimize_inputs(universe)
+    agent.optimize_all_strategies_incremental(panel, signals, state_path)
+
+    monkeypatch.setattr(agent, 'COMMISSION_PCT', agent.COMMISSION_PCT * 2)
+    stats = {}
+    incremental = agent.optimize_all_strategies_incremental(panel, signals, state_path, stats=stats)
+    assert stats['incremental'] == 0
+    _assert_same(agent.optimize_all_strategies(panel, signals), incremental)
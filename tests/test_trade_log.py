@@ -0,0 +1,55 @@
+"""trade_log: zápis po dávkách a čtení vrací stejný log jako původní CSV"""
+import os
+
+import pandas as pd
+
+import trade_log
+
+
+def _as_csv(df, path):
+    """Log tak, jak ho čte dashboard z CSV (pd.read_csv)"""
+    df.to_csv(path, index=False)
+    return pd.read_csv(path)
+
+
+def test_round_trip_matches_csv(trades, tmp_path):
+    log_dir = str(tmp_path / 'log')
+    half = len(trades) // 2
+    assert trade_log.append_trades(trades.iloc[:half], log_dir) == half
+    assert trade_log.append_trades(trades.iloc[half:].to_dict('records'), log_dir) == len(trades) - half
+
+    months = sorted(pd.to_datetime(trades['Date']).dt.strftime('%Y-%m').unique())
+    assert trade_log.list_partitions(log_dir) == months
+    expected = _as_csv(trades, tmp_path / 'expected.csv')
+    pd.testing.assert_frame_equal(trade_log.read_trades(log_dir), expected, check_dtype=False)
+
+    # CSV export je stejný soubor jako původní log
+    trade_log.export_csv(str(tmp_path / 'export.csv'), log_dir)
+    pd.testing.assert_frame_equal(pd.read_csv(tmp_path / 'export.csv'), expected)
+
+
+def test_date_range_and_columns(trades, tmp_path):
+    log_dir = str(tmp_path / 'log')
+    trade_log.append_trades(trades, log_dir)
+    start, end = '2026-04-10', '2026-05-20'
+    got = trade_log.read_trades(log_dir, start=start, end=end, columns=['Date', 'Ticker', 'Profit'])
+    dates = pd.to_datetime(trades['Date'])
+    want = trades[(dates >= start) & (dates <= end)][['Date', 'Ticker', 'Profit']].reset_index(drop=True)
+    pd.testing.assert_frame_equal(got, want, check_dtype=False)
+
+
+def test_migrate_csv_once(trades, tmp_path):
+    csv_path = str(tmp_path / 'final_backtest_results.csv')
+    trades.to_csv(csv_path, index=False)
+    log_dir = str(tmp_path / 'log')
+    assert trade_log.migrate_csv(csv_path, log_dir) == len(trades)
+    assert trade_log.migrate_csv(csv_path, log_dir) == 0
+    pd.testing.assert_frame_equal(trade_log.read_trades(log_dir), pd.read_csv(csv_path), check_dtype=False)
+
+
+def test_ensure_log_creates_empty_manifest(tmp_path):
+    log_dir = str(tmp_path / 'trade_log')
+    trade_log.ensure_log(log_dir)
+    assert os.path.exists(os.path.join(log_dir, trade_log.MANIFEST_NAME))
+    assert trade_log.list_partitions(log_dir) == []
+    assert trade_log.read_trades(log_dir).empty
@@ -0,0 +1,210 @@
+"""
+Sloupcový log obchodů rozdělený po měsících (trade_log/YYYY-MM.npz).
+
+Každý sloupec je typované numpy pole; textové sloupce (Strategy, Ticker,
+Side, Type, Ticker-Group) jsou slovníkově kódované – v souboru je jen
+pole kódů a slovník hodnot partition. Čtenář načte jen partition
+v požadovaném rozsahu dat a jen potřebné sloupce.
+
+final_backtest_results.csv zůstává jako export pro kompatibilitu
+(web dashboard, starší skripty). Pořadí řádků drží skrytý sloupec _seq
+(pořadí zápisu), takže čtení přes více partition vrací řádky ve stejném
+pořadí jako původní CSV.
+"""
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+TRADE_LOG_DIR = os.path.join(os.getcwd(), 'trade_log')
+
+# Sloupce ve stejném pořadí jako CSV; typ určuje uložení
+SCHEMA = [
+    ('Date', 'date'),
+    ('Strategy', 'dict'),
+    ('Ticker', 'dict'),
+    ('Side', 'dict'),
+    ('Type', 'dict'),
+    ('Entry', 'float'),
+    ('Exit', 'float'),
+    ('Profit', 'float'),
+    ('SL-Factor', 'float'),
+    ('Hit-SL', 'bool'),
+    ('Ticker-Group', 'dict'),
+    ('Num-5min-Bars', 'int'),
+]
+COLUMNS = [name for name, _ in SCHEMA]
+KINDS = dict(SCHEMA)
+KINDS['_seq'] = 'seq'
+MANIFEST_NAME = 'manifest.json'
+
+
+def _partition_path(log_dir, month):
+    return os.path.join(log_dir, f"{month}.npz")
+
+
+def list_partitions(log_dir=TRADE_LOG_DIR):
+    """Seřazené měsíce ('YYYY-MM'), pro které existuje partition"""
+    return sorted(load_manifest(log_dir)['partitions'])
+
+
+def _encode(df):
+    """DataFrame -> {pole npz} s typovanými a slovníkově kódovanými sloupci"""
+    arrays = {}
+    for name, kind in SCHEMA:
+        col = df[name]
+        if kind == 'date':
+            arrays[name] = pd.to_datetime(col).to_numpy(dtype='datetime64[D]').astype(np.int32)
+        elif kind == 'dict':
+            codes, uniques = pd.factorize(col.astype(str), sort=True)
+            arrays[name] = codes.astype(np.int32)
+            arrays[f"{name}.dict"] = np.asarray(uniques, dtype=str)
+        elif kind == 'float':
+            arrays[name] = col.to_numpy(dtype=np.float64)
+        elif kind == 'bool':
+            if pd.api.types.is_bool_dtype(col):
+                arrays[name] = col.to_numpy(dtype=bool)
+            else:
+                arrays[name] = col.astype(str).str.lower().isin(['true', '1']).to_numpy()
+        else:
+            arrays[name] = col.to_numpy(dtype=np.int64)
+    arrays['_seq'] = df['_seq'].to_numpy(dtype=np.int64)
+    return arrays
+
+
+def _decode(z, columns):
+    out = {}
+    for name in columns:
+        kind = KINDS[name]
+        if kind == 'date':
+            out[name] = z[name].astype('datetime64[D]').astype('datetime64[ns]')
+        elif kind == 'dict':
+            out[name] = z[f"{name}.dict"].astype(object)[z[name]]
+        else:
+            out[name] = z[name]
+    return out
+
+
+def load_manifest(log_dir=TRADE_LOG_DIR):
+    """{'next_seq', 'partitions': {měsíc: {'rows', 'first_date', 'last_date'}}}"""
+    path = os.path.join(log_dir, MANIFEST_NAME)
+    if os.path.exists(path):
+        try:
+            with open(path, 'r') as f:
+                return json.load(f)
+        except Exception:
+            pass
+    return {'next_seq': 0, 'partitions': {}}
+
+
+def _save_manifest(manifest, log_dir):
+    tmp = os.path.join(log_dir, MANIFEST_NAME + '.tmp')
+    with open(tmp, 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp, os.path.join(log_dir, MANIFEST_NAME))
+
+
+def ensure_log(log_dir=TRADE_LOG_DIR):
+    """Založí adresář logu s prázdným manifestem (aby šel commitnout i bez obchodů)"""
+    os.makedirs(log_dir, exist_ok=True)
+    if not os.path.exists(os.path.join(log_dir, MANIFEST_NAME)):
+        _save_manifest(load_manifest(log_dir), log_dir)
+
+
+def read_partition(month, log_dir=TRADE_LOG_DIR, columns=None):
+    """Jedna měsíční partition jako DataFrame (jen vybrané sloupce)"""
+    columns = columns or COLUMNS
+    path = _partition_path(log_dir, month)
+    if not os.path.exists(path):
+        return pd.DataFrame({c: [] for c in columns})
+    with np.load(path) as z:
+        return pd.DataFrame(_decode(z, columns))
+
+
+def read_trades(log_dir=TRADE_LOG_DIR, start=None, end=None, columns=None, date_str=True):
+    """
+    Obchody v rozsahu [start, end] (včetně) s vybranými sloupci, v pořadí
+    zápisu. Partitions mimo rozsah se vůbec neotevřou. date_str=True vrací
+    Date jako 'YYYY-MM-DD' (stejně jako pd.read_csv nad původním CSV).
+    """
+    columns = list(columns or COLUMNS)
+    need = list(dict.fromkeys(columns + ['_seq'] + (['Date'] if start is not None or end is not None else [])))
+    start = pd.Timestamp(start) if start is not None else None
+    end = pd.Timestamp(end) if end is not None else None
+
+    frames = []
+    for month, info in sorted(load_manifest(log_dir)['partitions'].items()):
+        if start is not None and pd.Timestamp(info['last_date']) < start:
+            continue
+        if end is not None and pd.Timestamp(info['first_date']) > end:
+            continue
+        df = read_partition(month, log_dir, need)
+        if start is not None:
+            df = df[df['Date'] >= start]
+        if end is not None:
+            df = df[df['Date'] <= end]
+        frames.append(df)
+
+    if not frames:
+        return pd.DataFrame({c: pd.Series(dtype=object) for c in columns})
+    df = pd.concat(frames, ignore_index=True)
+    if len(frames) > 1:
+        df = df.sort_values('_seq', kind='stable', ignore_index=True)
+    df = df[columns]
+    if date_str and 'Date' in df.columns:
+        df['Date'] = df['Date'].dt.strftime('%Y-%m-%d')
+    return df
+
+
+def append_trades(trades, log_dir=TRADE_LOG_DIR):
+    """
+    Připíše obchody (list dictů nebo DataFrame se sloupci COLUMNS) do
+    měsíčních partition. Přepisuje se jen partition dotčených měsíců.
+    """
+    df = pd.DataFrame(trades)
+    if df.empty:
+        return 0
+    manifest = load_manifest(log_dir)
+    df = df[COLUMNS].reset_index(drop=True)
+    df['_seq'] = manifest['next_seq'] + np.arange(len(df))
+    dates = pd.to_datetime(df['Date'])
+    os.makedirs(log_dir, exist_ok=True)
+    for month, new in df.groupby(dates.dt.strftime('%Y-%m'), sort=True):
+        old = read_partition(month, log_dir, COLUMNS + ['_seq'])
+        if not old.empty:
+            new = pd.concat([old, new], ignore_index=True)
+        path = _partition_path(log_dir, month)
+        tmp = path + '.tmp.npz'
+        np.savez_compressed(tmp, **_encode(new))
+        os.replace(tmp, path)
+        month_dates = pd.to_datetime(new['Date'])
+        manifest['partitions'][month] = {
+            'rows': len(new),
+            'first_date': month_dates.min().strftime('%Y-%m-%d'),
+            'last_date': month_dates.max().strftime('%Y-%m-%d'),
+        }
+    manifest['next_seq'] += len(df)
+    _save_manifest(manifest, log_dir)
+    return len(df)
+
+
+def export_csv(path, log_dir=TRADE_LOG_DIR):
+    """Celý log jako CSV ve formátu původního final_backtest_results.csv"""
+    df = read_trades(log_dir)
+    df.to_csv(path, index=False)
+    return len(df)
+
+
+def migrate_csv(csv_path, log_dir=TRADE_LOG_DIR):
+    """
+    Převede existující CSV log do partition (jen pokud log ještě neexistuje).
+    Vrací počet převedených obchodů.
+    """
+    if list_partitions(log_dir) or not os.path.exists(csv_path):
+        return 0
+    df = pd.read_csv(csv_path)
+    missing = [c for c in COLUMNS if c not in df.columns]
+    if missing:
+        raise ValueError(f"CSV {csv_path} nemá sloupce {missing}")
+    return append_trades(df, log_dir)
@@ -0,0 +1,135 @@
+"""
+Kompaktní data pro statický web dashboard (public/data).
+
+- summary.json:      metriky, denní P/L (skutečnost i 60d backtest), equity
+                     křivky a dnešní signály – stačí na první vykreslení
+- trades_<S>.json:   obchody jedné strategie (sloupcově), stránka je načítá
+                     až při zobrazení tabulek
+- manifest.json:     hash obsahu každého souboru pro cache busting (?v=hash)
+
+Soubory jsou jen v nekomprimované podobě – stránka je čte přímo
+a kompresi přenosu řeší hosting. Soubor se stejným obsahem se nepřepisuje
+(žádné zbytečné změny v gitu).
+"""
+import hashlib
+import json
+import os
+from datetime import datetime
+
+import pandas as pd
+
+WEB_DATA_DIR = os.path.join('public', 'data')
+MANIFEST_NAME = 'manifest.json'
+# Předkomprimované kopie ze starších verzí – stránka je nečte, mažou se
+STALE_EXTENSIONS = ('.gz', '.br')
+
+
+def _dumps(obj):
+    return json.dumps(obj, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+def _write_if_changed(path, payload):
+    if os.path.exists(path):
+        with open(path, 'rb') as f:
+            if f.read() == payload:
+                return False
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(payload)
+    os.replace(tmp, path)
+    return True
+
+
+def _daily_pnl(dates, profits):
+    """{'date': [...], 'pnl': [...]} – součet profitu po dnech, vzestupně"""
+    if not len(dates):
+        return {'date': [], 'pnl': []}
+    s = pd.Series(profits, dtype=float).groupby(pd.Series(dates, dtype=str).str[:10], sort=True).sum()
+    return {'date': list(s.index), 'pnl': [round(float(v), 2) for v in s.to_numpy()]}
+
+
+def _columns(rows, keys):
+    return {k: [r[k] for r in rows] for k in keys}
+
+
+def build_web_payloads(dashboard, backtest, history):
+    """
+    {jméno souboru: objekt} ze stejných dat jako dashboard_data.json
+    (dashboard), backtest_60d_results.json (backtest) a logu obchodů (history).
+    Bez backtestu (nestažený artefakt) mají strategie prázdnou backtest část.
+    """
+    backtest = backtest or {}
+    if history is not None and not history.empty:
+        hist = pd.DataFrame({
+            'date': history['Date'].astype(str).str[:10].to_numpy(),
+            'strategy': history['Strategy'].astype(str).to_numpy(),
+            'ticker': history['Ticker'].astype(str).to_numpy(),
+            'side': history['Side'].astype(str).to_numpy(),
+            'profit': history['Profit'].astype(float).round(2).to_numpy(),
+        })
+    else:
+        hist = pd.DataFrame(columns=['date', 'strategy', 'ticker', 'side', 'profit'])
+
+    strategies = list(dict.fromkeys(list(dashboard.get('strategies', {})) + list(backtest)))
+    summary = {
+        'timestamp': dashboard.get('timestamp'),
+        'strategies': {},
+        'signals': dashboard.get('signals', {}),
+    }
+    payloads = {}
+    for s in strategies:
+        info = dashboard.get('strategies', {}).get(s, {})
+        bt = backtest.get(s, {})
+        bt_trades = [
+            {**t, 'date': str(t['date'])[:10]} for t in bt.get('trades', [])
+        ]
+        actual = hist[hist['strategy'] == s]
+        summary['strategies'][s] = {
+            'name': info.get('name', s),
+            'metrics': info.get('metrics'),
+            'equity': _columns(dashboard.get('equity', {}).get(s, []), ['date', 'equity']),
+            'daily': _daily_pnl(actual['date'].to_numpy(), actual['profit'].to_numpy()),
+            'backtest': {
+                'num_trades': bt.get('num_trades', 0),
+                'total_profit': bt.get('total_profit', 0),
+                'max_drawdown': bt.get('max_drawdown', 0),
+                'equity_curve': bt.get('equity_curve', []),
+                'daily': _daily_pnl([t['date'] for t in bt_trades], [t['profit'] for t in bt_trades]),
+            },
+        }
+        payloads[f'trades_{s}.json'] = {
+            'strategy': s,
+            'backtest': _columns(bt_trades, ['date', 'ticker', 'side', 'profit', 'hit_sl']),
+            'actual': {k: actual[k].tolist() for k in ['date', 'ticker', 'side', 'profit']},
+        }
+    payloads['summary.json'] = summary
+    return payloads
+
+
+def write_web_artifacts(dashboard, backtest, history, out_dir=WEB_DATA_DIR):
+    """Zapíše payloady + manifest. Vrací manifest."""
+    os.makedirs(out_dir, exist_ok=True)
+    files = {}
+    for name, obj in build_web_payloads(dashboard, backtest, history).items():
+        raw = _dumps(obj)
+        digest = hashlib.sha256(raw).hexdigest()
+        entry = {'hash': digest[:12], 'bytes': len(raw)}
+        _write_if_changed(os.path.join(out_dir, name), raw)
+        for ext in STALE_EXTENSIONS:
+            if os.path.exists(os.path.join(out_dir, name + ext)):
+                os.remove(os.path.join(out_dir, name + ext))
+        files[name] = entry
+
+    manifest = {'generated': datetime.now().isoformat(), 'files': files}
+    old = os.path.join(out_dir, MANIFEST_NAME)
+    # Nový timestamp jen pokud se změnil obsah
+    if os.path.exists(old):
+        try:
+            with open(old, 'r') as f:
+                prev = json.load(f)
+            if prev.get('files') == files:
+                manifest = prev
+        except ValueError:
+            pass
+    _write_if_changed(old, json.dumps(manifest, indent=2, sort_keys=True).encode('utf-8'))
+    return manifest